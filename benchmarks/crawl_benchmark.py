@@ -0,0 +1,280 @@
+#encoding=utf-8
+""" benchmark of crawl throughput, latency and memory on a synthetic site.
+
+    A local HTTP server generates a site of linked pages with static resources,
+    external links, error links and endpoints which do not support HEAD method.
+    WebCrawler crawls it in BFS and DFS mode with several concurrency levels,
+    each run in its own process, so that peak RSS is measured separately.
+
+    $ python benchmarks/crawl_benchmark.py --pages-number 2000 --fan-out 8 --concurrency 4,16,64 --output crawl.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import yaml
+import webcrawler
+from webcrawler import helpers
+from webcrawler.core import WebCrawler
+
+
+class SyntheticSite(object):
+    """ pages form a tree with fan-out children per page, plus random cross links.
+        each page also links to static resources, external urls and error urls.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.external_base_url = None
+
+    def get_page_links(self, page_index):
+        args = self.args
+        rand = random.Random(page_index)
+        links = []
+        for child in range(args.fan_out):
+            child_index = page_index * args.fan_out + child + 1
+            if child_index < args.pages_number:
+                links.append('/page/{}'.format(child_index))
+        for _ in range(args.cross_links):
+            links.append('/page/{}'.format(rand.randrange(args.pages_number)))
+        for _ in range(args.static_links):
+            links.append('/static/{}.png'.format(rand.randrange(args.static_number)))
+        for _ in range(args.external_links):
+            links.append('{}/ext/{}'.format(self.external_base_url, rand.randrange(args.external_number)))
+        if rand.random() < args.error_rate:
+            links.append('/error/{}'.format(page_index))
+        return links
+
+    def make_page(self, page_index):
+        links = ''.join('<a href="{}">link</a>\n'.format(link) for link in self.get_page_links(page_index))
+        body = '<html><head><title>page {}</title></head><body>\n{}'.format(page_index, links)
+        padding_size = self.args.page_size - len(body)
+        if padding_size > 0:
+            body += '<p>{}</p>'.format('x' * padding_size)
+        return (body + '</body></html>').encode('utf-8')
+
+    def sleep_latency(self):
+        args = self.args
+        if args.latency_ms > 0:
+            time.sleep(random.lognormvariate(0, args.latency_sigma) * args.latency_ms / 1000.0)
+
+    def respond(self, handler, method):
+        """ @return (status_code, content_type, body)
+        """
+        self.sleep_latency()
+        path = handler.path
+        if path.startswith('/page/'):
+            return 200, 'text/html', self.make_page(int(path.split('/')[-1]))
+        if path.startswith('/static/'):
+            static_index = int(path.split('/')[-1].split('.')[0])
+            if method == 'HEAD' and static_index % 100 < self.args.head_unsupported_rate * 100:
+                # some servers do not support HEAD method
+                return 404, 'text/html', b''
+            return 200, 'image/png', b'\x89PNG' + b'0' * 256
+        if path.startswith('/ext/'):
+            return 200, 'text/html', b'<html><body>external</body></html>'
+        if path.startswith('/error/'):
+            status_code = 500 if int(path.split('/')[-1]) % 2 else 404
+            return status_code, 'text/html', b'error'
+        return 404, 'text/html', b'not found'
+
+    def serve(self):
+        """ serve site and external host on two ports.
+        @return
+            seed url
+        """
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def handle_request(self, method):
+                status_code, content_type, body = site.respond(self, method)
+                self.send_response(status_code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if method == 'GET':
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self.handle_request('GET')
+
+            def do_HEAD(self):
+                self.handle_request('HEAD')
+
+            def log_message(self, *args):
+                pass
+
+        servers = [ThreadingHTTPServer(('127.0.0.1', 0), Handler) for _ in range(2)]
+        for server in servers:
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+
+        self.external_base_url = 'http://127.0.0.1:{}'.format(servers[1].server_address[1])
+        return 'http://127.0.0.1:{}/page/0'.format(servers[0].server_address[1])
+
+
+def make_config_file(args):
+    """ make config file from default config, with short retry delay.
+    """
+    config_file = os.path.join(os.path.dirname(webcrawler.__file__), 'default_config.yml')
+    config_dict = helpers.load_yaml_file(config_file)
+    config_dict['retry'] = {'default': {'delay': args.retry_delay, 'jitter': 0}}
+    config_dict['default_timeout'] = 10
+    fd, benchmark_config_file = tempfile.mkstemp(suffix='.yml')
+    with os.fdopen(fd, 'w') as f:
+        yaml.safe_dump(config_dict, f)
+    return benchmark_config_file
+
+
+def get_percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100.0))
+    return sorted_values[index]
+
+
+def run_case(args):
+    """ crawl in current process, and print result as JSON.
+    """
+    logging.basicConfig(level=logging.WARNING, stream=open(os.devnull, 'w'))
+    logs_folder = tempfile.mkdtemp()
+    web_crawler = WebCrawler(args.seed_url, [], logs_folder, args.config_file)
+
+    start_time = time.time()
+    web_crawler.start({}, args.crawl_mode, args.max_depth, args.concurrency)
+    crawl_time = time.time() - start_time
+
+    logging.getLogger().setLevel(logging.INFO)
+    start_time = time.time()
+    web_crawler.print_result()
+    report_time = time.time() - start_time
+
+    visited_urls = web_crawler.url_queue.get_visited_urls()
+    durations = sorted(url_test_res['duration_time'] for url_test_res in visited_urls.values())
+    urls_count = web_crawler.url_queue.get_visited_urls_count()
+    print(json.dumps({
+        'crawl_mode': args.crawl_mode,
+        'concurrency': args.concurrency,
+        'urls': urls_count,
+        'crawl_time': crawl_time,
+        'urls_per_second': urls_count / crawl_time if crawl_time else 0,
+        'latency_p50': get_percentile(durations, 50),
+        'latency_p99': get_percentile(durations, 99),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'report_time': report_time
+    }))
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WebCrawler benchmark on synthetic site.')
+    parser.add_argument('--pages-number', default=1000, type=int, help="Specify pages number of site.")
+    parser.add_argument('--fan-out', default=8, type=int, help="Specify child pages number of each page.")
+    parser.add_argument('--cross-links', default=2, type=int, help="Specify random page links of each page.")
+    parser.add_argument('--static-links', default=4, type=int, help="Specify static links of each page.")
+    parser.add_argument('--static-number', default=500, type=int, help="Specify static resources number.")
+    parser.add_argument('--external-links', default=2, type=int, help="Specify external links of each page.")
+    parser.add_argument('--external-number', default=200, type=int, help="Specify external urls number.")
+    parser.add_argument('--error-rate', default=0.02, type=float,
+                        help="Specify rate of pages linking to an error url, which responds 404 or 500.")
+    parser.add_argument('--head-unsupported-rate', default=0.1, type=float,
+                        help="Specify rate of static resources which respond 404 to HEAD method.")
+    parser.add_argument('--page-size', default=20000, type=int, help="Specify page size in bytes.")
+    parser.add_argument('--latency-ms', default=20, type=float, help="Specify median response latency in ms.")
+    parser.add_argument('--latency-sigma', default=0.5, type=float,
+                        help="Specify sigma of lognormal response latency distribution.")
+    parser.add_argument('--max-depth', default=10, type=int, help="Specify max crawl depth.")
+    parser.add_argument('--crawl-modes', default='BFS,DFS', help="Specify crawl modes, joined by comma.")
+    parser.add_argument('--concurrency', default='4,16,64',
+                        help="Specify concurrency levels, joined by comma.")
+    parser.add_argument('--retry-delay', default=0.1, type=float, help="Specify retry delay in seconds.")
+    parser.add_argument('--output', help="Specify JSON file to save results.")
+    # internal options of a benchmark case process
+    parser.add_argument('--run-case', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--seed-url', help=argparse.SUPPRESS)
+    parser.add_argument('--config-file', help=argparse.SUPPRESS)
+    parser.add_argument('--crawl-mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        args.concurrency = int(args.concurrency)
+        run_case(args)
+        return
+
+    site = SyntheticSite(args)
+    seed_url = site.serve()
+    config_file = make_config_file(args)
+    results = []
+    try:
+        for crawl_mode in args.crawl_modes.split(','):
+            for concurrency in args.concurrency.split(','):
+                output = subprocess.check_output([
+                    sys.executable, os.path.abspath(__file__), '--run-case',
+                    '--seed-url', seed_url,
+                    '--config-file', config_file,
+                    '--crawl-mode', crawl_mode,
+                    '--concurrency', concurrency,
+                    '--max-depth', str(args.max_depth)
+                ])
+                result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+                results.append(result)
+                print("{:<4} concurrency: {:>4}, urls: {:>7}, {:>8.1f} urls/s, latency p50: {:.3f}s, "
+                      "p99: {:.3f}s, peak RSS: {:>7.1f} MB, report: {:.3f}s".format(
+                          result['crawl_mode'], result['concurrency'], result['urls'],
+                          result['urls_per_second'], result['latency_p50'], result['latency_p99'],
+                          result['peak_rss_mb'], result['report_time']))
+    finally:
+        os.remove(config_file)
+
+    if args.output:
+        site_options = [
+            'pages_number', 'fan_out', 'cross_links', 'static_links', 'static_number',
+            'external_links', 'external_number', 'error_rate', 'head_unsupported_rate',
+            'page_size', 'latency_ms', 'latency_sigma', 'max_depth', 'retry_delay'
+        ]
+        with open(args.output, 'w') as f:
+            json.dump({
+                'version': webcrawler.__version__,
+                'git_revision': get_git_revision(),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'site': {option: getattr(args, option) for option in site_options},
+                'results': results
+            }, f, indent=4)
+        print("Save results in JSON file: {}".format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#encoding=utf-8
+""" benchmark of parsing web pages in fetch worker threads and in parser processes.
+
+    $ python benchmarks/parse_pool_benchmark.py --pages-number 400 --links-number 1000
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from webcrawler import helpers
+from webcrawler.parse_pool import ParsePool
+
+
+def make_page(page_index, links_number):
+    links = []
+    for i in range(links_number):
+        if i % 4 == 0:
+            link = '<a href="/category/{}/product-{}">product</a>'.format(i % 20, page_index * links_number + i)
+        elif i % 4 == 1:
+            link = '<img src="//asset1.xcdn.com/assets/{}.png">'.format(i)
+        elif i % 4 == 2:
+            link = '<a href="https://www.debugtalk.com/post/{}">post</a>'.format(i)
+        else:
+            link = '<a href="../compare-{}">compare</a>'.format(i)
+        links.append('<div class="item"><p>{}</p>{}</div>'.format('lorem ipsum ' * 10, link))
+
+    return '<html><head><title>page</title></head><body>{}</body></html>'\
+        .format(''.join(links)).encode('utf-8')
+
+
+def run_in_threads(pages, threads_number, parse_func):
+    referer_url = 'https://store.debugtalk.com/product/osmo'
+    pages_iter = iter(pages)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                content = next(pages_iter, None)
+            if content is None:
+                return
+            parse_func(referer_url, content)
+
+    start_time = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(threads_number)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start_time
+
+
+def parse_in_thread(referer_url, content):
+    raw_links_set = helpers.get_raw_links_from_page(content)
+    return helpers.parse_urls(raw_links_set, referer_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse pool benchmark.')
+    parser.add_argument(
+        '--pages-number', default=400, type=int, help="Specify pages number, default is 400.")
+    parser.add_argument(
+        '--links-number', default=1000, type=int, help="Specify links number of each page, default is 1000.")
+    parser.add_argument(
+        '--threads-number', default=32, type=int, help="Specify fetch worker threads number, default is 32.")
+    args = parser.parse_args()
+
+    pages = [make_page(i, args.links_number) for i in range(args.pages_number)]
+    page_size = sum(len(page) for page in pages) / len(pages)
+    print("{} pages, average size {:.0f} KB, {} links per page, {} fetch threads".format(
+        len(pages), page_size / 1024, args.links_number, args.threads_number))
+
+    duration = run_in_threads(pages, args.threads_number, parse_in_thread)
+    print("{:<24} {:>8.3f}s {:>8.1f} pages/s".format("threads only", duration, len(pages) / duration))
+
+    processes_number = 1
+    cpu_count = multiprocessing.cpu_count()
+    while True:
+        parse_pool = ParsePool(processes_number)
+        # warm up parser processes
+        parse_pool.submit_page('https://store.debugtalk.com/product/osmo', pages[0]).result()
+
+        duration = run_in_threads(
+            pages, args.threads_number,
+            lambda referer_url, content: parse_pool.submit_page(referer_url, content).result())
+        print("{:<24} {:>8.3f}s {:>8.1f} pages/s".format(
+            "{} parser processes".format(processes_number), duration, len(pages) / duration))
+        parse_pool.shutdown()
+
+        if processes_number >= cpu_count:
+            break
+        processes_number = min(processes_number * 2, cpu_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#encoding=utf-8
+""" benchmark of link normalization and url parse cache.
+
+    Link sets look like real pages: shared navigation links, cdn assets, absolute,
+    root-relative and relative links, fragments, queries and ignored links.
+    Batch normalization of parse_urls is compared with parse_url of each link,
+    and results are checked to be identical.
+
+    $ python benchmarks/url_parse_benchmark.py --pages-number 2000 --links-number 200 --threads 16
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from webcrawler import helpers
+
+IGNORE_STARTSWITH_STRS = ['javascript:', 'tel:']
+
+
+def make_page_links(page_index, links_number, nav_links):
+    """ @return (referer_url, raw links set)
+    """
+    rand = random.Random(page_index)
+    referer_url = 'https://store.debugtalk.com/category/{}/product-{}'.format(page_index % 50, page_index)
+    links = set(nav_links)
+    while len(links) < links_number:
+        kind = rand.randrange(8)
+        number = rand.randrange(100000)
+        if kind == 0:
+            link = 'https://store.debugtalk.com/product/{}?ref=page{}'.format(number, page_index)
+        elif kind == 1:
+            link = '//asset{}.xcdn.com/assets/{}.png'.format(number % 4, number)
+        elif kind == 2:
+            link = '/category/{}/product-{}#reviews'.format(number % 50, number)
+        elif kind == 3:
+            link = 'product-{}'.format(number)
+        elif kind == 4:
+            link = '../compare-{}'.format(number)
+        elif kind == 5:
+            link = 'https://www.debugtalk.com/post/{}'.format(number)
+        elif kind == 6:
+            link = '  /search?q={}&page={}  '.format(number, number % 10)
+        else:
+            link = rand.choice(['javascript:void(0)', 'tel:123456', 'mailto:a@debugtalk.com', '#top', ''])
+        links.add(link)
+    return referer_url, links
+
+
+def make_pages(pages_number, links_number):
+    nav_links = ['/', '/about', '/contact', '/cart', '/account/login', '//asset1.xcdn.com/assets/logo.png']
+    nav_links += ['/category/{}'.format(i) for i in range(30)]
+    return [make_page_links(page_index, links_number, nav_links) for page_index in range(pages_number)]
+
+
+def parse_links_one_by_one(referer_url, links):
+    parsed_urls_set = set()
+    for link in links:
+        parsed_url = helpers.parse_url(link, referer_url, IGNORE_STARTSWITH_STRS)
+        if parsed_url is not None:
+            parsed_urls_set.add(parsed_url)
+    return parsed_urls_set
+
+
+def parse_links_in_batch(referer_url, links):
+    return helpers.parse_urls(links, referer_url, IGNORE_STARTSWITH_STRS)
+
+
+def run_parse(pages, parse_func):
+    helpers.urlparsed_object_cache.clear()
+    start_time = time.time()
+    results = [parse_func(referer_url, links) for referer_url, links in pages]
+    return time.time() - start_time, results
+
+
+def run_cache_lookups(urls, threads_number, lookups_number):
+    """ look up host of urls in several threads like crawler workers do.
+    """
+    helpers.urlparsed_object_cache.clear()
+
+    def worker(worker_index):
+        rand = random.Random(worker_index)
+        for _ in range(lookups_number):
+            helpers.get_parsed_object_from_url(rand.choice(urls)).netloc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads_number)]
+    start_time = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Link normalization and url parse cache benchmark.')
+    parser.add_argument('--pages-number', default=2000, type=int, help="Specify pages number.")
+    parser.add_argument('--links-number', default=200, type=int, help="Specify links number of each page.")
+    parser.add_argument('--threads', default=16, type=int, help="Specify threads number of cache lookups.")
+    parser.add_argument('--lookups-number', default=20000, type=int,
+                        help="Specify cache lookups number of each thread.")
+    parser.add_argument('--cache-size', default=helpers.DEFAULT_URLPARSE_CACHE_SIZE, type=int,
+                        help="Specify max size of url parse cache.")
+    args = parser.parse_args()
+
+    helpers.urlparsed_object_cache.resize(args.cache_size)
+    pages = make_pages(args.pages_number, args.links_number)
+    links_count = sum(len(links) for _, links in pages)
+    print("{} pages, {} links.".format(len(pages), links_count))
+
+    one_by_one_time, one_by_one_results = run_parse(pages, parse_links_one_by_one)
+    one_by_one_stats = helpers.urlparsed_object_cache.get_stats()
+    batch_time, batch_results = run_parse(pages, parse_links_in_batch)
+    batch_stats = helpers.urlparsed_object_cache.get_stats()
+    assert one_by_one_results == batch_results, "batch normalization results differ"
+
+    for name, duration, stats in [
+            ('one by one', one_by_one_time, one_by_one_stats),
+            ('batch', batch_time, batch_stats)]:
+        print("{:<10}: {:.3f}s, {:>10.0f} links/s, cache {}/{} urls, hit rate {:.1f}%".format(
+            name, duration, links_count / duration, stats['size'], stats['maxsize'], 100 * stats['hit_rate']))
+
+    urls = list(set(url for result in batch_results for url in result))
+    duration = run_cache_lookups(urls, args.threads, args.lookups_number)
+    stats = helpers.urlparsed_object_cache.get_stats()
+    lookups = args.threads * args.lookups_number
+    print("cache lookups of {} urls in {} threads: {:.0f} lookups/s, cache {}/{} urls, hit rate {:.1f}%".format(
+        len(urls), args.threads, lookups / duration, stats['size'], stats['maxsize'], 100 * stats['hit_rate']))
+
+
+if __name__ == '__main__':
+    main()
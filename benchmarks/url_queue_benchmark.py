@@ -0,0 +1,103 @@
+#encoding=utf-8
+""" micro benchmark of UrlQueue enqueue/dequeue throughput, and memory of
+    queued urls set compared with compact mode.
+
+    $ python benchmarks/url_queue_benchmark.py --urls-number 1000000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from webcrawler.url_queue import UrlQueue, UniqueQueue
+
+
+class ListUniqueQueue(UniqueQueue):
+    """ the former list based implementation, for comparison.
+    """
+    def clear(self):
+        self.all_items_set = set()
+        self.queue = []
+
+    def _put(self, item):
+        if item in self.all_items_set:
+            return False
+        self.all_items_set.add(item)
+        self._append(item)
+        return True
+
+    def _append(self, item):
+        self.queue.insert(0, item)
+
+    def _prepend(self, item):
+        self.queue.append(item)
+
+    def _get(self):
+        return self.queue.pop()
+
+
+def make_urls(urls_number):
+    return [
+        "http://debugtalk.com/category/{}/page/{}?id={}".format(i % 100, i % 1000, i)
+        for i in range(urls_number)
+    ]
+
+
+def run_benchmark(name, url_queue, urls, batch_size):
+    start_time = time.time()
+    if batch_size > 1:
+        for index in range(0, len(urls), batch_size):
+            url_queue.add_unvisited_urls(set(urls[index:index+batch_size]))
+    else:
+        for url in urls:
+            url_queue.add_unvisited_url(url)
+    enqueue_time = time.time() - start_time
+
+    start_time = time.time()
+    while not url_queue.is_unvisited_urls_empty():
+        url_queue.get_one_unvisited_url()
+    dequeue_time = time.time() - start_time
+
+    all_items_set = url_queue._unvisited_urls_queue.all_items_set
+    if url_queue.compact:
+        memory_size = all_items_set.get_memory_size()
+    else:
+        memory_size = sys.getsizeof(all_items_set) + sum(sys.getsizeof(url) for url in all_items_set)
+    print("{:<28} urls: {:>8}, enqueue: {:>8.3f}s ({:>10.0f} urls/s), dequeue: {:>8.3f}s ({:>10.0f} urls/s), "
+          "queued urls set: {:>8.1f} MB".format(
+        name, len(urls),
+        enqueue_time, len(urls) / enqueue_time,
+        dequeue_time, len(urls) / dequeue_time,
+        memory_size / 1024.0 / 1024
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='UrlQueue micro benchmark.')
+    parser.add_argument(
+        '--urls-number', default=1000000, type=int,
+        help="Specify urls number for deque based queue, default is 1000000.")
+    parser.add_argument(
+        '--list-urls-number', default=50000, type=int,
+        help="Specify urls number for former list based queue, which is quadratic, default is 50000.")
+    parser.add_argument(
+        '--batch-size', default=100, type=int,
+        help="Specify urls number added in one batch, like links of one page, default is 100.")
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls_number)
+    list_urls = urls[:args.list_urls_number]
+
+    list_url_queue = UrlQueue()
+    list_url_queue._unvisited_urls_queue = ListUniqueQueue()
+    run_benchmark("list, one by one", list_url_queue, list_urls, 1)
+    run_benchmark("deque, one by one", UrlQueue(), list_urls, 1)
+    run_benchmark("deque, one by one", UrlQueue(), urls, 1)
+    run_benchmark("deque, batch {}".format(args.batch_size), UrlQueue(), urls, args.batch_size)
+    run_benchmark("compact, batch {}".format(args.batch_size), UrlQueue(compact=True), urls, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#encoding=utf-8
+""" benchmark of compiled url rules against linear scans of whitelist lists.
+
+    Raw hyper links are checked against startswith rules, and complete urls are
+    checked against host, fullurl and include-key rules, with several rules numbers.
+    Results of both ways are checked to be identical.
+
+    $ python benchmarks/url_rules_benchmark.py --links-number 100000 --rules-numbers 10,100,1000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from webcrawler import helpers
+from webcrawler.url_rules import UrlRules
+
+
+def make_word(rand, length):
+    return ''.join(rand.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(length))
+
+
+def make_links(rand, links_number):
+    """ @return (raw links, complete urls)
+    """
+    raw_links = []
+    urls = []
+    for index in range(links_number):
+        path = '/{}/{}-{}'.format(make_word(rand, 6), make_word(rand, 8), index)
+        host = '{}.debugtalk.com'.format(make_word(rand, 3))
+        raw_links.append(rand.choice([path, 'https://' + host + path, 'javascript:void(0)']))
+        urls.append('https://{}{}?ref={}'.format(host, path, make_word(rand, 5)))
+    return raw_links, urls
+
+
+def make_whitelist_config(rand, rules_number):
+    return {
+        'startswith': ['javascript:'] + ['/{}'.format(make_word(rand, rand.randint(2, 6)))
+                                         for _ in range(rules_number)],
+        'host': ['{}.debugtalk.com'.format(make_word(rand, 3)) for _ in range(rules_number)],
+        'fullurl': ['https://www.debugtalk.com/{}'.format(make_word(rand, 8)) for _ in range(rules_number)],
+        'include-key': [make_word(rand, 6) for _ in range(rules_number)]
+    }
+
+
+def scan_ignored_links(raw_links, whitelist_config):
+    """ linear scans of startswith strs, as parse_url does.
+    """
+    startswith_strs = whitelist_config['startswith']
+    ignored_links = []
+    for link in raw_links:
+        for startswith_str in startswith_strs:
+            if link.startswith(startswith_str):
+                ignored_links.append(link)
+                break
+    return ignored_links
+
+
+def scan_ignored_urls(urls, whitelist_config):
+    """ linear scans of fullurl, host and include-key lists, as get_request_kwargs did.
+    """
+    fullurls = whitelist_config['fullurl']
+    hosts = whitelist_config['host']
+    keys = whitelist_config['include-key']
+    ignored_urls = []
+    for url in urls:
+        if url in fullurls or helpers.get_parsed_object_from_url(url).netloc in hosts \
+                or any(key in url for key in keys):
+            ignored_urls.append(url)
+    return ignored_urls
+
+
+def match_ignored_links(raw_links, url_rules):
+    is_ignored_link = url_rules.ignore_prefix_matcher.match
+    return [link for link in raw_links if is_ignored_link(link)]
+
+
+def match_ignored_urls(urls, url_rules):
+    is_ignored_url = url_rules.is_ignored_url
+    return [url for url in urls if is_ignored_url(url)]
+
+
+def timed(func, *args):
+    start_time = time.time()
+    result = func(*args)
+    return time.time() - start_time, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compiled url rules benchmark.')
+    parser.add_argument('--links-number', default=100000, type=int, help="Specify links number.")
+    parser.add_argument('--rules-numbers', default='10,100,1000',
+                        help="Specify numbers of rules of each type, joined by comma.")
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    raw_links, urls = make_links(rand, args.links_number)
+    # host lookups are cached in both ways
+    for url in urls:
+        helpers.get_parsed_object_from_url(url)
+
+    for rules_number in [int(number) for number in args.rules_numbers.split(',')]:
+        whitelist_config = make_whitelist_config(rand, rules_number)
+        compile_time, url_rules = timed(UrlRules, whitelist_config)
+
+        scan_links_time, scanned_links = timed(scan_ignored_links, raw_links, whitelist_config)
+        match_links_time, matched_links = timed(match_ignored_links, raw_links, url_rules)
+        assert scanned_links == matched_links, "startswith results differ"
+
+        scan_urls_time, scanned_urls = timed(scan_ignored_urls, urls, whitelist_config)
+        match_urls_time, matched_urls = timed(match_ignored_urls, urls, url_rules)
+        assert scanned_urls == matched_urls, "url rules results differ"
+
+        print("{:>5} rules, compiled in {:.3f}s | startswith: scan {:.3f}s, compiled {:.3f}s, {:.1f}x "
+              "| host/fullurl/include-key: scan {:.3f}s, compiled {:.3f}s, {:.1f}x".format(
+                  rules_number, compile_time,
+                  scan_links_time, match_links_time, scan_links_time / match_links_time,
+                  scan_urls_time, match_urls_time, scan_urls_time / match_urls_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,9 @@ setup(
         'requests',
         'jenkins-mail-py'
     ],
+    extras_require={
+        'asyncio': ['aiohttp']
+    },
     dependency_links=[
         "git+https://github.com/debugtalk/jenkins-mail-py.git#egg=jenkins-mail-py-0"
     ],
@@ -41,7 +44,8 @@ setup(
     ],
     entry_points={
         'console_scripts': [
-            'webcrawler=webcrawler:main'
+            'webcrawler=webcrawler:main',
+            'webcrawler-results=webcrawler.result_sink:main'
         ]
     }
 )
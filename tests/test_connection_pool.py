@@ -0,0 +1,98 @@
+#encoding=utf-8
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+from webcrawler.connection_pool import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """ respond with the Cookie header of request, and set a cookie.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=leaked; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestSessionPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        cls.server.daemon_threads = True
+        server_thread = threading.Thread(target=cls.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        cls.host = '127.0.0.1:{}'.format(cls.server.server_address[1])
+        cls.site_url = 'http://{}/'.format(cls.host)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_are_reused(self):
+        session_pool = SessionPool(4)
+        session = session_pool.get_session()
+        self.assertIs(session_pool.get_session(), session)
+        for _ in range(5):
+            self.assertEqual(session.get(self.site_url).status_code, 200)
+
+        self.assertEqual(session_pool.get_stats(), {
+            'hosts': 1,
+            'requests': 5,
+            'connections': 1,
+            'reused': 4
+        })
+
+    def test_sessions_share_connections(self):
+        session_pool = SessionPool(4)
+        sessions = []
+
+        def work():
+            session = session_pool.get_session()
+            sessions.append(session)
+            session.get(self.site_url)
+
+        # threads run one after another, thus the connection is reused
+        for _ in range(3):
+            worker_thread = threading.Thread(target=work)
+            worker_thread.start()
+            worker_thread.join()
+
+        self.assertEqual(len(set(id(session) for session in sessions)), 3)
+        stats = session_pool.get_stats()
+        self.assertEqual((stats['requests'], stats['connections']), (3, 1))
+
+    def test_host_pool_maxsize(self):
+        session_pool = SessionPool(4, {'hosts': {self.host: 1}})
+        session_pool.get_session().get(self.site_url)
+        pool = session_pool.adapter.poolmanager.created_pools[0]
+        self.assertEqual(pool.pool.maxsize, 1)
+
+    def test_cookies_are_not_kept(self):
+        session = SessionPool(4).get_session()
+        session.get(self.site_url)
+        self.assertEqual(session.get(self.site_url).text, '')
+        self.assertEqual(session.get(self.site_url, cookies={'a': '1'}).text, 'a=1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#encoding=utf-8
+import random
+import unittest
+
+from webcrawler.content_dedupe import (MIN_SHINGLES, SIMHASH_BITS, ContentDedupe, SimHashIndex,
+                                       get_content_fingerprint, get_text_fingerprint)
+
+
+def make_text(seed, words_number=300):
+    words_random = random.Random(seed)
+    return ' '.join('word{}'.format(words_random.randint(0, 1000)) for _ in range(words_number))
+
+
+def get_distance(fingerprint1, fingerprint2):
+    return bin(fingerprint1 ^ fingerprint2).count('1')
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_near_duplicate_texts(self):
+        text = make_text(1)
+        fingerprint = get_text_fingerprint(text)
+        self.assertTrue(0 <= fingerprint < 1 << SIMHASH_BITS)
+        self.assertEqual(get_text_fingerprint(text.upper()), fingerprint)
+        self.assertLessEqual(get_distance(get_text_fingerprint(text + ' footer 2018'), fingerprint), 3)
+        self.assertGreater(get_distance(get_text_fingerprint(make_text(2)), fingerprint), 3)
+
+    def test_short_text(self):
+        self.assertIsNone(get_text_fingerprint(make_text(1, MIN_SHINGLES)))
+
+    def test_visible_text_of_content(self):
+        text = make_text(1)
+        content = '<html><head><style>p {{color: red}}</style><script>var a = 1;</script></head>' \
+            '<body><!-- comment --><p class="x">{}</p></body></html>'.format(text)
+        self.assertEqual(get_content_fingerprint(content.encode('utf-8')), get_text_fingerprint(text))
+
+
+class TestSimHashIndex(unittest.TestCase):
+
+    def test_find_or_add(self):
+        simhash_index = SimHashIndex(max_distance=3)
+        fingerprint = random.Random(1).getrandbits(SIMHASH_BITS)
+        self.assertIsNone(simhash_index.find_or_add(fingerprint, 'http://a.com/1'))
+        self.assertEqual(len(simhash_index), 1)
+
+        # fingerprints within max distance in any bits are found
+        for bits in [(0,), (0, 63), (1, 20, 40), (5, 6, 7)]:
+            near_fingerprint = fingerprint
+            for bit in bits:
+                near_fingerprint ^= 1 << bit
+            self.assertEqual(simhash_index.find_or_add(near_fingerprint, 'http://a.com/2'), 'http://a.com/1')
+        self.assertEqual(len(simhash_index), 1)
+
+        far_fingerprint = fingerprint ^ 0b1111
+        self.assertIsNone(simhash_index.find_or_add(far_fingerprint, 'http://a.com/3'))
+        self.assertEqual(simhash_index.find_or_add(far_fingerprint, 'http://a.com/4'), 'http://a.com/3')
+        self.assertEqual(len(simhash_index), 2)
+
+    def test_find_as_linear_scan(self):
+        fingerprints_random = random.Random(2)
+        simhash_index = SimHashIndex(max_distance=3)
+        indexed_fingerprints = []
+        for index in range(300):
+            fingerprint = fingerprints_random.getrandbits(SIMHASH_BITS)
+            if indexed_fingerprints and index % 2:
+                # near-duplicate of an indexed fingerprint
+                fingerprint = fingerprints_random.choice(indexed_fingerprints)[0]
+                for _ in range(fingerprints_random.randint(1, 5)):
+                    fingerprint ^= 1 << fingerprints_random.randrange(SIMHASH_BITS)
+
+            expected_urls = set(
+                url for indexed_fingerprint, url in indexed_fingerprints
+                if get_distance(indexed_fingerprint, fingerprint) <= 3
+            )
+            url = simhash_index.find_or_add(fingerprint, index)
+            if expected_urls:
+                self.assertIn(url, expected_urls)
+            else:
+                self.assertIsNone(url)
+                indexed_fingerprints.append((fingerprint, index))
+
+
+class TestContentDedupe(unittest.TestCase):
+
+    def test_links_of_identical_content(self):
+        content_dedupe = ContentDedupe(maxsize=10)
+        hyper_links_set = {'http://a.com/docs/b'}
+        content_dedupe.set_links('md5', 'http://a.com/docs/a', hyper_links_set)
+        self.assertEqual(content_dedupe.get_links('md5', 'http://a.com/docs/c?x=1'), hyper_links_set)
+        # relative links are resolved against another base
+        self.assertIsNone(content_dedupe.get_links('md5', 'http://a.com/blog/a'))
+        self.assertIsNone(content_dedupe.get_links('md5', 'https://a.com/docs/a'))
+        self.assertIsNone(content_dedupe.get_links('md6', 'http://a.com/docs/a'))
+        self.assertEqual(content_dedupe.get_stats()['identical'], 1)
+
+    def test_near_duplicate(self):
+        content_dedupe = ContentDedupe(simhash_enabled=True)
+        fingerprint = get_text_fingerprint(make_text(1))
+        self.assertIsNone(content_dedupe.find_near_duplicate('http://a.com/1', fingerprint))
+        self.assertEqual(
+            content_dedupe.find_near_duplicate('http://a.com/2', fingerprint ^ 1), 'http://a.com/1')
+        self.assertIsNone(content_dedupe.find_near_duplicate('http://a.com/3', None))
+        stats = content_dedupe.get_stats()
+        self.assertEqual((stats['near_duplicate'], stats['fingerprints']), (1, 1))
+
+    def test_simhash_disabled(self):
+        content_dedupe = ContentDedupe()
+        fingerprint = get_text_fingerprint(make_text(1))
+        self.assertIsNone(content_dedupe.find_near_duplicate('http://a.com/1', fingerprint))
+        self.assertIsNone(content_dedupe.find_near_duplicate('http://a.com/2', fingerprint))
+
+
+if __name__ == '__main__':
+    unittest.main()
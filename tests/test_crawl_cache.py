@@ -0,0 +1,156 @@
+#encoding=utf-8
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+from webcrawler.core import WebCrawler
+from webcrawler.crawl_cache import CrawlCache
+
+HOME_URL = 'http://a.com/'
+# pages with links, the other pages of the tree are leaves
+PARENT_PAGES_NUMBER = 7
+PAGES_NUMBER = 15
+
+
+class TestCrawlCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.cache_folder, 'cache', 'crawl_cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_folder)
+
+    def test_cached_pages(self):
+        crawl_cache = CrawlCache(self.cache_file)
+        crawl_cache.set(HOME_URL, '', '200', '"v1"', None, 'md5', {HOME_URL + '1'})
+        crawl_cache.set(HOME_URL, 'a_1', '200', None, 'Mon, 01 Jan 2024 00:00:00 GMT', 'md5', set())
+        crawl_cache.flush()
+
+        # pages are cached per cookies
+        crawl_cache = CrawlCache(self.cache_file)
+        self.assertEqual(crawl_cache.get(HOME_URL, ''), {
+            'status_code': '200',
+            'etag': '"v1"',
+            'last_modified': None,
+            'md5': 'md5',
+            'links': {HOME_URL + '1'}
+        })
+        self.assertEqual(crawl_cache.get(HOME_URL, 'a_1')['links'], set())
+        self.assertIsNone(crawl_cache.get(HOME_URL + '1', ''))
+
+
+class ConditionalSiteHandler(BaseHTTPRequestHandler):
+    """ pages form a binary tree, and respond with 304 if their ETag is not changed.
+        a changed page links to a new leaf page.
+    """
+    protocol_version = 'HTTP/1.1'
+    # page index => version, page is changed when its version is increased
+    versions = {}
+    not_modified_count = 0
+
+    def log_message(self, *args):
+        pass
+
+    def send_page(self, with_body):
+        page_index = int(self.path.rsplit('/', 1)[1])
+        version = self.versions.get(page_index, 0)
+        etag = '"{}-{}"'.format(page_index, version)
+        if self.headers.get('If-None-Match') == etag:
+            ConditionalSiteHandler.not_modified_count += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        links = []
+        if page_index < PARENT_PAGES_NUMBER:
+            links = ['/page/{}'.format(page_index * 2 + child + 1) for child in range(2)]
+        if version:
+            links.append('/page/{}'.format(PAGES_NUMBER + page_index))
+        body = ''.join('<a href="{}">link</a>'.format(link) for link in links).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.send_page(True)
+
+    def do_HEAD(self):
+        self.send_page(False)
+
+
+class TestCrawlCacheCrawl(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ConditionalSiteHandler)
+        self.server.daemon_threads = True
+        server_thread = threading.Thread(target=self.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        self.site_url = self.get_page_url(0)
+        ConditionalSiteHandler.versions = {}
+        ConditionalSiteHandler.not_modified_count = 0
+
+        self.logs_folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.logs_folder, 'crawl_cache.db')
+        logging.getLogger().setLevel(logging.WARNING)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.logs_folder)
+
+    def get_page_url(self, page_index):
+        return 'http://127.0.0.1:{}/page/{}'.format(self.server.server_address[1], page_index)
+
+    def crawl(self):
+        web_crawler = WebCrawler(self.site_url, [], self.logs_folder)
+        web_crawler.set_crawl_cache(self.cache_file)
+        web_crawler.start({}, 'BFS', 5, 4)
+        # flushed when result is printed
+        web_crawler.crawl_cache.flush()
+        return web_crawler
+
+    def test_links_of_not_modified_pages_are_reused(self):
+        web_crawler = self.crawl()
+        visited_urls = set(web_crawler.url_queue.get_visited_urls())
+        self.assertEqual(ConditionalSiteHandler.not_modified_count, 0)
+        self.assertEqual(web_crawler.crawl_cache.stats['missed'], PAGES_NUMBER)
+
+        # links of page 1 are changed
+        ConditionalSiteHandler.versions[1] = 1
+        web_crawler = self.crawl()
+        self.assertEqual(ConditionalSiteHandler.not_modified_count, PAGES_NUMBER - 1)
+        self.assertEqual(web_crawler.crawl_cache.stats['not_modified'], PAGES_NUMBER - 1)
+        # the changed page and the new page
+        self.assertEqual(web_crawler.crawl_cache.stats['missed'], 2)
+        self.assertEqual(
+            set(web_crawler.url_queue.get_visited_urls()) - visited_urls,
+            {self.get_page_url(PAGES_NUMBER + 1)})
+        self.assertEqual(web_crawler.changed_page_urls, {self.get_page_url(1)})
+        # links of not modified pages are reused from crawl cache
+        self.assertEqual(
+            sorted(web_crawler.link_graph.get_page_links(self.get_page_url(2))),
+            [self.get_page_url(5), self.get_page_url(6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+#encoding=utf-8
+import os
+import time
+import random
+import shutil
+import logging
+import tempfile
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+from webcrawler import helpers
+from webcrawler.core import WebCrawler
+
+HOME_URL = 'http://a.com/'
+PAGES_NUMBER = 40
+FAN_OUT = 3
+MAX_DEPTH = 3
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """ pages form a tree with cross links to random pages, and some broken links.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_page(self, with_body):
+        time.sleep(random.random() * 0.01)
+        status_code = 404
+        links = []
+        if self.path.startswith('/page/'):
+            page_index = int(self.path.rsplit('/', 1)[1])
+            status_code = 200 if page_index < PAGES_NUMBER else 404
+            links = ['/page/{}'.format(page_index * FAN_OUT + child + 1) for child in range(FAN_OUT)]
+            links.append('/page/{}'.format(random.Random(page_index).randrange(PAGES_NUMBER)))
+            if page_index % 5 == 0:
+                links.append('/missing/{}'.format(page_index))
+        body = ''.join('<a href="{}">link</a>'.format(link) for link in links).encode('utf-8')
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.send_page(True)
+
+    def do_HEAD(self):
+        self.send_page(False)
+
+
+class TestCrawlModes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+        cls.server.daemon_threads = True
+        server_thread = threading.Thread(target=cls.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        cls.site_url = 'http://127.0.0.1:{}/page/0'.format(cls.server.server_address[1])
+
+        cls.logs_folder = tempfile.mkdtemp()
+        config_dict = helpers.load_yaml_file(
+            os.path.join(os.path.dirname(helpers.__file__), 'default_config.yml'))
+        # broken links are retried at once
+        config_dict['retry'] = {'default': {'delay': 0, 'jitter': 0}}
+        cls.config_file = os.path.join(cls.logs_folder, 'config.yml')
+        helpers.save_to_yaml(config_dict, cls.config_file)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.logs_folder)
+
+    def crawl(self, crawl_mode, engine='threading'):
+        web_crawler = WebCrawler(self.site_url, [], self.logs_folder, self.config_file)
+        web_crawler.start({}, crawl_mode, MAX_DEPTH, 8, engine)
+        return web_crawler
+
+    def get_results(self, web_crawler):
+        visited_urls = web_crawler.url_queue.get_visited_urls()
+        return {url: url_test_res['status_code'] for url, url_test_res in visited_urls.items()}
+
+    def test_bfs(self):
+        bfs_results = self.get_results(self.crawl('BFS'))
+        self.assertEqual(bfs_results[self.site_url], '200')
+        self.assertIn('404', bfs_results.values())
+        self.assertGreater(len(bfs_results), 30)
+
+    def test_pipelined_modes(self):
+        bfs_results = self.get_results(self.crawl('BFS'))
+        # pipelined modes have no barrier between depths, and end when frontier is drained
+        for crawl_mode in ['PIPELINE', 'PRIORITY']:
+            self.assertEqual(self.get_results(self.crawl(crawl_mode)), bfs_results)
+
+    def test_asyncio_engine(self):
+        bfs_results = self.get_results(self.crawl('BFS'))
+        web_crawler = self.crawl('BFS', 'asyncio')
+        self.assertEqual(self.get_results(web_crawler), bfs_results)
+
+        # keep-alive connections are reused
+        stats = web_crawler.async_engine.get_stats()
+        self.assertEqual(stats['hosts'], 1)
+        self.assertGreater(stats['reused'], 0)
+        self.assertLessEqual(stats['connections'], 8)
+
+
+
+class TestPipelinedDepth(unittest.TestCase):
+
+    def setUp(self):
+        self.logs_folder = tempfile.mkdtemp()
+        self.web_crawler = WebCrawler(HOME_URL, [], self.logs_folder)
+        self.web_crawler.max_depth = 2
+
+    def tearDown(self):
+        shutil.rmtree(self.logs_folder)
+
+    def get_page(self, url, depth):
+        """ get url from unvisited urls as pipelined workers do.
+        """
+        self.web_crawler.url_queue.add_unvisited_urls([url], depth)
+        self.assertEqual(self.web_crawler.url_queue.get_one_unvisited_url_with_depth(), (url, depth))
+        self.web_crawler.pipelined_depth_mapping[url] = depth
+
+    def get_unvisited_urls(self):
+        url_queue = self.web_crawler.url_queue
+        unvisited_urls = []
+        while not url_queue.is_unvisited_urls_empty():
+            unvisited_urls.append(url_queue.get_one_unvisited_url_with_depth())
+        return unvisited_urls
+
+    def test_fetched_page_is_expanded_again(self):
+        # page 1 is got at max depth, thus its links are not queued
+        self.get_page(HOME_URL + '1', 2)
+        self.web_crawler.save_page_links(HOME_URL + '1', {HOME_URL + '1/1'}, 3)
+        self.assertEqual(self.get_unvisited_urls(), [])
+
+        self.get_page(HOME_URL, 0)
+        self.web_crawler.save_page_links(HOME_URL, {HOME_URL + '1'}, 1)
+        self.assertEqual(self.web_crawler.pipelined_depth_mapping[HOME_URL + '1'], 1)
+        self.assertEqual(self.get_unvisited_urls(), [(HOME_URL + '1/1', 2)])
+
+    def test_page_not_fetched_yet_saves_links_with_lowered_depth(self):
+        self.get_page(HOME_URL + '1', 2)
+        self.get_page(HOME_URL, 0)
+        self.web_crawler.save_page_links(HOME_URL, {HOME_URL + '1'}, 1)
+        self.web_crawler.save_page_links(HOME_URL + '1', {HOME_URL + '1/1'}, 3)
+        self.assertEqual(self.get_unvisited_urls(), [(HOME_URL + '1/1', 2)])
+
+    def test_pages_linked_with_more_depth_are_not_expanded_again(self):
+        self.get_page(HOME_URL + '1', 1)
+        self.web_crawler.save_page_links(HOME_URL + '1', {HOME_URL + '1/1'}, 2)
+        self.assertEqual(self.get_unvisited_urls(), [(HOME_URL + '1/1', 2)])
+
+        self.get_page(HOME_URL + '2', 1)
+        self.web_crawler.save_page_links(HOME_URL + '2', {HOME_URL + '1'}, 2)
+        self.assertEqual(self.web_crawler.pipelined_depth_mapping[HOME_URL + '1'], 1)
+        self.assertEqual(self.get_unvisited_urls(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#encoding=utf-8
+import time
+import threading
+import unittest
+
+from webcrawler.crawl_stopper import CrawlStopper
+
+
+class TestCrawlStopper(unittest.TestCase):
+
+    def test_stop(self):
+        crawl_stopper = CrawlStopper()
+        self.assertFalse(crawl_stopper.is_stopped())
+        self.assertTrue(crawl_stopper.stop("Crawl is canceled"))
+        self.assertFalse(crawl_stopper.stop("Time budget of 10 seconds is used up"))
+        self.assertTrue(crawl_stopper.is_stopped())
+        self.assertEqual(crawl_stopper.reason, "Crawl is canceled")
+
+    def test_time_budget(self):
+        crawl_stopper = CrawlStopper()
+        self.assertIsNone(crawl_stopper.deadline)
+        crawl_stopper.set_time_budget(10)
+        self.assertEqual(crawl_stopper.time_budget, 10)
+        self.assertAlmostEqual(crawl_stopper.deadline, time.time() + 10, delta=1)
+
+    def test_in_flight(self):
+        crawl_stopper = CrawlStopper()
+        self.assertTrue(crawl_stopper.enter())
+        self.assertTrue(crawl_stopper.enter())
+        crawl_stopper.stop("Crawl is canceled")
+        # no url is tested after crawl is stopped
+        self.assertFalse(crawl_stopper.enter())
+        self.assertEqual(crawl_stopper.wait_in_flight(0.01), 2)
+
+        crawl_stopper.exit()
+        exit_timer = threading.Timer(0.1, crawl_stopper.exit)
+        exit_timer.start()
+        self.assertEqual(crawl_stopper.wait_in_flight(5), 0)
+        exit_timer.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
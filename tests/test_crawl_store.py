@@ -0,0 +1,161 @@
+#encoding=utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+from webcrawler.core import WebCrawler
+from webcrawler.crawl_store import CrawlStore, StoreUrlSet
+
+HOME_URL = 'http://a.com/'
+
+
+def make_result(status_code):
+    return {'status_code': status_code, 'duration_time': 0.1, 'md5': None}
+
+
+class TestCrawlStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store_folder = tempfile.mkdtemp()
+        self.store_file = os.path.join(self.store_folder, 'crawl_store.db')
+        self.crawl_store = CrawlStore(self.store_file, batch_size=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.store_folder)
+
+    def reopen(self, resume=True):
+        return CrawlStore(self.store_file, resume=resume)
+
+    def test_records_are_checkpointed_in_batches(self):
+        self.crawl_store.add_frontier_urls([HOME_URL + '1', HOME_URL + '2'], 1)
+        self.assertEqual(list(self.reopen().iter_unvisited_urls()), [])
+
+        self.crawl_store.add_visited_url(HOME_URL + '1', make_result('200'), None)
+        self.assertEqual(list(self.reopen().iter_unvisited_urls()), [(HOME_URL + '2', 1)])
+
+    def test_resume(self):
+        self.crawl_store.add_frontier_urls([HOME_URL + '2', HOME_URL + '3'], 2)
+        self.crawl_store.add_frontier_urls([HOME_URL + '1'], 1)
+        self.crawl_store.add_visited_url(HOME_URL + '3', make_result('404'), 'HTTPError')
+        self.crawl_store.add_page_links(HOME_URL, [HOME_URL + '1', HOME_URL + '2'])
+        self.crawl_store.checkpoint()
+
+        crawl_store = self.reopen()
+        # unvisited urls are ordered by depth
+        self.assertEqual(list(crawl_store.iter_unvisited_urls()), [(HOME_URL + '1', 1), (HOME_URL + '2', 2)])
+        self.assertEqual(
+            list(crawl_store.iter_visited_urls()), [(HOME_URL + '3', make_result('404'), 'HTTPError')])
+        self.assertEqual(crawl_store.get_visited_url_test_result(HOME_URL + '3'), make_result('404'))
+        self.assertIsNone(crawl_store.get_visited_url_test_result(HOME_URL + '1'))
+        self.assertEqual(list(crawl_store.iter_page_links()), [(HOME_URL, [HOME_URL + '1', HOME_URL + '2'])])
+
+        # records are dropped unless resumed
+        crawl_store = self.reopen(resume=False)
+        self.assertEqual(list(crawl_store.iter_unvisited_urls()), [])
+        self.assertEqual(list(crawl_store.iter_visited_urls()), [])
+
+    def test_jobs(self):
+        self.assertEqual(self.crawl_store.start_job('', [HOME_URL]), 'started')
+        self.crawl_store.add_visited_url(HOME_URL, make_result('200'), None)
+        self.crawl_store.add_frontier_urls([HOME_URL + '1'], 1)
+        self.assertEqual(self.crawl_store.start_job('', [HOME_URL]), 'resumed')
+        self.crawl_store.checkpoint()
+
+        crawl_store = self.reopen()
+        self.assertEqual(crawl_store.start_job('', [HOME_URL]), 'resumed')
+        self.assertEqual(list(crawl_store.iter_unvisited_urls()), [(HOME_URL + '1', 1)])
+        crawl_store.finish_job('')
+        self.assertEqual(crawl_store.start_job('', [HOME_URL]), 'finished')
+
+        # seed urls are tested again in a new job of another cookie profile
+        self.assertEqual(crawl_store.start_job('a_1', [HOME_URL]), 'started')
+        self.assertEqual(list(crawl_store.iter_unvisited_urls()), [(HOME_URL, 0)])
+
+    def test_status_codes_and_referers(self):
+        self.crawl_store.add_visited_url(HOME_URL, make_result('200'), None)
+        self.crawl_store.add_visited_url(HOME_URL + '1', make_result('404'), 'HTTPError')
+        self.crawl_store.add_visited_url(HOME_URL + '2', make_result('404'), 'HTTPError')
+        self.crawl_store.add_page_links(HOME_URL, [HOME_URL + '1', HOME_URL + '2'])
+        self.crawl_store.add_page_links(HOME_URL + '3', [HOME_URL + '2'])
+        self.assertEqual(self.crawl_store.get_status_codes_count(), {'200': 1, '404': 2})
+        self.assertEqual(
+            self.crawl_store.get_visited_urls_of_status('404'),
+            {HOME_URL + '1': 'HTTPError', HOME_URL + '2': 'HTTPError'})
+
+        referers_dict = self.crawl_store.get_referers([HOME_URL + '1', HOME_URL + '2'], max_referers=1)
+        self.assertEqual(referers_dict[HOME_URL + '1'], [1, HOME_URL])
+        self.assertEqual(referers_dict[HOME_URL + '2'][0], 2)
+        self.assertEqual(len(referers_dict[HOME_URL + '2']), 2)
+
+
+class TestStoreUrlSet(unittest.TestCase):
+
+    def setUp(self):
+        self.store_folder = tempfile.mkdtemp()
+        self.store_file = os.path.join(self.store_folder, 'crawl_store.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.store_folder)
+
+    def test_urls_set(self):
+        crawl_store = CrawlStore(self.store_file, batch_size=2)
+        urls_set = StoreUrlSet(crawl_store, 'visited', initial_capacity=10)
+        for index in range(5):
+            self.assertTrue(urls_set.add(HOME_URL + str(index)))
+        self.assertFalse(urls_set.add(HOME_URL + '0'))
+        self.assertIn(HOME_URL + '4', urls_set)
+        self.assertNotIn(HOME_URL + '5', urls_set)
+        self.assertEqual(len(urls_set), 5)
+
+        urls_set.remove(HOME_URL + '4')
+        self.assertNotIn(HOME_URL + '4', urls_set)
+        crawl_store.checkpoint()
+
+        # urls are loaded when resumed, unless the set is cleared
+        crawl_store = CrawlStore(self.store_file, resume=True)
+        urls_set = StoreUrlSet(crawl_store, 'visited')
+        self.assertIn(HOME_URL + '3', urls_set)
+        self.assertEqual(len(urls_set), 4)
+        urls_set = StoreUrlSet(crawl_store, 'visited', clear=True)
+        self.assertNotIn(HOME_URL + '3', urls_set)
+        self.assertEqual(len(urls_set), 0)
+
+
+class TestCrawlResume(unittest.TestCase):
+
+    def setUp(self):
+        self.logs_folder = tempfile.mkdtemp()
+        self.store_file = os.path.join(self.logs_folder, 'crawl_store.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.logs_folder)
+
+    def test_interrupted_crawl_is_resumed(self):
+        crawl_store = CrawlStore(self.store_file)
+        crawl_store.start_job('', [HOME_URL])
+        crawl_store.add_visited_url(HOME_URL, make_result('200'), None)
+        crawl_store.add_visited_url(HOME_URL + '1', make_result('404'), 'HTTPError')
+        crawl_store.add_page_links(HOME_URL, [HOME_URL + '1', HOME_URL + '2'])
+        crawl_store.add_frontier_urls([HOME_URL + '1', HOME_URL + '2'], 1)
+        crawl_store.checkpoint()
+
+        web_crawler = WebCrawler(HOME_URL, [], self.logs_folder)
+        web_crawler.set_crawl_store(self.store_file, resume=True)
+        url_queue = web_crawler.url_queue
+        self.assertEqual(url_queue.get_visited_urls_count(), 2)
+        self.assertEqual(web_crawler.bad_urls_mapping, {HOME_URL + '1': 'HTTPError'})
+        self.assertEqual(web_crawler.link_graph.get_page_links(HOME_URL), [HOME_URL + '1', HOME_URL + '2'])
+
+        # only urls not visited before are crawled
+        self.assertTrue(web_crawler.start_crawl_store_job())
+        self.assertTrue(url_queue.is_url_visited(HOME_URL))
+        self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), (HOME_URL + '2', 1))
+        self.assertTrue(url_queue.is_unvisited_urls_empty())
+
+        web_crawler.crawl_store.finish_job('')
+        self.assertFalse(web_crawler.start_crawl_store_job())
+
+
+if __name__ == '__main__':
+    unittest.main()
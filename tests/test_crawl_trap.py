@@ -0,0 +1,48 @@
+#encoding=utf-8
+import unittest
+
+from webcrawler.crawl_trap import CrawlTrapDetector, format_url_pattern, get_url_pattern
+
+
+class TestUrlPattern(unittest.TestCase):
+
+    def test_get_url_pattern(self):
+        url_pattern = get_url_pattern('https://debugtalk.com/calendar/2018/05?view=day&page=3')
+        self.assertEqual(url_pattern, ('debugtalk.com', '/calendar/{n}/{n}', ('page', 'view')))
+        self.assertEqual(
+            get_url_pattern('https://debugtalk.com/calendar/2019/12?page=1&view=week'), url_pattern)
+        self.assertEqual(format_url_pattern(url_pattern), 'debugtalk.com/calendar/{n}/{n}?page=*&view=*')
+        self.assertEqual(format_url_pattern(get_url_pattern('http://debugtalk.com/a1')), 'debugtalk.com/a{n}')
+
+
+class TestCrawlTrapDetector(unittest.TestCase):
+
+    def test_max_urls_per_pattern(self):
+        crawl_trap_detector = CrawlTrapDetector(max_urls_per_pattern=3, max_repeated_segments=0)
+        urls = ['http://debugtalk.com/page/{}'.format(index) for index in range(5)]
+        self.assertEqual(crawl_trap_detector.filter_urls(urls[:2]), urls[:2])
+        self.assertEqual(crawl_trap_detector.filter_urls(urls[2:] + ['http://debugtalk.com/']),
+                         urls[2:3] + ['http://debugtalk.com/'])
+
+        stats = crawl_trap_detector.get_stats()
+        self.assertEqual((stats['pruned'], stats['pattern_limit'], stats['repeated_segments']), (2, 2, 0))
+        self.assertEqual(stats['top_patterns'], [('debugtalk.com/page/{n}', 2)])
+
+    def test_max_repeated_segments(self):
+        crawl_trap_detector = CrawlTrapDetector(max_urls_per_pattern=0, max_repeated_segments=2)
+        urls = ['http://debugtalk.com/a/b/a/b', 'http://debugtalk.com/a/b/a/b/a', 'http://debugtalk.com/']
+        self.assertEqual(crawl_trap_detector.filter_urls(urls), [urls[0], urls[2]])
+        stats = crawl_trap_detector.get_stats()
+        self.assertEqual((stats['pruned'], stats['pattern_limit'], stats['repeated_segments']), (1, 0, 1))
+
+    def test_top_patterns(self):
+        crawl_trap_detector = CrawlTrapDetector(max_urls_per_pattern=1, max_repeated_segments=0)
+        crawl_trap_detector.filter_urls(['http://debugtalk.com/a/{}'.format(index) for index in range(4)])
+        crawl_trap_detector.filter_urls(['http://debugtalk.com/b/{}'.format(index) for index in range(3)])
+        self.assertEqual(crawl_trap_detector.get_stats()['top_patterns'],
+                         [('debugtalk.com/a/{n}', 3), ('debugtalk.com/b/{n}', 2)])
+        self.assertEqual(crawl_trap_detector.get_stats(1)['top_patterns'], [('debugtalk.com/a/{n}', 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#encoding=utf-8
+import shutil
+import tempfile
+import unittest
+
+from webcrawler.core import WebCrawler
+from webcrawler.distributed import FrontierService, WorkerWebCrawler, parse_address
+
+HOME_URL = 'http://a.com/'
+
+
+def make_result(url, depth, status_code='200', hyper_links=None):
+    return {
+        'url': url,
+        'depth': depth,
+        'status_code': status_code,
+        'duration_time': 0.1,
+        'md5': None,
+        'hyper_links': hyper_links,
+        'exception_str': None,
+        'truncated_size': None
+    }
+
+
+class TestFrontierService(unittest.TestCase):
+
+    def setUp(self):
+        self.logs_folder = tempfile.mkdtemp()
+        self.web_crawler = WebCrawler(HOME_URL, [], self.logs_folder)
+        self.web_crawler.url_queue.add_unvisited_urls([HOME_URL])
+        self.frontier = FrontierService(self.web_crawler, 2)
+        # job is set as run_job does, without waiting for it to be done
+        self.frontier.job = {'job_id': 1, 'cookies': {}, 'max_depth': 1}
+
+    def tearDown(self):
+        shutil.rmtree(self.logs_folder)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('127.0.0.1:8530'), ('127.0.0.1', 8530))
+
+    def test_lease_depth_by_depth(self):
+        lease = self.frontier.lease(0, 20)
+        self.assertEqual((lease['state'], lease['job_id'], lease['urls']), ('crawl', 1, [(HOME_URL, 0)]))
+        self.assertEqual(self.frontier.lease(1, 20)['state'], 'wait')
+
+        hyper_links = [HOME_URL + '1', HOME_URL + '2']
+        self.frontier.report(lease['lease_id'], [make_result(HOME_URL, 0, hyper_links=hyper_links)])
+        self.assertTrue(self.web_crawler.url_queue.is_url_visited(HOME_URL))
+        self.assertEqual(sorted(self.web_crawler.link_graph.get_page_links(HOME_URL)), hyper_links)
+
+        # urls of next depth are leased when all urls of current depth are done, stealing from other shards
+        leased_urls = self.frontier.lease(0, 1)['urls'] + self.frontier.lease(0, 1)['urls']
+        self.assertEqual(sorted(leased_urls), [(HOME_URL + '1', 1), (HOME_URL + '2', 1)])
+        self.assertFalse(self.frontier.job_done.is_set())
+
+    def test_job_done(self):
+        lease = self.frontier.lease(0, 20)
+        self.frontier.report(lease['lease_id'], [make_result(HOME_URL, 0, '404')])
+        self.assertTrue(self.frontier.job_done.is_set())
+        self.assertEqual(self.frontier.lease(0, 20)['state'], 'wait')
+
+        self.frontier.finish()
+        self.assertEqual(self.frontier.lease(0, 20)['state'], 'finished')
+
+    def test_expired_lease_is_issued_again(self):
+        lease = self.frontier.lease(0, 20)
+        self.frontier.lease_timeout = 0
+        expired_lease_id = lease['lease_id']
+        lease = self.frontier.lease(1, 20)
+        self.assertEqual(lease['state'], 'crawl')
+        self.assertNotEqual(lease['lease_id'], expired_lease_id)
+        self.assertEqual(lease['urls'], [(HOME_URL, 0)])
+
+        # results of expired lease are ignored
+        self.frontier.report(expired_lease_id, [make_result(HOME_URL, 0)])
+        self.assertFalse(self.web_crawler.url_queue.is_url_visited(HOME_URL))
+        self.frontier.report(lease['lease_id'], [make_result(HOME_URL, 0)])
+        self.assertTrue(self.web_crawler.url_queue.is_url_visited(HOME_URL))
+        self.assertTrue(self.frontier.job_done.is_set())
+
+    def test_authkey_is_required(self):
+        with self.assertRaises(ValueError):
+            self.frontier.serve(('127.0.0.1', 0))
+
+        worker_web_crawler = WorkerWebCrawler(HOME_URL, [], self.logs_folder)
+        with self.assertRaises(ValueError):
+            worker_web_crawler.run_worker(('127.0.0.1', 0), 0, 1)
+
+        self.web_crawler.distributed_config['authkey'] = 12345
+        self.assertEqual(self.web_crawler.get_distributed_authkey(), b'12345')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#encoding=utf-8
+import time
+import socket
+import threading
+import unittest
+
+from webcrawler.dns_cache import DnsCache
+
+ADDRESSES = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 80))]
+
+
+class FakeResolver(object):
+
+    def __init__(self, errors=None, delay=0):
+        self.errors = errors or {}
+        self.delay = delay
+        self.lookups = []
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        self.lookups.append((host, port))
+        time.sleep(self.delay)
+        if host in self.errors:
+            raise socket.gaierror(self.errors[host], 'fake error')
+        return list(ADDRESSES)
+
+
+class TestDnsCache(unittest.TestCase):
+
+    def make_dns_cache(self, resolver, ttl=300, negative_ttl=30):
+        dns_cache = DnsCache(ttl, negative_ttl, 1)
+        dns_cache.original_getaddrinfo = resolver.getaddrinfo
+        return dns_cache
+
+    def test_cache_addresses(self):
+        resolver = FakeResolver()
+        dns_cache = self.make_dns_cache(resolver)
+        self.assertEqual(dns_cache.getaddrinfo('a.com', 80, 0, socket.SOCK_STREAM), ADDRESSES)
+        self.assertEqual(dns_cache.getaddrinfo('a.com', 80, 0, socket.SOCK_STREAM), ADDRESSES)
+        # lookups with other args are cached separately
+        dns_cache.getaddrinfo('a.com', 443, 0, socket.SOCK_STREAM)
+        self.assertEqual(resolver.lookups, [('a.com', 80), ('a.com', 443)])
+        stats = dns_cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_addresses_expire(self):
+        resolver = FakeResolver()
+        dns_cache = self.make_dns_cache(resolver, ttl=0.1)
+        dns_cache.getaddrinfo('a.com', 80)
+        time.sleep(0.2)
+        dns_cache.getaddrinfo('a.com', 80)
+        self.assertEqual(len(resolver.lookups), 2)
+
+    def test_negative_cache_nonexistent_hosts(self):
+        resolver = FakeResolver({'nonexistent.com': socket.EAI_NONAME, 'timeout.com': socket.EAI_AGAIN})
+        dns_cache = self.make_dns_cache(resolver)
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror) as context:
+                dns_cache.getaddrinfo('nonexistent.com', 80, 0, socket.SOCK_STREAM)
+            self.assertEqual(context.exception.errno, socket.EAI_NONAME)
+        self.assertEqual(len(resolver.lookups), 1)
+        self.assertTrue(dns_cache.is_unresolvable('nonexistent.com', 80))
+        self.assertFalse(dns_cache.is_unresolvable('nonexistent.com', 443))
+
+        # transient failures are not cached
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                dns_cache.getaddrinfo('timeout.com', 80, 0, socket.SOCK_STREAM)
+        self.assertEqual(len(resolver.lookups), 3)
+        self.assertFalse(dns_cache.is_unresolvable('timeout.com', 80))
+
+        stats = dns_cache.get_stats()
+        self.assertEqual((stats['failed'], stats['unresolvable']), (3, 1))
+
+    def test_negative_cache_disabled(self):
+        resolver = FakeResolver({'nonexistent.com': socket.EAI_NONAME})
+        dns_cache = self.make_dns_cache(resolver, negative_ttl=0)
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                dns_cache.getaddrinfo('nonexistent.com', 80)
+        self.assertEqual(len(resolver.lookups), 2)
+        self.assertFalse(dns_cache.is_unresolvable('nonexistent.com', 80))
+
+    def test_concurrent_lookups_wait_for_one_in_flight(self):
+        resolver = FakeResolver(delay=0.2)
+        dns_cache = self.make_dns_cache(resolver)
+        threads = [threading.Thread(target=dns_cache.getaddrinfo, args=('a.com', 80)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(resolver.lookups), 1)
+
+    def test_prefetch(self):
+        resolver = FakeResolver()
+        dns_cache = self.make_dns_cache(resolver)
+        dns_cache.prefetch('a.com', 80)
+        dns_cache.prefetch('a.com', 80)
+        dns_cache.prefetch_executor.shutdown(wait=True)
+        self.assertEqual(resolver.lookups, [('a.com', 80)])
+        self.assertEqual(dns_cache.get_stats()['prefetched'], 1)
+        dns_cache.getaddrinfo('a.com', 80, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        self.assertEqual(len(resolver.lookups), 1)
+
+    def test_install_until_uninstalled_as_many_times(self):
+        original_getaddrinfo = socket.getaddrinfo
+        dns_cache = DnsCache(300, 30, 1)
+        try:
+            dns_cache.install()
+            dns_cache.install()
+            self.assertEqual(socket.getaddrinfo, dns_cache.getaddrinfo)
+            dns_cache.uninstall()
+            self.assertEqual(socket.getaddrinfo, dns_cache.getaddrinfo)
+            dns_cache.uninstall()
+            self.assertIs(socket.getaddrinfo, original_getaddrinfo)
+        finally:
+            socket.getaddrinfo = original_getaddrinfo
+
+
+if __name__ == '__main__':
+    unittest.main()
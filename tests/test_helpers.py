@@ -0,0 +1,98 @@
+#encoding=utf-8
+import unittest
+
+from webcrawler import helpers
+from webcrawler.lru_cache import LRUCache
+from webcrawler.url_rules import PrefixMatcher
+
+RAW_LINKS = [
+    'https://store.debugtalk.com/product/phantom-4-pro',
+    'http://store.debugtalk.com/product/osmo?color=black#specs',
+    '//asset1.xcdn.com/assets/xxx.png',
+    '//asset1.xcdn.com/assets/xxx.png?v=2',
+    '/category/phantom',
+    '/category/phantom?page=2&sort=price',
+    '/',
+    'mavic-pro',
+    'mavic-pro?from=osmo',
+    '../compare-phantom-3',
+    '../../compare-phantom-3',
+    './spark',
+    '#top',
+    '?page=3',
+    '  /category/inspire  ',
+    '',
+    '   ',
+    'mailto:mail@debugtalk.com',
+    'javascript:void(0)',
+    'tel:+8612345678',
+    '\\"https:\\/\\/store.debugtalk.com\\/guides\\/"',
+    'https://store.debugtalk.com/中文',
+]
+
+
+class TestParseUrls(unittest.TestCase):
+
+    def assert_parse_urls_equal_parse_url(self, referer_url, ignore_startswith_strs=()):
+        expected_urls_set = set(
+            helpers.parse_url(url, referer_url, ignore_startswith_strs) for url in RAW_LINKS
+        ) - {None}
+        self.assertEqual(
+            helpers.parse_urls(RAW_LINKS, referer_url, ignore_startswith_strs), expected_urls_set)
+
+    def test_parse_urls_equal_parse_url(self):
+        for referer_url in [
+                'https://store.debugtalk.com/product/osmo',
+                'https://store.debugtalk.com/product/osmo/',
+                'https://store.debugtalk.com/',
+                'http://store.debugtalk.com:8080/a/b/c?x=1#y']:
+            self.assert_parse_urls_equal_parse_url(referer_url)
+            self.assert_parse_urls_equal_parse_url(referer_url, ('mailto:', 'javascript', 'tel:'))
+
+    def test_ignore_prefix_matcher(self):
+        ignore_prefix_matcher = PrefixMatcher(['mailto:', 'javascript', '#'])
+        parsed_urls_set = helpers.parse_urls(
+            RAW_LINKS, 'https://store.debugtalk.com/product/osmo', ignore_prefix_matcher)
+        self.assertIn('https://store.debugtalk.com/product/mavic-pro', parsed_urls_set)
+        self.assertIn('https://store.debugtalk.com/compare-phantom-3', parsed_urls_set)
+        self.assertIn('http://asset1.xcdn.com/assets/xxx.png', parsed_urls_set)
+        self.assertIn('https://store.debugtalk.com/guides/', parsed_urls_set)
+        self.assertIn('tel:+8612345678', parsed_urls_set)
+        self.assertNotIn('mailto:mail@debugtalk.com', parsed_urls_set)
+        self.assertNotIn('javascript:void(0)', parsed_urls_set)
+        self.assertEqual(parsed_urls_set, helpers.parse_urls(
+            RAW_LINKS, 'https://store.debugtalk.com/product/osmo', ('mailto:', 'javascript', '#')))
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evict_least_recently_used(self):
+        lru_cache = LRUCache(2)
+        lru_cache.set('a', 1)
+        lru_cache.set('b', 2)
+        self.assertEqual(lru_cache.get('a'), 1)
+        lru_cache.set('c', 3)
+        self.assertIsNone(lru_cache.get('b'))
+        self.assertEqual(lru_cache.get('a'), 1)
+        self.assertEqual(lru_cache.get('c'), 3)
+        self.assertEqual(lru_cache.get('d', 0), 0)
+
+        stats = lru_cache.get_stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (2, 3, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 0.6)
+
+    def test_resize_and_clear(self):
+        lru_cache = LRUCache(3)
+        for key in 'abc':
+            lru_cache.set(key, key)
+        lru_cache.resize(1)
+        self.assertEqual(lru_cache.get_stats()['size'], 1)
+        self.assertEqual(lru_cache.get('c'), 'c')
+
+        lru_cache.clear()
+        self.assertEqual(
+            lru_cache.get_stats(), {'size': 0, 'maxsize': 1, 'hits': 0, 'misses': 0, 'hit_rate': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
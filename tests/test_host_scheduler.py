@@ -0,0 +1,210 @@
+#encoding=utf-8
+import os
+import time
+import random
+import shutil
+import logging
+import tempfile
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+from webcrawler import helpers
+from webcrawler.core import WebCrawler
+from webcrawler.host_scheduler import HostScheduler, is_backoff_status
+
+PAGES_NUMBER = 60
+FAN_OUT = 3
+
+
+class TestIsBackoffStatus(unittest.TestCase):
+
+    def test_backoff_status(self):
+        for status_code in ['429', '500', '503', 'Timeout', 'ConnectionError']:
+            self.assertTrue(is_backoff_status(status_code))
+        for status_code in ['200', '304', '404', 'SSLError', 'InvalidSchema']:
+            self.assertFalse(is_backoff_status(status_code))
+
+
+class TestHostScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.host_scheduler = HostScheduler(8, 2, min_concurrency=1)
+
+    def get_limit(self, host='a.com'):
+        return self.host_scheduler.hosts_state[host].limit
+
+    def test_max_concurrency(self):
+        self.assertTrue(self.host_scheduler.try_acquire('b.com', False))
+        self.assertTrue(self.host_scheduler.try_acquire('b.com', False))
+        self.assertFalse(self.host_scheduler.try_acquire('b.com', False))
+        # limits are kept per host
+        self.assertTrue(self.host_scheduler.try_acquire('c.com', False))
+        for _ in range(8):
+            self.assertTrue(self.host_scheduler.try_acquire('a.com', True))
+        self.assertFalse(self.host_scheduler.try_acquire('a.com', True))
+
+    def test_backoff(self):
+        for status_code in ['429', '503', 'Timeout']:
+            host_scheduler = HostScheduler(8, 8, min_concurrency=1)
+            host_scheduler.try_acquire('a.com', True)
+            host_scheduler.release('a.com', status_code, 0.1)
+            self.assertEqual(host_scheduler.hosts_state['a.com'].limit, 4)
+
+    def test_backoff_once_per_round_trip(self):
+        for _ in range(3):
+            self.host_scheduler.try_acquire('a.com', True)
+        self.host_scheduler.release('a.com', '200', 10)
+        self.host_scheduler.release('a.com', '503', 10)
+        self.host_scheduler.release('a.com', '503', 10)
+        self.assertEqual(int(self.get_limit()), 4)
+
+    def test_backoff_to_min_concurrency(self):
+        host_scheduler = HostScheduler(8, 8, min_concurrency=2)
+        for _ in range(5):
+            host_scheduler.try_acquire('a.com', True)
+            host_scheduler.release('a.com', '429', 0)
+        self.assertEqual(host_scheduler.hosts_state['a.com'].limit, 2)
+
+    def test_rising_latency(self):
+        self.host_scheduler.try_acquire('a.com', True)
+        self.host_scheduler.release('a.com', '200', 0.01)
+        self.host_scheduler.try_acquire('a.com', True)
+        self.host_scheduler.release('a.com', '200', 1)
+        self.assertEqual(int(self.get_limit()), 4)
+        self.assertEqual(self.host_scheduler.get_stats()[0]['backoff'], 1)
+
+    def test_additive_ramp_up(self):
+        host_scheduler = HostScheduler(8, 8, min_concurrency=1)
+        host_scheduler.try_acquire('a.com', True)
+        host_scheduler.release('a.com', '429', 0)
+        self.assertEqual(host_scheduler.hosts_state['a.com'].limit, 4)
+
+        # about one more request per round trip of limit requests
+        for _ in range(4):
+            host_scheduler.try_acquire('a.com', True)
+            host_scheduler.release('a.com', '200', 0)
+        self.assertEqual(int(host_scheduler.hosts_state['a.com'].limit), 4)
+        for _ in range(4):
+            host_scheduler.try_acquire('a.com', True)
+            host_scheduler.release('a.com', '200', 0)
+        self.assertEqual(int(host_scheduler.hosts_state['a.com'].limit), 5)
+
+        for _ in range(100):
+            host_scheduler.try_acquire('a.com', True)
+            host_scheduler.release('a.com', '200', 0)
+        self.assertEqual(host_scheduler.hosts_state['a.com'].limit, 8)
+
+    def test_defer_and_put_back_in_order(self):
+        put_back_requests = []
+        self.assertTrue(self.host_scheduler.acquire_or_defer('b.com', False, None))
+        self.assertTrue(self.host_scheduler.acquire_or_defer('b.com', False, None))
+        for index in range(3):
+            self.assertFalse(self.host_scheduler.acquire_or_defer(
+                'b.com', False, lambda index=index: put_back_requests.append(index)))
+
+        # one deferred request is called back when a request of the host is done
+        self.host_scheduler.release('b.com', '200', 0.1)
+        self.assertEqual(put_back_requests, [0])
+        self.assertTrue(self.host_scheduler.acquire_or_defer('b.com', False, None))
+        self.host_scheduler.release('b.com', '200', 0.1)
+        self.host_scheduler.release('b.com', '200', 0.1)
+        self.assertEqual(put_back_requests, [0, 1, 2])
+
+        stats = self.host_scheduler.get_stats()[0]
+        self.assertEqual((stats['host'], stats['requests'], stats['deferred']), ('b.com', 3, 3))
+
+    def test_acquire_blocks_until_release(self):
+        self.host_scheduler.try_acquire('b.com', False)
+        self.host_scheduler.try_acquire('b.com', False)
+        release_timer = threading.Timer(0.1, self.host_scheduler.release, ('b.com', '200', 0.1))
+        release_timer.start()
+        start_time = time.time()
+        self.host_scheduler.acquire('b.com', False)
+        self.assertGreaterEqual(time.time() - start_time, 0.05)
+        release_timer.join()
+
+
+class SyntheticSiteHandler(BaseHTTPRequestHandler):
+    """ pages form a tree with cross links to random pages, and respond with random delays,
+        thus pages are often linked by deeper pages first in pipelined crawl.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_page(self, with_body):
+        time.sleep(random.random() * 0.02)
+        page_index = int(self.path.rsplit('/', 1)[1])
+        links = []
+        # pages out of the site are leaves
+        if page_index < PAGES_NUMBER:
+            links = ['/page/{}'.format(page_index * FAN_OUT + child + 1) for child in range(FAN_OUT)]
+            links.append('/page/{}'.format(random.Random(page_index).randrange(PAGES_NUMBER * 2)))
+        body = ''.join('<a href="{}">link</a>'.format(link) for link in links).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.send_page(True)
+
+    def do_HEAD(self):
+        self.send_page(False)
+
+
+class TestHostSchedulerCrawl(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), SyntheticSiteHandler)
+        cls.server.daemon_threads = True
+        server_thread = threading.Thread(target=cls.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        cls.site_url = 'http://127.0.0.1:{}/page/0'.format(cls.server.server_address[1])
+
+        cls.logs_folder = tempfile.mkdtemp()
+        config_dict = helpers.load_yaml_file(
+            os.path.join(os.path.dirname(helpers.__file__), 'default_config.yml'))
+        config_dict['host_scheduler'].update({'enabled': True, 'internal_max_concurrency': 4})
+        cls.config_file = os.path.join(cls.logs_folder, 'config.yml')
+        helpers.save_to_yaml(config_dict, cls.config_file)
+        logging.getLogger().setLevel(logging.WARNING)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.logs_folder)
+
+    def crawl(self, crawl_mode):
+        web_crawler = WebCrawler(self.site_url, [], self.logs_folder, self.config_file)
+        web_crawler.start({}, crawl_mode, 4, 16)
+        return {
+            url: url_test_res['status_code']
+            for url, url_test_res in web_crawler.url_queue.get_visited_urls().items()
+        }
+
+    def test_deferred_urls_keep_bfs_depth(self):
+        bfs_results = self.crawl('BFS')
+        self.assertGreater(len(bfs_results), 100)
+        for crawl_mode in ['PIPELINE', 'PRIORITY']:
+            self.assertEqual(self.crawl(crawl_mode), bfs_results)
+
+
+if __name__ == '__main__':
+    unittest.main()
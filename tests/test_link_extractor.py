@@ -0,0 +1,61 @@
+#encoding=utf-8
+import hashlib
+import unittest
+
+from webcrawler.link_extractor import StreamingLinksExtractor
+
+PAGE_CONTENT = b'<html><head><link href="/style.css"><script src="/app.js">var a = "<b>";</script></head>' \
+    b'<body><p>hello world</p><a href="/1">one</a><img src="/logo.png"><a name="top">top</a>' \
+    b'<a href="/2">two</a></body></html>'
+
+
+def feed_chunks(links_extractor, content, chunk_size):
+    for index in range(0, len(content), chunk_size):
+        if not links_extractor.feed(content[index:index+chunk_size]):
+            break
+    return links_extractor.finish()
+
+
+class TestStreamingLinksExtractor(unittest.TestCase):
+
+    def test_extract_links(self):
+        for chunk_size in [7, 64, len(PAGE_CONTENT)]:
+            links_extractor = StreamingLinksExtractor()
+            self.assertEqual(
+                feed_chunks(links_extractor, PAGE_CONTENT, chunk_size),
+                {'/style.css', '/app.js', '/1', '/logo.png', '/2'})
+            self.assertFalse(links_extractor.truncated)
+            self.assertEqual(links_extractor.body_size, len(PAGE_CONTENT))
+            self.assertEqual(links_extractor.get_md5(), hashlib.md5(PAGE_CONTENT).hexdigest())
+
+    def test_keep_text(self):
+        links_extractor = StreamingLinksExtractor(keep_text=True)
+        feed_chunks(links_extractor, PAGE_CONTENT, 16)
+        text = links_extractor.get_text()
+        self.assertIn('hello world', text)
+        self.assertNotIn('var a', text)
+        self.assertEqual(StreamingLinksExtractor().get_text(), '')
+
+    def test_truncated_at_max_body_size(self):
+        max_body_size = PAGE_CONTENT.index(b'<a href="/2">')
+        links_extractor = StreamingLinksExtractor(max_body_size)
+        self.assertEqual(
+            feed_chunks(links_extractor, PAGE_CONTENT, 10), {'/style.css', '/app.js', '/1', '/logo.png'})
+        self.assertTrue(links_extractor.truncated)
+        self.assertEqual(links_extractor.body_size, max_body_size)
+        # md5 of parsed bytes
+        self.assertEqual(links_extractor.get_md5(), hashlib.md5(PAGE_CONTENT[:max_body_size]).hexdigest())
+
+        # page of max body size is not truncated
+        links_extractor = StreamingLinksExtractor(len(PAGE_CONTENT))
+        feed_chunks(links_extractor, PAGE_CONTENT, 10)
+        self.assertFalse(links_extractor.truncated)
+
+    def test_empty_page(self):
+        links_extractor = StreamingLinksExtractor()
+        self.assertEqual(links_extractor.finish(), set())
+        self.assertEqual(links_extractor.get_md5(), hashlib.md5(b'').hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#encoding=utf-8
+import shutil
+import tempfile
+import unittest
+
+from webcrawler.core import WebCrawler
+from webcrawler.link_graph import LinkGraph, CompactLinkGraph
+
+HOME_URL = 'http://a.com/'
+
+
+class TestLinkGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.link_graph = LinkGraph()
+        self.link_graph.add_page_links(HOME_URL, [HOME_URL + '1', HOME_URL + '2'])
+        self.link_graph.add_page_links(HOME_URL + '1', [HOME_URL + '2', HOME_URL])
+
+    def test_page_links(self):
+        self.assertIn(HOME_URL, self.link_graph)
+        self.assertNotIn(HOME_URL + '2', self.link_graph)
+        self.assertEqual(len(self.link_graph), 2)
+        self.assertEqual(self.link_graph.get_page_links(HOME_URL + '1'), [HOME_URL + '2', HOME_URL])
+        self.assertIsNone(self.link_graph.get_page_links(HOME_URL + '2'))
+        self.assertIsNone(self.link_graph.get_page_links('http://b.com/'))
+        self.assertEqual(self.link_graph.to_dict(), {
+            HOME_URL: [HOME_URL + '1', HOME_URL + '2'],
+            HOME_URL + '1': [HOME_URL + '2', HOME_URL]
+        })
+
+    def test_links_are_added_once(self):
+        self.assertFalse(self.link_graph.add_page_links(HOME_URL, [HOME_URL + '3']))
+        self.assertEqual(self.link_graph.get_page_links(HOME_URL), [HOME_URL + '1', HOME_URL + '2'])
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + '3'), 0)
+
+    def test_referers(self):
+        self.assertEqual(self.link_graph.get_referer_urls(HOME_URL + '2'), {HOME_URL, HOME_URL + '1'})
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + '2'), 2)
+        self.assertEqual(self.link_graph.get_first_referer_url(HOME_URL + '2'), HOME_URL)
+        self.assertEqual(self.link_graph.get_referer_urls('http://b.com/'), set())
+        self.assertEqual(self.link_graph.get_referers_count('http://b.com/'), 0)
+        self.assertIsNone(self.link_graph.get_first_referer_url('http://b.com/'))
+
+    def test_link_keys(self):
+        # raw links are kept, referers are indexed by link keys
+        self.link_graph.add_page_links(
+            HOME_URL + '2', ['http://A.com/3?utm_source=x', HOME_URL + '3'], [HOME_URL + '3', HOME_URL + '3'])
+        self.assertEqual(
+            self.link_graph.get_page_links(HOME_URL + '2'), ['http://A.com/3?utm_source=x', HOME_URL + '3'])
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + '3'), 1)
+        self.assertEqual(self.link_graph.get_referers_count('http://A.com/3?utm_source=x'), 0)
+
+
+class TestCompactLinkGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.results = {}
+        self.link_graph = CompactLinkGraph(
+            lambda url: url in self.results,
+            lambda url: self.results.get(url, '').startswith('2'),
+            max_referers=2
+        )
+
+    def set_url_tested(self, url, status_code):
+        self.results[url] = status_code
+        self.link_graph.set_url_tested(url, status_code)
+
+    def test_page_links_are_kept_until_tested(self):
+        self.link_graph.add_page_links(HOME_URL, [HOME_URL + '1'])
+        self.assertIn(HOME_URL, self.link_graph)
+        self.assertEqual(self.link_graph.get_page_links(HOME_URL), [HOME_URL + '1'])
+
+        self.set_url_tested(HOME_URL, '200')
+        self.assertNotIn(HOME_URL, self.link_graph)
+        self.assertIsNone(self.link_graph.get_page_links(HOME_URL))
+        self.assertEqual(self.link_graph.to_dict(), {})
+        self.assertEqual(len(self.link_graph), 1)
+
+    def test_links_of_tested_page_are_not_kept(self):
+        self.results[HOME_URL] = '200'
+        self.link_graph.add_page_links(HOME_URL, [HOME_URL + '1'])
+        self.assertIsNone(self.link_graph.get_page_links(HOME_URL))
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + '1'), 1)
+
+    def test_referers(self):
+        for index in range(4):
+            self.link_graph.add_page_links(HOME_URL + str(index), [HOME_URL + 'x', HOME_URL + 'y'])
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + 'x'), 4)
+        self.assertEqual(self.link_graph.get_referer_urls(HOME_URL + 'x'), {HOME_URL + '0', HOME_URL + '1'})
+        self.assertEqual(self.link_graph.get_first_referer_url(HOME_URL + 'x'), HOME_URL + '0')
+
+        # referers are only kept for failed urls
+        self.set_url_tested(HOME_URL + 'x', '404')
+        self.set_url_tested(HOME_URL + 'y', '200')
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + 'x'), 4)
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + 'y'), 0)
+        self.link_graph.add_page_links(HOME_URL + '4', [HOME_URL + 'y'])
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + 'y'), 0)
+
+    def test_no_failed_referers(self):
+        link_graph = CompactLinkGraph(lambda url: False, lambda url: False, failed_referers=False)
+        link_graph.add_page_links(HOME_URL, [HOME_URL + 'x'])
+        link_graph.set_url_tested(HOME_URL + 'x', '404')
+        self.assertEqual(link_graph.get_referers_count(HOME_URL + 'x'), 0)
+
+    def test_link_keys(self):
+        self.link_graph.add_page_links(
+            HOME_URL, [HOME_URL + 'x?utm_source=y', HOME_URL + 'x'], [HOME_URL + 'x', HOME_URL + 'x'])
+        self.assertEqual(
+            self.link_graph.get_page_links(HOME_URL), [HOME_URL + 'x?utm_source=y', HOME_URL + 'x'])
+        self.assertEqual(self.link_graph.get_referers_count(HOME_URL + 'x'), 1)
+
+
+class TestWebUrlsMapping(unittest.TestCase):
+
+    def setUp(self):
+        self.logs_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.logs_folder)
+
+    def test_web_urls_mapping(self):
+        web_crawler = WebCrawler(HOME_URL, [], self.logs_folder)
+        web_crawler.link_graph.add_page_links(HOME_URL, [HOME_URL + '1'])
+        self.assertEqual(web_crawler.web_urls_mapping, {HOME_URL: [HOME_URL + '1']})
+        with self.assertRaises(AttributeError):
+            web_crawler.web_urls_mapping = {}
+
+
+if __name__ == '__main__':
+    unittest.main()
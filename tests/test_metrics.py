@@ -0,0 +1,107 @@
+#encoding=utf-8
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from webcrawler.metrics import CrawlMetrics, Histogram, add_connect_time, pop_connect_time
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = Histogram([0.1, 1, 10])
+        self.assertEqual(histogram.get_percentile(50), 0)
+        for value in [0.05, 0.1, 0.5, 0.5, 20]:
+            histogram.observe(value)
+        self.assertEqual(histogram.bucket_counts, [2, 2, 0, 1])
+        self.assertEqual(histogram.get_percentile(40), 0.1)
+        self.assertEqual(histogram.get_percentile(50), 1)
+        self.assertEqual(histogram.get_percentile(99), float('inf'))
+
+        merged_histogram = Histogram([0.1, 1, 10])
+        merged_histogram.merge(histogram)
+        merged_histogram.merge(histogram)
+        self.assertEqual((merged_histogram.count, merged_histogram.sum), (10, 42.3))
+
+
+class TestConnectTime(unittest.TestCase):
+
+    def test_connect_time_per_thread(self):
+        # reset time of connections made by former tests
+        pop_connect_time()
+        add_connect_time(0.1)
+        add_connect_time(0.2)
+
+        def pop_in_other_thread():
+            connect_times.append(pop_connect_time())
+
+        connect_times = []
+        other_thread = threading.Thread(target=pop_in_other_thread)
+        other_thread.start()
+        other_thread.join()
+        self.assertEqual(connect_times, [None])
+        self.assertAlmostEqual(pop_connect_time(), 0.3)
+        self.assertIsNone(pop_connect_time())
+
+
+class TestCrawlMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = CrawlMetrics([1, 0.1])
+        self.metrics.observe_phase('ttfb', 'a.com', 0.05)
+        self.metrics.observe_phase('ttfb', 'b.com', 0.5)
+        self.metrics.observe_phase('connect', 'a.com', 0.01)
+        self.metrics.observe_url('a.com', '200', 0.5)
+        self.metrics.observe_url('a"b.com', '404', 2)
+
+    def test_phases_summary(self):
+        with self.metrics.time_phase('parse', 'a.com'):
+            pass
+        summary = self.metrics.get_phases_summary()
+        # ordered by phases of testing a url
+        self.assertEqual([phase_summary['phase'] for phase_summary in summary], ['connect', 'ttfb', 'parse'])
+        self.assertEqual(summary[1], {
+            'phase': 'ttfb',
+            'count': 2,
+            'sum': 0.55,
+            'avg': 0.275,
+            'p50': 0.1,
+            'p99': 1.0
+        })
+
+    def test_prometheus_text(self):
+        lines = self.metrics.get_prometheus_text().splitlines()
+        self.assertEqual(lines[:2], [
+            '# HELP webcrawler_phase_duration_seconds Duration of each phase of testing urls.',
+            '# TYPE webcrawler_phase_duration_seconds histogram'
+        ])
+        # buckets are cumulative and sorted, series are sorted by labels
+        self.assertEqual(lines[2:7], [
+            'webcrawler_phase_duration_seconds_bucket{phase="connect",host="a.com",le="0.1"} 1',
+            'webcrawler_phase_duration_seconds_bucket{phase="connect",host="a.com",le="1.0"} 1',
+            'webcrawler_phase_duration_seconds_bucket{phase="connect",host="a.com",le="+Inf"} 1',
+            'webcrawler_phase_duration_seconds_sum{phase="connect",host="a.com"} 0.01',
+            'webcrawler_phase_duration_seconds_count{phase="connect",host="a.com"} 1'
+        ])
+        self.assertIn('# TYPE webcrawler_url_duration_seconds histogram', lines)
+        # label values are escaped
+        self.assertIn(
+            'webcrawler_url_duration_seconds_bucket{host="a\\"b.com",status_code="404",le="1.0"} 0', lines)
+        self.assertEqual(lines[-1], 'webcrawler_url_duration_seconds_count{host="a.com",status_code="200"} 1')
+
+    def test_write_prometheus_file(self):
+        metrics_folder = tempfile.mkdtemp()
+        try:
+            metrics_file = os.path.join(metrics_folder, 'metrics.prom')
+            self.metrics.write_prometheus_file(metrics_file)
+            with open(metrics_file) as f:
+                self.assertEqual(f.read(), self.metrics.get_prometheus_text())
+            self.assertEqual(os.listdir(metrics_folder), ['metrics.prom'])
+        finally:
+            shutil.rmtree(metrics_folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#encoding=utf-8
+import unittest
+
+from webcrawler import helpers
+from webcrawler.parse_pool import ParsePool, parse_pages_links
+
+HOME_URL = 'http://a.com/'
+
+
+def make_page(page_index):
+    return '<a href="/{0}">{0}</a><a href="mailto:a@a.com">mail</a><img src="logo.png">' \
+        .format(page_index).encode('utf-8')
+
+
+class TestParsePool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parse_pool = ParsePool(2, ('mailto:',), batch_size=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parse_pool.shutdown()
+
+    def test_parse_pages_links(self):
+        self.assertEqual(
+            parse_pages_links([(HOME_URL, make_page(1)), (HOME_URL, b'')]),
+            [(helpers.parse_urls({'/1', 'mailto:a@a.com', 'logo.png'}, HOME_URL), None), (set(), None)])
+
+    def test_parse_pages_in_batches(self):
+        # pages more than batch size, and a batch flushed by timeout
+        futures = [self.parse_pool.submit_page(HOME_URL, make_page(index)) for index in range(10)]
+        for index, future in enumerate(futures):
+            self.assertEqual(future.result(10), {HOME_URL + str(index), HOME_URL + 'logo.png'})
+
+    def test_shut_down(self):
+        parse_pool = ParsePool(1)
+        parse_pool.shutdown()
+        future = parse_pool.submit_page(HOME_URL, make_page(1))
+        with self.assertRaises(RuntimeError):
+            future.result(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
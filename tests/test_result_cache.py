@@ -0,0 +1,56 @@
+#encoding=utf-8
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from webcrawler.result_cache import ResultCache
+
+HOME_URL = 'http://a.com/'
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.cache_folder, 'cache', 'result_cache.db')
+        self.result_cache = ResultCache(self.cache_file, {'2xx': 60, 404: 1, 'Timeout': 30, 'default': 0})
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_folder)
+
+    def test_ttl(self):
+        # looked up by status code, status class, and then default
+        self.assertEqual(self.result_cache.get_ttl('200'), 60)
+        self.assertEqual(self.result_cache.get_ttl('404'), 1)
+        self.assertEqual(self.result_cache.get_ttl('Timeout'), 30)
+        self.assertEqual(self.result_cache.get_ttl('500'), 0)
+        self.assertEqual(ResultCache(self.cache_file).get_ttl('200'), 0)
+
+    def test_cached_results(self):
+        self.result_cache.set(HOME_URL, '200', 0.1, 'md5', None)
+        self.result_cache.set(HOME_URL + '1', '500', 0.1, None, 'HTTPError')
+        self.assertEqual(self.result_cache.get(HOME_URL), {
+            'status_code': '200',
+            'duration_time': 0.1,
+            'md5': 'md5',
+            'exception_str': None
+        })
+        # results of statuses with zero ttl are not cached
+        self.assertIsNone(self.result_cache.get(HOME_URL + '1'))
+        self.assertEqual(self.result_cache.stats, {'hit': 1, 'missed': 2, 'cached': 1})
+
+        # results are kept in cache file
+        self.result_cache.flush()
+        self.assertEqual(ResultCache(self.cache_file).get(HOME_URL)['status_code'], '200')
+
+    def test_expired_results(self):
+        self.result_cache.set(HOME_URL + '1', '404', 0.1, None, 'HTTPError')
+        self.assertEqual(self.result_cache.get(HOME_URL + '1')['exception_str'], 'HTTPError')
+        time.sleep(1.1)
+        self.assertIsNone(self.result_cache.get(HOME_URL + '1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
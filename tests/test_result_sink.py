@@ -0,0 +1,93 @@
+#encoding=utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+from webcrawler import helpers
+from webcrawler.result_sink import ResultSink, iter_results, save_results_to_yaml
+
+
+def make_record(url, status_code, links=None, cookie=''):
+    return {
+        'cookie': cookie,
+        'url': url,
+        'status_code': status_code,
+        'duration_time': 0.1,
+        'md5': None,
+        'exception': None,
+        'referer': None,
+        'links': links
+    }
+
+
+class TestResultSink(unittest.TestCase):
+
+    def setUp(self):
+        self.logs_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.logs_folder)
+
+    def write_records(self, results_file, records, append=False):
+        result_sink = ResultSink(results_file, append, batch_size=2)
+        for record in records:
+            result_sink.write(record)
+        result_sink.close()
+        return result_sink
+
+    def test_write_and_iterate(self):
+        for file_name in ['results.jsonl', 'results.jsonl.gz']:
+            results_file = os.path.join(self.logs_folder, 'sub', file_name)
+            records = [make_record('http://a.com/{}'.format(index), '200') for index in range(5)]
+            result_sink = self.write_records(results_file, records)
+            self.assertEqual(result_sink.records_count, 5)
+            self.assertEqual(list(iter_results(results_file)), records)
+
+    def test_incomplete_line_is_skipped(self):
+        results_file = os.path.join(self.logs_folder, 'results.jsonl')
+        self.write_records(results_file, [make_record('http://a.com/', '200')])
+        with open(results_file, 'a') as f:
+            f.write('{"url": "http://a.com/b", "sta')
+        self.assertEqual([record['url'] for record in iter_results(results_file)], ['http://a.com/'])
+
+    def test_save_results_to_yaml(self):
+        results_file = os.path.join(self.logs_folder, 'results.jsonl.gz')
+        self.write_records(results_file, [
+            make_record('http://a.com/', '200', ['http://a.com/b', 'http://b.com/']),
+            make_record('http://a.com/b', 'Timeout'),
+            make_record('http://b.com/', '404')
+        ])
+        # results of resumed crawl are appended, and override earlier ones
+        self.write_records(results_file, [make_record('http://a.com/b', '200', [])], append=True)
+
+        saved_files = save_results_to_yaml(results_file, self.logs_folder)
+        urls_mapping_path = os.path.join(self.logs_folder, 'urls_mapping.yml')
+        visited_urls_path = os.path.join(self.logs_folder, 'visited_urls.yml')
+        self.assertEqual(saved_files, [urls_mapping_path, visited_urls_path])
+        self.assertEqual(helpers.load_yaml_file(urls_mapping_path), {
+            'http://a.com/': ['http://a.com/b', 'http://b.com/'],
+            'http://a.com/b': []
+        })
+        self.assertEqual(helpers.load_yaml_file(visited_urls_path), {
+            'http://a.com/': {'status_code': '200', 'duration_time': 0.1, 'md5': None},
+            'http://a.com/b': {'status_code': '200', 'duration_time': 0.1, 'md5': None},
+            'http://b.com/': {'status_code': '404', 'duration_time': 0.1, 'md5': None}
+        })
+
+    def test_save_results_of_several_cookies(self):
+        results_file = os.path.join(self.logs_folder, 'results.jsonl')
+        self.write_records(results_file, [
+            make_record('http://a.com/', '200', cookie='lang_en'),
+            make_record('http://a.com/', '500', cookie='')
+        ])
+
+        save_results_to_yaml(results_file, self.logs_folder)
+        for cookie_folder, status_code in [('lang_en', '200'), ('no_cookies', '500')]:
+            visited_urls = helpers.load_yaml_file(
+                os.path.join(self.logs_folder, cookie_folder, 'visited_urls.yml'))
+            self.assertEqual(visited_urls['http://a.com/']['status_code'], status_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#encoding=utf-8
+import time
+import threading
+import unittest
+
+from webcrawler.retry_scheduler import RetryScheduler, get_retry_delay
+
+
+class TestGetRetryDelay(unittest.TestCase):
+
+    def test_policy_lookup(self):
+        # status codes of retry config are str keys, as status codes of results
+        retry_config = {
+            '429': {'delay': 10, 'jitter': 0},
+            '5xx': {'delay': 3, 'jitter': 0},
+            'default': {'delay': 1, 'jitter': 0}
+        }
+        self.assertEqual(get_retry_delay(retry_config, '429', 1), 10)
+        self.assertEqual(get_retry_delay(retry_config, '503', 2), 6)
+        self.assertEqual(get_retry_delay(retry_config, 'Timeout', 3), 3)
+        self.assertEqual(get_retry_delay({}, 'Timeout', 1), 2)
+
+    def test_jitter(self):
+        retry_config = {'default': {'delay': 2, 'jitter': 0.5}}
+        for _ in range(100):
+            delay = get_retry_delay(retry_config, '500', 1)
+            self.assertTrue(2 <= delay <= 3)
+
+
+class TestRetryScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.called = []
+        self.retry_scheduler = RetryScheduler(self.callback)
+
+    def callback(self, url, depth):
+        with self.lock:
+            self.called.append((url, depth))
+
+    def test_retries_in_due_order(self):
+        self.retry_scheduler.schedule('http://a.com/2', 1, 0.2)
+        self.retry_scheduler.schedule('http://a.com/1', 2, 0.1)
+        self.assertTrue(self.retry_scheduler.has_pending())
+        self.assertTrue(self.retry_scheduler.join(5))
+        self.assertEqual(self.called, [('http://a.com/1', 2), ('http://a.com/2', 1)])
+        self.assertFalse(self.retry_scheduler.has_pending())
+        self.assertFalse(self.retry_scheduler.join(5))
+
+    def test_retry_is_not_due_before_delay(self):
+        start_time = time.time()
+        self.retry_scheduler.schedule('http://a.com/', 0, 0.2)
+        self.retry_scheduler.join(5)
+        self.assertGreaterEqual(time.time() - start_time, 0.2)
+
+    def test_hold(self):
+        put_back = self.retry_scheduler.hold('http://a.com/', 3)
+        self.assertTrue(self.retry_scheduler.join(0.1))
+        self.assertTrue(self.retry_scheduler.has_pending())
+        self.assertEqual(self.called, [])
+
+        put_back()
+        self.retry_scheduler.join(5)
+        self.assertEqual(self.called, [('http://a.com/', 3)])
+        self.assertFalse(self.retry_scheduler.has_pending())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#encoding=utf-8
+import unittest
+
+from webcrawler.shared_results import SharedUrlResults
+
+
+class TestSharedUrlResults(unittest.TestCase):
+
+    def setUp(self):
+        self.shared_results = SharedUrlResults()
+        self.ready = []
+
+    def defer(self, name):
+        return lambda: lambda: self.ready.append(name)
+
+    def test_claim_and_publish(self):
+        url = 'http://external.com/'
+        self.assertEqual(self.shared_results.acquire(url, 'a', self.defer('a')), (None, False))
+        # the claim is kept when the owner acquires the url again, e.g. to retry it
+        self.assertEqual(self.shared_results.acquire(url, 'a', self.defer('a')), (None, False))
+        self.assertEqual(self.shared_results.acquire(url, 'b', self.defer('b')), (None, True))
+        self.assertEqual(self.shared_results.acquire(url, 'c', self.defer('c')), (None, True))
+        self.assertEqual(self.ready, [])
+
+        self.shared_results.publish(url, '404', 0.1, None, 'HTTP Status Code is 404.')
+        self.assertEqual(self.ready, ['b', 'c'])
+
+        result, deferred = self.shared_results.acquire(url, 'b', self.defer('b'))
+        self.assertFalse(deferred)
+        self.assertEqual(result['status_code'], '404')
+        self.assertEqual(result['exception_str'], 'HTTP Status Code is 404.')
+        self.assertEqual(self.shared_results.stats, {'tested': 1, 'shared': 1, 'deferred': 2})
+
+    def test_release(self):
+        url = 'http://external.com/'
+        self.shared_results.acquire(url, 'a', self.defer('a'))
+        self.shared_results.acquire(url, 'b', self.defer('b'))
+
+        # only the owner releases its claim
+        self.shared_results.release(url, 'b')
+        self.assertEqual(self.ready, [])
+        self.shared_results.release(url, 'a')
+        self.assertEqual(self.ready, ['b'])
+
+        # deferred request claims the url then
+        self.assertEqual(self.shared_results.acquire(url, 'b', self.defer('b')), (None, False))
+        self.assertEqual(self.shared_results.acquire(url, 'a', self.defer('a')), (None, True))
+
+    def test_no_owner(self):
+        url = 'http://external.com/'
+        self.assertEqual(self.shared_results.acquire(url, None, self.defer('a')), (None, False))
+        self.assertEqual(self.shared_results.acquire(url, 'b', self.defer('b')), (None, False))
+        self.assertEqual(self.ready, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
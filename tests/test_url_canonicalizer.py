@@ -0,0 +1,84 @@
+#encoding=utf-8
+import unittest
+
+from webcrawler.url_canonicalizer import ParamsMatcher, UrlCanonicalizer, remove_dot_segments
+
+REMOVE_PARAMS = ['utm_*', 'gclid', 'jsessionid', 'aspsessionid*']
+
+
+class TestRemoveDotSegments(unittest.TestCase):
+
+    def test_remove_dot_segments(self):
+        self.assertEqual(remove_dot_segments('/a/b/../c/./d'), '/a/c/d')
+        self.assertEqual(remove_dot_segments('/a/b/..'), '/a/')
+        self.assertEqual(remove_dot_segments('/a/b/.'), '/a/b/')
+        self.assertEqual(remove_dot_segments('/../../a'), '/a')
+        self.assertEqual(remove_dot_segments('/a/.b/..c'), '/a/.b/..c')
+        self.assertEqual(remove_dot_segments('/a/b'), '/a/b')
+
+
+class TestParamsMatcher(unittest.TestCase):
+
+    def test_match(self):
+        params_matcher = ParamsMatcher(REMOVE_PARAMS)
+        self.assertTrue(params_matcher.match('utm_source'))
+        self.assertTrue(params_matcher.match('UTM_Medium'))
+        self.assertTrue(params_matcher.match('gclid'))
+        self.assertTrue(params_matcher.match('ASPSESSIONIDQQGGGNCG'))
+        self.assertTrue(params_matcher.match('utm%5Fsource'))
+        self.assertFalse(params_matcher.match('gclid2'))
+        self.assertFalse(params_matcher.match('page'))
+        self.assertFalse(ParamsMatcher([]))
+
+
+class TestUrlCanonicalizer(unittest.TestCase):
+
+    def setUp(self):
+        self.url_canonicalizer = UrlCanonicalizer({'remove_params': REMOVE_PARAMS})
+
+    def test_canonicalize(self):
+        canonicalize = self.url_canonicalizer.canonicalize
+        self.assertEqual(canonicalize('HTTP://Debugtalk.COM:80/a/./b/../c'), 'http://debugtalk.com/a/c')
+        self.assertEqual(canonicalize('https://debugtalk.com:443'), 'https://debugtalk.com/')
+        self.assertEqual(canonicalize('https://debugtalk.com:8443/'), 'https://debugtalk.com:8443/')
+        self.assertEqual(canonicalize('http://User@Debugtalk.com/'), 'http://User@debugtalk.com/')
+        self.assertEqual(canonicalize('http://[::1]:80/'), 'http://[::1]/')
+        self.assertEqual(
+            canonicalize('http://debugtalk.com/s?q=a&utm_source=x&page=2&q=b&gclid=1#top'),
+            'http://debugtalk.com/s?page=2&q=a&q=b')
+        self.assertEqual(canonicalize('http://debugtalk.com/s?utm_source=x'), 'http://debugtalk.com/s')
+        self.assertEqual(
+            canonicalize('http://debugtalk.com/cart;jsessionid=ABC;v=1/list'),
+            'http://debugtalk.com/cart;v=1/list')
+        # paths are case sensitive, and trailing slash is kept by default
+        self.assertEqual(canonicalize('http://debugtalk.com/Docs/'), 'http://debugtalk.com/Docs/')
+
+    def test_other_urls_are_kept(self):
+        canonicalize = self.url_canonicalizer.canonicalize
+        for url in ['mailto:Mail@Debugtalk.com', 'javascript:void(0)', 'ftp://Debugtalk.com/a/../b',
+                    'http://[invalid/']:
+            self.assertEqual(canonicalize(url), url)
+
+    def test_options(self):
+        url_canonicalizer = UrlCanonicalizer({
+            'lowercase_host': False,
+            'remove_default_port': False,
+            'resolve_dot_segments': False,
+            'remove_trailing_slash': True,
+            'sort_params': False
+        })
+        self.assertEqual(
+            url_canonicalizer.canonicalize('http://Debugtalk.com:80/a/../docs/?b=1&a=2&utm_source=x'),
+            'http://Debugtalk.com:80/a/../docs?b=1&a=2&utm_source=x')
+        self.assertEqual(url_canonicalizer.canonicalize('http://debugtalk.com/'), 'http://debugtalk.com/')
+
+    def test_canonicalize_urls(self):
+        urls = ['http://debugtalk.com/?utm_source=x', 'http://debugtalk.com/', 'http://debugtalk.com/b']
+        self.assertEqual(
+            self.url_canonicalizer.canonicalize_urls(urls),
+            ['http://debugtalk.com/', 'http://debugtalk.com/', 'http://debugtalk.com/b'])
+        self.assertEqual(self.url_canonicalizer.get_stats(), {'links': 3, 'rewritten': 1, 'merged': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
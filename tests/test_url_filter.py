@@ -0,0 +1,61 @@
+#encoding=utf-8
+import unittest
+
+from webcrawler.url_filter import BloomFilter, CompactUrlSet, get_url_hashes
+
+
+def make_urls(urls_number, prefix='http://a.com/'):
+    return ['{}{}?id={}'.format(prefix, index % 100, index) for index in range(urls_number)]
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_bloom_filter(self):
+        bloom_filter = BloomFilter(1000, 0.001)
+        self.assertEqual(bloom_filter.hashes_count, 10)
+        # about 1.8 bytes per url
+        self.assertEqual(len(bloom_filter.bits), 1798)
+
+        url_hashes = get_url_hashes('http://a.com/')
+        self.assertFalse(bloom_filter.contains(url_hashes))
+        bloom_filter.add(url_hashes)
+        self.assertTrue(bloom_filter.contains(url_hashes))
+        self.assertFalse(bloom_filter.is_full())
+
+
+class TestCompactUrlSet(unittest.TestCase):
+
+    def test_no_false_negative_when_filters_grow(self):
+        urls_set = CompactUrlSet(0.01, initial_capacity=1000)
+        urls = make_urls(10000)
+        added_count = sum(1 for url in urls if urls_set.add(url))
+        # false positives of bloom filters are taken as added urls
+        self.assertGreaterEqual(added_count, 9900)
+        self.assertEqual(len(urls_set), added_count)
+        self.assertEqual(len(urls_set.filters), 4)
+        self.assertTrue(all(url in urls_set for url in urls))
+        self.assertFalse(any(urls_set.add(url) for url in urls))
+
+    def test_false_positive_rate(self):
+        error_rate = 0.01
+        urls_set = CompactUrlSet(error_rate, initial_capacity=1000)
+        for url in make_urls(10000):
+            urls_set.add(url)
+
+        other_urls = make_urls(20000, 'http://b.com/')
+        false_positives_count = sum(1 for url in other_urls if url in urls_set)
+        self.assertLess(false_positives_count, len(other_urls) * error_rate)
+        self.assertLess(urls_set.get_memory_size(), 10000 * 2 * 2)
+
+    def test_remove(self):
+        urls_set = CompactUrlSet(initial_capacity=10)
+        self.assertTrue(urls_set.add('http://a.com/'))
+        urls_set.remove('http://a.com/')
+        self.assertNotIn('http://a.com/', urls_set)
+        self.assertTrue(urls_set.add('http://a.com/'))
+        self.assertIn('http://a.com/', urls_set)
+        self.assertFalse(urls_set.add('http://a.com/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
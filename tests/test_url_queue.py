@@ -0,0 +1,204 @@
+#encoding=utf-8
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from webcrawler.crawl_store import CrawlStore
+from webcrawler.url_queue import PriorityUniqueQueue, UniqueQueue, UrlQueue
+
+
+def make_result(status_code):
+    return {'status_code': status_code, 'duration_time': 0.1, 'md5': None}
+
+
+class TestUniqueQueue(unittest.TestCase):
+
+    def test_items_are_put_once(self):
+        unique_queue = UniqueQueue()
+        unique_queue.extend(['a', 'b', 'a'])
+        unique_queue.put('b')
+        unique_queue.put('c')
+        self.assertEqual(unique_queue.qsize(), 3)
+        self.assertEqual([unique_queue.get() for _ in range(3)], ['a', 'b', 'c'])
+
+        unique_queue.put('a')
+        self.assertTrue(unique_queue.empty())
+        unique_queue.put_again('a')
+        self.assertEqual(unique_queue.get(), 'a')
+
+    def test_join(self):
+        unique_queue = UniqueQueue()
+        unique_queue.extend(['a', 'b', 'a'])
+        self.assertFalse(unique_queue.join(0.01))
+
+        def work():
+            while True:
+                unique_queue.get()
+                unique_queue.task_done()
+
+        worker_thread = threading.Thread(target=work)
+        worker_thread.daemon = True
+        worker_thread.start()
+        self.assertTrue(unique_queue.join(5))
+
+
+class TestPriorityUniqueQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.priorities = {'a': 3, 'b': 1, 'c': 2, 'd': 1}
+        self.priority_queue = PriorityUniqueQueue(self.priorities.get)
+
+    def get_all(self):
+        return [self.priority_queue.get() for _ in range(self.priority_queue.qsize())]
+
+    def test_get_lowest_priority_first(self):
+        self.priority_queue.extend(['a', 'b', 'c', 'd', 'b'])
+        self.assertEqual(self.priority_queue.qsize(), 4)
+        # items of the same priority are got in FIFO order
+        self.assertEqual(self.get_all(), ['b', 'd', 'c', 'a'])
+        self.assertTrue(self.priority_queue.empty())
+
+    def test_reprioritize(self):
+        self.priority_queue.extend(['a', 'b', 'c'])
+        self.priorities['a'] = 0
+        # priority of queued items is only lowered
+        self.priorities['b'] = 5
+        self.priority_queue.reprioritize(['a', 'b', 'e'])
+        self.assertEqual(self.priority_queue.qsize(), 3)
+        self.assertEqual(self.get_all(), ['a', 'b', 'c'])
+
+        # got items are not reprioritized
+        self.priority_queue.reprioritize(['a'])
+        self.assertTrue(self.priority_queue.empty())
+
+    def test_put_again(self):
+        self.priority_queue.extend(['a', 'b'])
+        self.assertEqual(self.priority_queue.get(), 'b')
+        self.priority_queue.put_again('b')
+        self.assertEqual(self.get_all(), ['b', 'a'])
+
+
+class TestUrlQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.store_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_folder)
+
+    def make_url_queues(self):
+        crawl_store = CrawlStore(os.path.join(self.store_folder, 'crawl_store.db'), batch_size=2)
+        return [UrlQueue(), UrlQueue(compact=True, initial_capacity=10), UrlQueue(crawl_store=crawl_store)]
+
+    def test_unvisited_urls(self):
+        for url_queue in self.make_url_queues():
+            self.assertEqual(url_queue.add_unvisited_urls(['http://a.com/', '', None], 0), ['http://a.com/'])
+            self.assertEqual(
+                url_queue.add_unvisited_urls(['http://a.com/', 'http://a.com/1'], 2), ['http://a.com/1'])
+            # depth is lowered if url is added again with less depth
+            url_queue.add_unvisited_url('http://a.com/1', 1)
+            url_queue.add_visited_url('http://a.com/2', make_result('200'))
+            self.assertEqual(url_queue.add_unvisited_urls('http://a.com/2'), [])
+            self.assertEqual(
+                url_queue.add_unvisited_urls(['http://a.com/3', 'http://a.com/4'], 1, lambda urls: urls[:1]),
+                ['http://a.com/3'])
+
+            self.assertEqual(url_queue.get_unvisited_urls_count(), 3)
+            self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/', 0))
+            self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/1', 1))
+            self.assertEqual(url_queue.get_one_unvisited_url(), 'http://a.com/3')
+            self.assertTrue(url_queue.is_unvisited_urls_empty())
+
+            url_queue.retry_unvisited_url('http://a.com/1', 2)
+            self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/1', 2))
+
+    def test_deferred_urls(self):
+        for url_queue in self.make_url_queues():
+            url_queue.add_unvisited_urls(['http://a.com/1', 'http://a.com/2'], 3)
+            url, depth = url_queue.get_one_unvisited_url_with_depth()
+            url_queue.defer_unvisited_url(url, depth)
+            # depth of deferred url is still lowered
+            url_queue.add_unvisited_urls([url], 1)
+            url_queue.add_unvisited_urls([url], 2)
+            self.assertEqual(url_queue.get_unvisited_urls_count(), 1)
+
+            # deferred url is put back before other urls
+            url_queue.put_back_deferred_url(url)
+            self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/1', 1))
+            url_queue.defer_unvisited_url('http://a.com/1', 1)
+            url_queue.undefer_unvisited_url('http://a.com/1')
+            self.assertEqual(url_queue.get_unvisited_url_depth('http://a.com/1'), 0)
+            self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/2', 3))
+
+    def test_visited_urls(self):
+        for url_queue in self.make_url_queues():
+            url_queue.add_visited_url('http://a.com/', make_result('200'))
+            url_queue.add_visited_url('http://a.com/1', make_result('404'))
+            url_queue.add_visited_url('http://a.com/1', make_result('200'))
+            self.assertEqual(url_queue.get_visited_urls_count(), 2)
+            self.assertTrue(url_queue.is_url_visited('http://a.com/1'))
+            self.assertFalse(url_queue.is_url_visited('http://a.com/2'))
+            self.assertTrue(url_queue.is_url_passed('http://a.com/'))
+            self.assertFalse(url_queue.is_url_passed('http://a.com/2'))
+
+            url_queue.remove_visited_url('http://a.com/1')
+            self.assertEqual(url_queue.get_visited_urls_count(), 1)
+            self.assertFalse(url_queue.is_url_visited('http://a.com/1'))
+
+    def test_results_kept(self):
+        url_queue, compact_url_queue, store_url_queue = self.make_url_queues()
+        for queue in [url_queue, compact_url_queue, store_url_queue]:
+            queue.add_visited_url('http://a.com/', make_result('200'))
+            queue.add_visited_url('http://a.com/1', make_result('404'))
+
+        self.assertEqual(set(url_queue.get_visited_urls()), {'http://a.com/', 'http://a.com/1'})
+        self.assertTrue(url_queue.is_url_passed('http://a.com/'))
+        self.assertFalse(url_queue.is_url_passed('http://a.com/1'))
+        self.assertIsNone(url_queue.get_memory_stats())
+
+        # only results of non-2xx urls are kept in compact mode
+        self.assertEqual(set(compact_url_queue.get_visited_urls()), {'http://a.com/1'})
+        self.assertFalse(compact_url_queue.is_url_passed('http://a.com/1'))
+        memory_stats = compact_url_queue.get_memory_stats()
+        self.assertEqual((memory_stats['visited_urls'], memory_stats['store_backed']), (2, False))
+
+        # results are kept in crawl store only
+        self.assertEqual(store_url_queue.get_visited_urls(), {})
+        self.assertTrue(store_url_queue.is_url_passed('http://a.com/1'))
+        self.assertTrue(store_url_queue.get_memory_stats()['store_backed'])
+
+    def test_store_backed_urls_are_restored(self):
+        store_file = os.path.join(self.store_folder, 'crawl_store.db')
+        crawl_store = CrawlStore(store_file, batch_size=2)
+        url_queue = UrlQueue(crawl_store=crawl_store)
+        for index in range(3):
+            url_queue.add_visited_url('http://a.com/{}'.format(index), make_result('200'))
+        url_queue.add_unvisited_urls(['http://a.com/3'])
+        crawl_store.checkpoint()
+
+        url_queue = UrlQueue(crawl_store=CrawlStore(store_file, resume=True))
+        self.assertEqual(url_queue.get_visited_urls_count(), 3)
+        self.assertTrue(url_queue.is_url_visited('http://a.com/2'))
+        # queued urls are put to frontier again when resuming
+        self.assertEqual(url_queue.add_unvisited_urls(['http://a.com/3']), ['http://a.com/3'])
+
+    def test_priority(self):
+        url_queue = UrlQueue()
+        url_queue.set_priority_function(lambda url: -url_queue.get_unvisited_url_depth(url))
+        url_queue.add_unvisited_urls(['http://a.com/1'], 1)
+        url_queue.add_unvisited_urls(['http://a.com/2'], 2)
+        self.assertEqual(url_queue.get_one_unvisited_url(), 'http://a.com/2')
+
+        # deferred url is put back by its lowest known depth
+        url_queue.add_unvisited_urls(['http://a.com/3'], 3)
+        url_queue.defer_unvisited_url('http://a.com/2', 2)
+        url_queue.put_back_deferred_url('http://a.com/2')
+        self.assertEqual(url_queue.get_one_unvisited_url(), 'http://a.com/3')
+        self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/2', 2))
+        self.assertEqual(url_queue.get_one_unvisited_url_with_depth(), ('http://a.com/1', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
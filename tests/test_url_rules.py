@@ -0,0 +1,86 @@
+#encoding=utf-8
+import random
+import unittest
+
+from webcrawler.url_rules import (AUTOMATON_MIN_KEYWORDS, TRIE_MIN_PREFIXES,
+                                  KeywordMatcher, PrefixMatcher, UrlRules)
+
+
+def make_random_string(chars, max_length):
+    return ''.join(random.choice(chars) for _ in range(random.randint(0, max_length)))
+
+
+class TestPrefixMatcher(unittest.TestCase):
+
+    def test_match_as_startswith(self):
+        random.seed(1)
+        for prefixes_number in [0, 3, TRIE_MIN_PREFIXES * 2]:
+            prefixes = [make_random_string('abc', 6) for _ in range(prefixes_number)]
+            prefix_matcher = PrefixMatcher(prefixes)
+            self.assertEqual(bool(prefix_matcher), bool(prefixes))
+            for _ in range(500):
+                string = make_random_string('abcd', 10)
+                self.assertEqual(
+                    prefix_matcher.match(string), any(string.startswith(prefix) for prefix in prefixes))
+
+
+class TestKeywordMatcher(unittest.TestCase):
+
+    def test_search_as_naive_loop(self):
+        random.seed(2)
+        for keywords_number in [0, 3, AUTOMATON_MIN_KEYWORDS * 2]:
+            keywords = [make_random_string('abc', 5) for _ in range(keywords_number)]
+            keyword_matcher = KeywordMatcher(keywords)
+            for _ in range(500):
+                string = make_random_string('abcd', 20)
+                self.assertEqual(
+                    keyword_matcher.search(string), any(keyword in string for keyword in keywords))
+
+    def test_overlapping_keywords(self):
+        unused_keywords = ['unused{}'.format(index) for index in range(AUTOMATON_MIN_KEYWORDS)]
+        keywords = ['he', 'she', 'his', 'hers'] + unused_keywords
+        keyword_matcher = KeywordMatcher(keywords)
+        self.assertIsNotNone(keyword_matcher.goto)
+        self.assertTrue(keyword_matcher.search('ushers'))
+        self.assertTrue(keyword_matcher.search('ahishe'))
+        self.assertFalse(keyword_matcher.search('hxsx'))
+
+    def test_empty_keyword(self):
+        self.assertFalse(KeywordMatcher([]))
+        self.assertTrue(KeywordMatcher(['']))
+        self.assertTrue(KeywordMatcher(['']).search('any'))
+
+
+class TestUrlRules(unittest.TestCase):
+
+    def test_no_rules(self):
+        url_rules = UrlRules()
+        self.assertFalse(url_rules.is_ignored_url('http://a.com/'))
+        urls = ['http://a.com/', 'http://b.com/']
+        self.assertIs(url_rules.filter_urls(urls), urls)
+
+    def test_ignored_urls(self):
+        url_rules = UrlRules({
+            'startswith': ['mailto:'],
+            'host': ['ignored.com'],
+            'fullurl': ['http://a.com/logout'],
+            'include-key': ['/download/'],
+            'regex': [r'\.pdf$']
+        }, {
+            'regex': [r'^https?://(a|ignored)\.com/']
+        })
+        self.assertTrue(url_rules.ignore_prefix_matcher.match('mailto:mail@debugtalk.com'))
+        self.assertTrue(url_rules.is_ignored_url('http://ignored.com/'))
+        self.assertTrue(url_rules.is_ignored_url('http://a.com/logout'))
+        self.assertTrue(url_rules.is_ignored_url('http://a.com/download/app'))
+        self.assertTrue(url_rules.is_ignored_url('http://a.com/manual.pdf'))
+        self.assertTrue(url_rules.is_ignored_url('http://b.com/'))
+        self.assertFalse(url_rules.is_ignored_url('http://a.com/logout/'))
+        self.assertEqual(
+            url_rules.filter_urls(
+                ['http://a.com/', 'http://b.com/', 'http://a.com/x.pdf', 'https://a.com/y']),
+            ['http://a.com/', 'https://a.com/y'])
+
+
+if __name__ == '__main__':
+    unittest.main()
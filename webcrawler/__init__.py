@@ -4,6 +4,8 @@ import os
 import sys
 import logging
 import argparse
+import binascii
+import multiprocessing
 from .core import WebCrawler
 from .helpers import color_logging
 
@@ -31,12 +33,68 @@ def main():
         '--cookies', help="Specify cookies, several cookies can be joined by '|'. \
             e.g. 'lang:en,country:us|lang:zh,country:cn'")
     parser.add_argument(
-        '--crawl-mode', default='BFS', help="Specify crawl mode, BFS or DFS.")
+        '--concurrent-cookies', action='store_true',
+        help="Crawl with all cookies concurrently, results of external and static urls \
+              are tested once and shared among cookies.")
+    parser.add_argument(
+        '--crawl-mode', default='BFS', help="Specify crawl mode, BFS, DFS, PIPELINE or PRIORITY.")
     parser.add_argument(
         '--max-depth', default=5, type=int, help="Specify max crawl depth.")
     parser.add_argument(
         '--concurrency', help="Specify concurrent workers number.")
+    parser.add_argument(
+        '--time-budget', type=float,
+        help="Specify seconds to crawl in PIPELINE and PRIORITY modes or asyncio engine, crawl stops \
+              at the deadline and results of urls tested before are reported.")
+    parser.add_argument(
+        '--priority-history',
+        help="Specify JSON lines results file of a previous run, urls which failed in it \
+              are tested first in PRIORITY mode.")
+    parser.add_argument(
+        '--engine', default='threading',
+        help="Specify crawl engine, threading or asyncio, default is threading.")
 
+    parser.add_argument(
+        '--parse-processes', type=int,
+        help="Specify number of processes to parse web pages, default is parsing in workers.")
+    parser.add_argument(
+        '--crawl-cache',
+        help="Specify crawl cache file path, unchanged pages will be requested conditionally \
+              and their hyper links will be reused in later runs.")
+    parser.add_argument(
+        '--result-cache',
+        help="Specify result cache file path, results of external and static urls will be \
+              reused in later runs until they expire.")
+    parser.add_argument(
+        '--crawl-store',
+        help="Specify crawl store file path, crawl progress will be checkpointed to it.")
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Resume interrupted crawl from crawl store, visited urls will not be tested again.")
+    parser.add_argument(
+        '--results-file',
+        help="Specify JSON lines file to stream test result of each url to while crawling, \
+              it is gzip compressed if file name ends with .gz.")
+    parser.add_argument(
+        '--metrics-file',
+        help="Specify Prometheus text file path, timing metrics of crawl phases will be \
+              written to it periodically while crawling.")
+    parser.add_argument(
+        '--metrics-port', type=int,
+        help="Specify local port to serve timing metrics of crawl phases on /metrics while crawling.")
+    parser.add_argument(
+        '--distributed',
+        help="Specify distributed role, coordinator, worker, or local which runs coordinator \
+              and workers on local machine. Default is not distributed.")
+    parser.add_argument(
+        '--coordinator-address', default='127.0.0.1:8530',
+        help="Specify coordinator address, default is 127.0.0.1:8530.")
+    parser.add_argument(
+        '--distributed-workers', default=2, type=int,
+        help="Specify distributed workers number, urls are sharded by host to workers, default is 2.")
+    parser.add_argument(
+        '--worker-id', default=0, type=int,
+        help="Specify worker id of distributed worker, from 0 to distributed workers number - 1.")
     parser.add_argument(
         '--save-results', default='NO', help="Specify if save results, default is NO.")
 
@@ -65,35 +123,112 @@ def main():
 
     main_crawler(args, mailer)
 
-def main_crawler(args, mailer=None):
+def make_web_crawler(args, web_crawler_class=WebCrawler):
     include_hosts = args.include_hosts.split(',') if args.include_hosts else []
-    cookies_list = args.cookies.split('|') if args.cookies else ['']
     jenkins_build_number = args.jenkins_build_number
     logs_folder = os.path.join(os.getcwd(), "logs", '{}'.format(jenkins_build_number))
 
-    web_crawler = WebCrawler(args.seeds, include_hosts, logs_folder, args.config_file)
+    web_crawler = web_crawler_class(args.seeds, include_hosts, logs_folder, args.config_file)
+
+    if args.parse_processes:
+        web_crawler.set_parse_processes(args.parse_processes)
+
+    if args.crawl_cache:
+        web_crawler.set_crawl_cache(args.crawl_cache)
+
+    if args.result_cache:
+        web_crawler.set_result_cache(args.result_cache)
 
     # set grey environment
     if args.grey_user_agent and args.grey_traceid and args.grey_view_grey:
         web_crawler.set_grey_env(args.grey_user_agent, args.grey_traceid, args.grey_view_grey)
 
+    return web_crawler
+
+def run_distributed_worker(args, worker_id, export_metrics=False, authkey=None):
+    from .distributed import WorkerWebCrawler, parse_address
+    web_crawler = make_web_crawler(args, WorkerWebCrawler)
+    if authkey:
+        web_crawler.set_distributed_authkey(authkey)
+    if export_metrics:
+        # phases are timed where urls are fetched
+        web_crawler.export_metrics(args.metrics_file, args.metrics_port)
+    concurrency = int(args.concurrency or multiprocessing.cpu_count() * 4)
+    web_crawler.run_worker(parse_address(args.coordinator_address), worker_id, concurrency)
+
+def start_local_workers(args, authkey):
+    """ start distributed workers on local machine, which connect to coordinator with TCP.
+    """
+    for worker_id in range(args.distributed_workers):
+        process = multiprocessing.Process(target=run_distributed_worker, args=(args, worker_id, False, authkey))
+        process.start()
+
+def parse_cookies(cookies_str):
+    """ parse cookies like 'lang:en,country:us' to dict.
+    """
+    cookies = {}
+    for cookie_str in cookies_str.split(','):
+        if ':' not in cookie_str:
+            continue
+        key, value = cookie_str.split(':')
+        cookies[key.strip()] = value.strip()
+
+    return cookies
+
+def main_crawler(args, mailer=None):
+    distributed = (args.distributed or '').lower()
+    if distributed == 'worker':
+        run_distributed_worker(args, args.worker_id, True)
+        return
+
+    cookies_list = args.cookies.split('|') if args.cookies else ['']
+    web_crawler = make_web_crawler(args)
+    if args.crawl_store:
+        # only coordinator keeps crawl store in distributed crawl
+        web_crawler.set_crawl_store(args.crawl_store, args.resume)
+    if args.priority_history:
+        # loaded before results file is opened, which may be the same file
+        web_crawler.load_priority_history(args.priority_history)
+    if args.results_file:
+        # results of resumed crawl are appended
+        web_crawler.set_result_sink(args.results_file, args.resume)
+    web_crawler.export_metrics(args.metrics_file, args.metrics_port)
+
+    frontier_service = None
+    if distributed in ['coordinator', 'local']:
+        from .distributed import FrontierService, parse_address
+        if distributed == 'local' and web_crawler.get_distributed_authkey() is None:
+            # local workers are started by coordinator, they share a random authkey
+            web_crawler.set_distributed_authkey(binascii.hexlify(os.urandom(16)).decode('ascii'))
+        frontier_service = FrontierService(web_crawler, args.distributed_workers)
+        frontier_service.serve(parse_address(args.coordinator_address))
+        web_crawler.set_frontier_service(frontier_service)
+        if distributed == 'local':
+            start_local_workers(args, web_crawler.get_distributed_authkey().decode('utf-8'))
+
+    if args.time_budget:
+        web_crawler.set_time_budget(args.time_budget)
+
     canceled = False
     try:
-        for cookies_str in cookies_list:
-            cookies_str_list = cookies_str.split(',')
-            cookies = {}
-            for cookie_str in cookies_str_list:
-                if ':' not in cookie_str:
-                    continue
-                key, value = cookie_str.split(':')
-                cookies[key.strip()] = value.strip()
-
-            web_crawler.start(
-                cookies,
+        if args.concurrent_cookies and frontier_service is None:
+            if args.engine.lower() != 'threading':
+                color_logging("Concurrent cookies only run in threading engine.", 'WARNING')
+            web_crawler.start_profiles(
+                [parse_cookies(cookies_str) for cookies_str in cookies_list],
                 args.crawl_mode,
                 args.max_depth,
                 args.concurrency
             )
+        else:
+            for cookies_str in cookies_list:
+                web_crawler.start(
+                    parse_cookies(cookies_str),
+                    args.crawl_mode,
+                    args.max_depth,
+                    args.concurrency,
+                    args.engine
+                )
 
         if mailer and mailer.config_ready:
             subject = "%s" % args.seeds
@@ -102,6 +237,9 @@ def main_crawler(args, mailer=None):
     except KeyboardInterrupt:
         canceled = True
         color_logging("Canceling...", color='red')
+        web_crawler.stop_crawl("Crawl is canceled")
     finally:
+        if frontier_service is not None:
+            frontier_service.finish()
         save_results = False if args.save_results.upper() == "NO" else True
         web_crawler.print_result(canceled, save_results)
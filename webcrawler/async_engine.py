@@ -0,0 +1,373 @@
+#encoding=utf-8
+import time
+import asyncio
+import collections
+import aiohttp
+import lxml.html
+
+from .helpers import color_logging
+from . import helpers
+
+
+class AsyncEngine(object):
+    """ crawl engine based on asyncio and aiohttp.
+        It runs in a single thread with thousands of concurrent requests, and
+        shares url parsing, url type and result categorising logic with
+        WebCrawler, thus produces the same results as the threading engine.
+    """
+    def __init__(self, web_crawler, concurrency):
+        self.web_crawler = web_crawler
+        self.concurrency = concurrency
+        self.session = None
+        self.retry_tasks = set()
+        # urls of current depth not taken by workers yet, and number of urls being tested by workers
+        self.urls_deque = collections.deque()
+        self.in_flight_count = 0
+        self.stats = {
+            'hosts': set(),
+            'requests': 0,
+            'connections': 0,
+            'reused': 0
+        }
+
+    def make_trace_config(self):
+        """ trace connection reuse, and time of connecting and TTFB of each request.
+        """
+        metrics = self.web_crawler.metrics
+
+        async def on_request_start(session, context, params):
+            self.stats['requests'] += 1
+            self.stats['hosts'].add((params.url.host, params.url.port))
+            context.host = helpers.get_parsed_object_from_url(str(params.url)).netloc
+            context.start_time = time.time()
+            context.connect_time = 0
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_start_time = time.time()
+
+        async def on_connection_create_end(session, context, params):
+            self.stats['connections'] += 1
+            context.connect_time = time.time() - context.connect_start_time
+            metrics.observe_phase('connect', context.host, context.connect_time)
+
+        async def on_request_end(session, context, params):
+            # response headers are received
+            ttfb = time.time() - context.start_time - context.connect_time
+            metrics.observe_phase('ttfb', context.host, max(ttfb, 0))
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats['reused'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['hosts'] = len(self.stats['hosts'])
+        return stats
+
+    def make_request_kwargs(self, kwargs):
+        """ convert requests kwargs to aiohttp kwargs.
+        """
+        aiohttp_kwargs = {
+            'headers': kwargs['headers'],
+            'cookies': kwargs['cookies'],
+            'timeout': aiohttp.ClientTimeout(total=kwargs['timeout'])
+        }
+        if 'auth' in kwargs:
+            aiohttp_kwargs['auth'] = aiohttp.BasicAuth(*kwargs['auth'])
+        return aiohttp_kwargs
+
+    async def parse_page_links_unless_unchanged(self, referer_url, content, content_md5, cached_page):
+        """ parse web page without blocking the event loop, in parser processes if parse pool
+            is enabled, otherwise in threads of the default executor.
+        """
+        web_crawler = self.web_crawler
+        if web_crawler.parse_pool is None:
+            return await asyncio.get_event_loop().run_in_executor(
+                None, web_crawler.parse_page_links_unless_unchanged,
+                referer_url, content, content_md5, cached_page)
+
+        hyper_links_set = web_crawler.get_page_links_without_parsing(
+            referer_url, content, content_md5, cached_page)
+        if hyper_links_set is not None:
+            return hyper_links_set
+
+        future = web_crawler.parse_pool.submit_page(referer_url, content)
+        host = helpers.get_parsed_object_from_url(referer_url).netloc
+        with web_crawler.metrics.time_phase('parse', host):
+            hyper_links_set = await asyncio.wrap_future(future)
+        web_crawler.save_parsed_page_links(referer_url, content_md5, hyper_links_set)
+        return hyper_links_set
+
+    async def acquire_host_slot(self, url_host, is_internal):
+        """ wait until a request slot of the host is taken, the waiter is woken up
+            when a request of the host is done.
+        """
+        host_scheduler = self.web_crawler.host_scheduler
+        loop = asyncio.get_event_loop()
+        while True:
+            waiter = loop.create_future()
+
+            def wake_up(waiter=waiter):
+                if not waiter.done():
+                    waiter.set_result(None)
+
+            if host_scheduler.acquire_or_defer(url_host, is_internal, wake_up):
+                return
+            await waiter
+
+    async def get_hyper_links(self, url, depth, retry_times=3, retried_duration=0):
+        """ test url and get hyper links of it if it is a recursive page.
+        @params
+            retried_duration: duration time of failed attempts, which is added to duration time of url
+        """
+        web_crawler = self.web_crawler
+        if retry_times == 3:
+            web_crawler.observe_queue_wait(url)
+            if web_crawler.reuse_cached_url_result(url):
+                return set()
+
+        kwargs = web_crawler.get_request_kwargs(url)
+        if kwargs is None:
+            return set()
+
+        hyper_links_set = set()
+        page_fetched = False
+        url_host = helpers.get_parsed_object_from_url(url).netloc
+        url_type = None
+        aiohttp_kwargs = self.make_request_kwargs(kwargs)
+        exception_str = ""
+        status_code = '0'
+        resp_content_md5 = None
+        duration_time = None
+        host_scheduler = web_crawler.host_scheduler
+        if host_scheduler is not None:
+            await self.acquire_host_slot(url_host, url_host in web_crawler.include_hosts_set)
+        start_time = time.time()
+        try:
+            async with self.session.head(url, allow_redirects=False, **aiohttp_kwargs) as resp:
+                url_type = web_crawler.get_url_type(resp, url_host)
+                resp_status = resp.status
+
+            if url_type in ['static', 'external']:
+                if resp_status in [301, 302, 404, 500]:
+                    # some links can not be visited with HEAD method and will return 404 status code
+                    # so we recheck with GET method here.
+                    async with self.session.get(url, **aiohttp_kwargs) as resp:
+                        resp_status = resp.status
+                duration_time = time.time() - start_time
+                status_code = str(resp_status)
+            else:
+                # recursive, duration time includes the HEAD request
+                cached_page = web_crawler.get_cached_page(url, kwargs)
+                async with self.session.get(url, **aiohttp_kwargs) as resp:
+                    resp_url = str(resp.url)
+                    resp_status = resp.status
+                    resp_headers = resp.headers
+                    if cached_page and resp_status == 304:
+                        pass
+                    elif web_crawler.streaming:
+                        links_extractor = web_crawler.make_links_extractor()
+                        loop = asyncio.get_event_loop()
+                        # incremental parsing of chunks is counted as download
+                        with web_crawler.metrics.time_phase('download', url_host):
+                            async for chunk in resp.content.iter_chunked(web_crawler.stream_chunk_size):
+                                if not await loop.run_in_executor(None, links_extractor.feed, chunk):
+                                    break
+                    else:
+                        with web_crawler.metrics.time_phase('download', url_host):
+                            content = await resp.read()
+                duration_time = time.time() - start_time
+
+                if cached_page and resp_status == 304:
+                    web_crawler.crawl_cache.incr_stat('not_modified')
+                    hyper_links_set = cached_page['links']
+                    resp_content_md5 = cached_page['md5']
+                    status_code = cached_page['status_code']
+                else:
+                    if web_crawler.streaming:
+                        resp_content_md5 = links_extractor.get_md5()
+                        hyper_links_set = await asyncio.get_event_loop().run_in_executor(
+                            None, web_crawler.finish_links_extractor, url, resp_url, links_extractor)
+                    else:
+                        resp_content_md5 = helpers.get_md5(content)
+                        hyper_links_set = await self.parse_page_links_unless_unchanged(
+                            resp_url, content, resp_content_md5, cached_page)
+                    status_code = str(resp_status)
+                    web_crawler.save_cached_page(
+                        url, status_code, resp_headers, resp_content_md5, hyper_links_set, cached_page)
+                page_fetched = True
+                if int(status_code) > 400:
+                    exception_str = 'HTTP Status Code is {}.'.format(status_code)
+        except aiohttp.ClientSSLError as ex:
+            color_logging("{}: {}".format(url, str(ex)), 'WARNING')
+            exception_str = str(ex)
+            status_code = 'SSLError'
+            retry_times = 0
+        except aiohttp.NonHttpUrlClientError:
+            # keep the same status and message as requests for links like mailto:
+            exception_str = "No connection adapters were found for '{}'".format(url)
+            color_logging("{}: {}".format(url, exception_str), 'WARNING')
+            status_code = 'InvalidSchema'
+            retry_times = 0
+        except aiohttp.InvalidURL as ex:
+            color_logging("{}: {}".format(url, str(ex)), 'WARNING')
+            exception_str = str(ex)
+            status_code = 'InvalidURL'
+            retry_times = 0
+        except aiohttp.ClientPayloadError as ex:
+            color_logging("{}: {}".format(url, str(ex)), 'WARNING')
+            exception_str = str(ex)
+            status_code = 'ChunkedEncodingError'
+            retry_times = 0
+        except asyncio.TimeoutError:
+            time_out = kwargs['timeout']
+            color_logging("Timeout {}: Timed out for {} seconds".format(url, time_out), 'WARNING')
+            exception_str = "Timed out for {} seconds".format(time_out)
+            status_code = 'Timeout'
+        except aiohttp.ClientError as ex:
+            color_logging("ConnectionError {}: {}".format(url, str(ex)), 'WARNING')
+            exception_str = str(ex)
+            status_code = 'ConnectionError'
+            if web_crawler.is_host_unresolvable(url):
+                retry_times = 0
+        except lxml.etree.XMLSyntaxError as ex:
+            color_logging("{}: {}".format(url, str(ex)), 'WARNING')
+            exception_str = str(ex)
+            status_code = 'XMLSyntaxError'
+            retry_times = 0
+        finally:
+            if duration_time is None:
+                # request failed, duration time is until the error
+                duration_time = time.time() - start_time
+            if host_scheduler is not None:
+                host_scheduler.release(url_host, status_code, duration_time)
+
+        if web_crawler.crawl_stopper.is_stopped():
+            # request is done after crawl is stopped, url is left unchecked, and its links are dropped
+            return set()
+
+        if page_fetched:
+            web_crawler.save_page_links(url, hyper_links_set, depth + 1)
+
+        web_crawler._print_log(depth, url, status_code, duration_time)
+        duration_time += retried_duration
+        if retry_times > 0:
+            if not status_code.isdigit() or int(status_code) > 400:
+                # retry in another task, worker goes on with other urls
+                retry_delay = web_crawler.get_retry_delay(status_code, retry_times)
+                retry_task = asyncio.ensure_future(
+                    self.retry_later(url, depth, retry_times-1, duration_time, retry_delay))
+                self.retry_tasks.add(retry_task)
+                retry_task.add_done_callback(self.retry_tasks.discard)
+                return set()
+        else:
+            web_crawler.bad_urls_mapping[url] = exception_str
+
+        web_crawler.metrics.observe_url(url_host, status_code, duration_time)
+        web_crawler.save_cookie_independent_result(
+            url, url_host, url_type, status_code, duration_time, resp_content_md5)
+        web_crawler.save_url_test_result(url, status_code, duration_time, resp_content_md5)
+        return hyper_links_set
+
+    async def retry_later(self, url, depth, retry_times, retried_duration, delay):
+        await asyncio.sleep(delay)
+        await self.get_hyper_links(url, depth, retry_times, retried_duration)
+
+    async def visit_urls(self, urls, depth):
+        """ visit urls of one depth with concurrent workers.
+        """
+        self.urls_deque = collections.deque(urls)
+
+        async def worker():
+            while self.urls_deque:
+                url = self.urls_deque.popleft()
+                self.in_flight_count += 1
+                try:
+                    await self.get_hyper_links(url, depth)
+                finally:
+                    self.in_flight_count -= 1
+
+        workers_num = min(self.concurrency, len(self.urls_deque))
+        await asyncio.gather(*[worker() for _ in range(workers_num)])
+        # retries may schedule further retries
+        while self.retry_tasks:
+            await asyncio.gather(*list(self.retry_tasks))
+
+    async def visit_urls_until(self, urls, depth, deadline=None):
+        """ visit urls of one depth, and stop crawling if deadline is reached before they are done.
+            requests in flight are canceled and their results are dropped.
+        @return
+            False if crawl is stopped
+        """
+        visit_task = asyncio.ensure_future(self.visit_urls(urls, depth))
+        timeout = None if deadline is None else max(deadline - time.time(), 0)
+        done, _ = await asyncio.wait([visit_task], timeout=timeout)
+        if done:
+            visit_task.result()
+            return True
+
+        crawl_stopper = self.web_crawler.crawl_stopper
+        self.web_crawler.stop_crawl("Time budget of {} seconds is used up".format(crawl_stopper.time_budget))
+        await cancel_tasks([visit_task] + list(self.retry_tasks))
+        return False
+
+    def get_unchecked_urls_count(self):
+        """ get number of urls of current depth which are not tested yet, including urls in flight
+            and urls waiting to retry.
+        """
+        return len(self.urls_deque) + self.in_flight_count + len(self.retry_tasks)
+
+    async def run_bfs(self, max_depth):
+        """ start to run test in BFS mode.
+        """
+        web_crawler = self.web_crawler
+        pool_config = web_crawler.connection_pool_config
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=int(pool_config.get('pool_maxsize') or 0)
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trace_configs=[self.make_trace_config()]
+        )
+        try:
+            deferred_urls = {}
+            while web_crawler.current_depth <= max_depth:
+                urls = web_crawler.get_current_depth_unvisited_urls(deferred_urls)
+                if not await self.visit_urls_until(urls, web_crawler.current_depth,
+                                                   web_crawler.crawl_stopper.deadline):
+                    break
+                web_crawler.checkpoint_crawl_store()
+                web_crawler.current_depth += 1
+        finally:
+            await self.session.close()
+
+    def start(self, max_depth):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.run_bfs(max_depth))
+        except KeyboardInterrupt:
+            # unchecked urls are counted before requests in flight are canceled,
+            # session is closed by canceled run_bfs
+            self.web_crawler.stop_crawl("Crawl is canceled")
+            loop.run_until_complete(cancel_tasks(asyncio.all_tasks(loop)))
+            raise
+        finally:
+            loop.close()
+
+
+async def cancel_tasks(tasks):
+    """ cancel tasks and wait until they are done.
+    """
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
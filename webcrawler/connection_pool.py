@@ -0,0 +1,174 @@
+#encoding=utf-8
+import time
+import socket
+import weakref
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+
+from .metrics import add_connect_time
+
+try:
+    # Python3
+    from http.cookiejar import DefaultCookiePolicy
+except ImportError:
+    # Python2
+    from cookielib import DefaultCookiePolicy
+
+
+# connected connections, kept for aborting in-flight requests
+open_connections = weakref.WeakSet()
+open_connections_lock = threading.Lock()
+
+
+def add_open_connection(connection):
+    with open_connections_lock:
+        open_connections.add(connection)
+
+
+def abort_open_connections():
+    """ shut down sockets of all connected connections, requests blocked on them fail at once.
+    @return
+        number of aborted connections
+    """
+    with open_connections_lock:
+        connections = list(open_connections)
+
+    aborted_count = 0
+    for connection in connections:
+        sock = getattr(connection, 'sock', None)
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+            aborted_count += 1
+        except socket.error:
+            # socket is closed already
+            pass
+    return aborted_count
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """ connection which records time of DNS lookup and connecting in current thread.
+    """
+    def connect(self):
+        start_time = time.time()
+        super(TimedHTTPConnection, self).connect()
+        add_connect_time(time.time() - start_time)
+        add_open_connection(self)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """ connection which records time of DNS lookup, connecting and TLS handshake in current thread.
+    """
+    def connect(self):
+        start_time = time.time()
+        super(TimedHTTPSConnection, self).connect()
+        add_connect_time(time.time() - start_time)
+        add_open_connection(self)
+
+
+TIMED_CONNECTION_CLASSES = {
+    'http': TimedHTTPConnection,
+    'https': TimedHTTPSConnection
+}
+
+
+class HostPoolManager(PoolManager):
+    """ PoolManager which supports per-host pool size and keeps track of
+        every connection pool it creates, so that connection reuse can be
+        reported even after a pool has been evicted.
+    """
+    def __init__(self, host_pool_maxsize=None, **kwargs):
+        self.host_pool_maxsize = host_pool_maxsize or {}
+        self.created_pools = []
+        self.created_pools_lock = threading.Lock()
+        super(HostPoolManager, self).__init__(**kwargs)
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        request_context = dict(request_context or self.connection_pool_kw)
+        maxsize = self.host_pool_maxsize.get(host) \
+            or self.host_pool_maxsize.get("{}:{}".format(host, port))
+        if maxsize:
+            request_context['maxsize'] = int(maxsize)
+
+        pool = super(HostPoolManager, self)._new_pool(scheme, host, port, request_context)
+        if scheme in TIMED_CONNECTION_CLASSES:
+            pool.ConnectionCls = TIMED_CONNECTION_CLASSES[scheme]
+        with self.created_pools_lock:
+            self.created_pools.append(pool)
+        return pool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+
+    def __init__(self, host_pool_maxsize=None, **kwargs):
+        # must be set before HTTPAdapter.__init__, which calls init_poolmanager
+        self.host_pool_maxsize = host_pool_maxsize or {}
+        super(PooledHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = HostPoolManager(
+            host_pool_maxsize=self.host_pool_maxsize,
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            **pool_kwargs
+        )
+
+    def get_stats(self):
+        """ sum up request and connection counters of all created pools.
+        """
+        requests_count = 0
+        connections_count = 0
+        with self.poolmanager.created_pools_lock:
+            pools = list(self.poolmanager.created_pools)
+
+        for pool in pools:
+            requests_count += pool.num_requests
+            connections_count += pool.num_connections
+
+        return {
+            'hosts': len(pools),
+            'requests': requests_count,
+            'connections': connections_count,
+            'reused': max(requests_count - connections_count, 0)
+        }
+
+
+class SessionPool(object):
+    """ keep-alive HTTP sessions for crawler workers.
+        Each worker thread gets its own requests.Session, while all sessions
+        share one pooled adapter, thus connections to the same host are reused
+        across workers.
+    """
+    def __init__(self, concurrency, pool_config=None):
+        pool_config = pool_config or {}
+        self.adapter = PooledHTTPAdapter(
+            host_pool_maxsize=pool_config.get('hosts') or {},
+            pool_connections=int(pool_config.get('pool_connections') or 100),
+            pool_maxsize=int(pool_config.get('pool_maxsize') or concurrency),
+            max_retries=0
+        )
+        self._local = threading.local()
+
+    def get_session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            # cookies are passed on each request, do not let responses leak
+            # cookies into later requests like module-level requests.get
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            self._local.session = session
+
+        return session
+
+    def get_stats(self):
+        return self.adapter.get_stats()
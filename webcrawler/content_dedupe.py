@@ -0,0 +1,157 @@
+#encoding=utf-8
+import re
+import hashlib
+import threading
+
+from . import helpers
+from .lru_cache import LRUCache
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# pages with less text, e.g. navigation pages of links, are too short to be judged near-duplicates
+MIN_SHINGLES = 32
+# each bit of a feature hash is spread into a lane of a big integer, thus bit
+# counts of all features are summed in one addition per feature
+LANE_BITS = 32
+LANE_MASK = (1 << LANE_BITS) - 1
+SPREAD_BYTES = [
+    sum(1 << (LANE_BITS * bit) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+TAGS_REGEX = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->|<[^>]*>', re.I | re.S)
+WORDS_REGEX = re.compile(r'\w+', re.U)
+
+
+def get_text_fingerprint(text):
+    """ get 64-bit SimHash fingerprint of text, with shingles of words as features.
+        None if text has less than MIN_SHINGLES distinct shingles.
+    """
+    words = WORDS_REGEX.findall(text.lower())
+    shingles = set(
+        ' '.join(words[index:index + SHINGLE_SIZE])
+        for index in range(len(words) - SHINGLE_SIZE + 1)
+    )
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    lane_bits = LANE_BITS
+    spread_bytes = SPREAD_BYTES
+    bits_counts = 0
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        spread_value = 0
+        for index, byte in enumerate(digest):
+            spread_value |= spread_bytes[byte] << (lane_bits * 8 * index)
+        bits_counts += spread_value
+
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if (bits_counts >> (LANE_BITS * bit) & LANE_MASK) * 2 > len(shingles):
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def get_content_fingerprint(content):
+    """ get SimHash fingerprint of visible text of a web page content.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'ignore')
+    return get_text_fingerprint(TAGS_REGEX.sub(' ', content))
+
+
+class SimHashIndex(object):
+    """ index of page fingerprints for finding near-duplicates within max_distance different bits.
+        Fingerprints are split into max_distance + 1 blocks, near-duplicates have at least
+        one identical block, thus only fingerprints sharing a block are compared.
+    """
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        blocks_number = max_distance + 1
+        block_bits = SIMHASH_BITS // blocks_number
+        self.blocks = [
+            (block_bits * index, (1 << block_bits) - 1 if index < blocks_number - 1
+             else (1 << (SIMHASH_BITS - block_bits * index)) - 1)
+            for index in range(blocks_number)
+        ]
+        # one table of each block, block value => [(fingerprint, url)]
+        self.tables = [{} for _ in self.blocks]
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(pages) for pages in self.tables[0].values())
+
+    def find_or_add(self, fingerprint, url):
+        """ find a near-duplicate page of the fingerprint, or add it if there is none.
+        @return
+            url of near-duplicate page, None if the fingerprint is added
+        """
+        block_values = [fingerprint >> shift & mask for shift, mask in self.blocks]
+        with self.lock:
+            for table, block_value in zip(self.tables, block_values):
+                for indexed_fingerprint, indexed_url in table.get(block_value, ()):
+                    if bin(indexed_fingerprint ^ fingerprint).count('1') <= self.max_distance:
+                        return indexed_url
+
+            for table, block_value in zip(self.tables, block_values):
+                table.setdefault(block_value, []).append((fingerprint, url))
+        return None
+
+
+class ContentDedupe(object):
+    """ dedupe web pages served with identical or near-identical content under different urls.
+        - hyper links of parsed pages are kept by content md5, a page with identical content
+          reuses them without parsing if its links are resolved against the same base url.
+        - if simhash is enabled, pages nearly identical to a page expanded before are not expanded.
+    """
+    def __init__(self, maxsize=2000, simhash_enabled=False, simhash_max_distance=3):
+        self.links_cache = LRUCache(maxsize)
+        self.simhash_index = SimHashIndex(simhash_max_distance) if simhash_enabled else None
+        self.lock = threading.Lock()
+        self.stats = {
+            'identical': 0,
+            'near_duplicate': 0
+        }
+
+    @staticmethod
+    def get_links_key(content_md5, referer_url):
+        """ relative links are resolved against scheme, host and directory of referer url,
+            and pages with the same content md5 and base have the same hyper links.
+        """
+        parsed_object = helpers.get_parsed_object_from_url(referer_url)
+        base_path = parsed_object.path.rsplit('/', 1)[0]
+        return (content_md5, parsed_object.scheme, parsed_object.netloc, base_path)
+
+    def get_links(self, content_md5, referer_url):
+        """ get hyper links set of a parsed page with identical content, None if not found.
+        """
+        hyper_links_set = self.links_cache.get(self.get_links_key(content_md5, referer_url))
+        if hyper_links_set is not None:
+            with self.lock:
+                self.stats['identical'] += 1
+        return hyper_links_set
+
+    def set_links(self, content_md5, referer_url, hyper_links_set):
+        self.links_cache.set(self.get_links_key(content_md5, referer_url), hyper_links_set)
+
+    def find_near_duplicate(self, url, fingerprint):
+        """ find a near-duplicate page expanded before, or index the page if there is none.
+        @return
+            url of near-duplicate page, None if the page should be expanded
+        """
+        if self.simhash_index is None or fingerprint is None:
+            return None
+
+        duplicate_url = self.simhash_index.find_or_add(fingerprint, url)
+        if duplicate_url is not None:
+            with self.lock:
+                self.stats['near_duplicate'] += 1
+        return duplicate_url
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['links_cache'] = self.links_cache.get_stats()
+        if self.simhash_index is not None:
+            stats['fingerprints'] = len(self.simhash_index)
+        return stats
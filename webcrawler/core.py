@@ -4,15 +4,40 @@ import queue
 import re
 import threading
 import copy
+import itertools
 from collections import OrderedDict
 import requests
 import lxml.html
+from urllib3.util.connection import allowed_gai_family
 import multiprocessing
 
 from .helpers import color_logging
 from .url_queue import UrlQueue
+from .connection_pool import SessionPool, abort_open_connections
+from .link_extractor import StreamingLinksExtractor
+from .crawl_cache import CrawlCache
+from .crawl_store import CrawlStore
+from .host_scheduler import HostScheduler
+from .parse_pool import ParsePool
+from .retry_scheduler import RetryScheduler, get_retry_delay
+from .shared_results import SharedUrlResults
+from .result_cache import ResultCache
+from .metrics import CrawlMetrics, pop_connect_time
+from .result_sink import ResultSink, iter_results, save_results_to_yaml
+from .link_graph import LinkGraph, CompactLinkGraph
+from .url_rules import UrlRules
+from .dns_cache import DnsCache
+from .content_dedupe import ContentDedupe, get_content_fingerprint, get_text_fingerprint
+from .url_canonicalizer import UrlCanonicalizer
+from .crawl_trap import CrawlTrapDetector
+from .crawl_stopper import CrawlStopper
 from . import helpers
 
+DEFAULT_ASYNC_CONCURRENCY = 500
+DEFAULT_PORTS = {
+    'http': 80,
+    'https': 443
+}
 
 def parse_seeds(seeds):
     """ parse website seeds.
@@ -48,8 +73,6 @@ class WebCrawler(object):
     def __init__(self, seeds, include_hosts, logs_folder, config_file=None):
         self.website_list = parse_seeds(seeds)
         self.include_hosts_set = set(include_hosts)
-        self.test_counter = 0
-        self.url_queue = UrlQueue()
         self.cookie_str = ''
         self.auth_dict = {}
         self.logs_folder = logs_folder
@@ -61,14 +84,69 @@ class WebCrawler(object):
                 self.auth_dict[host] = website['auth']
 
         self.load_config(config_file)
+        # url queue may be backed by crawl store, which is set later
+        self.crawl_store = None
+        self.init_crawl_state()
+        self.metrics = CrawlMetrics(self.metrics_config.get('buckets'))
+        self.metrics_file = None
+        self.session_pool = None
+        self.async_engine = None
+        self.crawl_cache = None
+        self.result_cache = None
+        self.host_scheduler = None
+        self.parse_pool = None
+        self.frontier_service = None
+        self.distributed_authkey = None
+        self.shared_results = None
+        self.result_sink = None
+        self.dns_cache = None
+        self.crawl_stopper = CrawlStopper()
+        # max depth of pipelined crawl, deeper links are not queued
+        self.max_depth = None
+        # urls which failed in results of a previous run
+        self.failed_history_urls = set()
+        self.profile_crawlers = []
+
+    def init_crawl_state(self):
+        """ init url queues and test results, which are kept separately for each cookie profile
+            in concurrent profiles mode.
+        """
+        self.test_counter = 0
+        self.url_queue = self.make_url_queue()
+        # status code => urls set, only counts of 2xx urls are kept in compact mode
         self.categorised_urls = {}
-        self.web_urls_mapping = {}
+        # status code => urls count
+        self.categorised_urls_count = {}
+        self.categorised_urls_lock = threading.Lock()
+        # hyper links of pages and referer pages of hyper links
+        self.link_graph = self.make_link_graph()
         self.bad_urls_mapping = {}
+        # pages which exceed max body size in streaming mode, url => parsed bytes
+        self.truncated_urls_mapping = {}
+        # hyper links of identical pages and fingerprints of expanded pages
+        self.content_dedupe = self.make_content_dedupe()
+        self.crawl_trap_detector = self.make_crawl_trap_detector()
+        # pages whose content md5 changed since they were cached in crawl cache
+        self.changed_page_urls = set()
+        # urls left in frontier when crawl is stopped
+        self.unchecked_urls_count = None
         self.current_depth_unvisited_urls_queue = queue.Queue()
+        # urls scheduled to retry in DFS mode, (url, depth)
+        self.retry_urls_queue = queue.Queue()
+        # urls scheduled to retry, url => (retry times left, duration time of failed attempts)
+        self.retry_states_mapping = {}
+        # time when unvisited urls are queued, for measuring queue wait
+        self.enqueue_time_mapping = {}
+        self.retry_scheduler = None
+        # urls got in pipelined crawl => the least depth they are linked at,
+        # pages linked by shallower pages after they are got are expanded again
+        self.pipelined_depth_mapping = {}
+        self.pipelined_depth_lock = threading.Lock()
 
     def reset_all(self):
         self.current_depth = 0
         self.current_depth_unvisited_urls_queue.queue.clear()
+        self.pipelined_depth_mapping.clear()
         self.url_queue.clear_unvisited_urls()
 
         for website in self.website_list:
@@ -100,6 +178,45 @@ class WebCrawler(object):
         self.whitelist_fullurls = whitelist_configs.get('fullurl', [])
         self.whitelist_include_keys = whitelist_configs.get('include-key', [])
         self.whitelist_startswith_strs = whitelist_configs.get('startswith', [])
+        # whitelist and include rules compiled for matching hyper links in batches
+        self.url_rules = UrlRules(whitelist_configs, config_dict.get('include'))
+
+        self.connection_pool_config = config_dict.get('connection_pool') or {}
+
+        self.host_scheduler_config = config_dict.get('host_scheduler') or {}
+        self.parse_pool_config = config_dict.get('parse_pool') or {}
+        self.distributed_config = config_dict.get('distributed') or {}
+        self.crawl_store_config = config_dict.get('crawl_store') or {}
+        self.url_queue_config = config_dict.get('url_queue') or {}
+        # status codes may be parsed as int keys
+        self.result_cache_config = config_dict.get('result_cache') or {}
+        self.retry_config = {
+            str(key): value for key, value in (config_dict.get('retry') or {}).items()
+        }
+        self.metrics_config = config_dict.get('metrics') or {}
+        self.result_sink_config = config_dict.get('result_sink') or {}
+        self.dns_cache_config = config_dict.get('dns_cache') or {}
+        self.content_dedupe_config = config_dict.get('content_dedupe') or {}
+        canonicalization_config = config_dict.get('url_canonicalization') or {}
+        self.url_canonicalizer = UrlCanonicalizer(canonicalization_config) \
+            if canonicalization_config.get('enabled', False) else None
+        self.crawl_traps_config = config_dict.get('crawl_traps') or {}
+        priority_config = config_dict.get('priority') or {}
+        self.priority_weights = {
+            'depth': float(priority_config.get('depth', 1)),
+            'referers': float(priority_config.get('referers', 1)),
+            'failed_before': float(priority_config.get('failed_before', 3)),
+            'changed_referer': float(priority_config.get('changed_referer', 2))
+        }
+        self.stop_timeout = float(config_dict.get('stop_timeout', 5))
+        url_parse_cache_config = config_dict.get('url_parse_cache') or {}
+        helpers.urlparsed_object_cache.resize(
+            int(url_parse_cache_config.get('maxsize') or helpers.DEFAULT_URLPARSE_CACHE_SIZE))
+
+        streaming_config = config_dict.get('streaming') or {}
+        self.streaming = streaming_config.get('enabled', False)
+        self.stream_chunk_size = int(streaming_config.get('chunk_size') or 65536)
+        self.max_body_size = int(streaming_config.get('max_body_size') or 0)
 
         self.grey_env = False
 
@@ -118,22 +235,7 @@ class WebCrawler(object):
             return self.user_agent['www']
 
     def parse_url(self, url, referer_url):
-        url = url.strip()
-        if url == "":
-            return None
-
-        for ignore_url_startswith_str in self.whitelist_startswith_strs:
-            if url.startswith(ignore_url_startswith_str):
-                return None
-
-        if url.startswith('\\"'):
-            # \\"https:\\/\\/store.debugtalk.com\\/guides\\/"
-            url = url.encode('utf-8').decode('unicode_escape')\
-                .replace(r'\/', r'/').replace(r'"', r'')
-            return url
-
-        parsed_url = helpers.make_url_with_referer(url, referer_url)
-        return parsed_url
+        return helpers.parse_url(url, referer_url, self.whitelist_startswith_strs)
 
     def get_url_type(self, resp, req_host):
         if req_host not in self.include_hosts_set:
@@ -149,42 +251,128 @@ class WebCrawler(object):
         return url_type
 
     def parse_urls(self, urls_set, referer_url):
-        parsed_urls_set = set()
-        for url in urls_set:
-            parsed_url = self.parse_url(url, referer_url)
-            if parsed_url is None:
-                continue
-            parsed_urls_set.add(parsed_url)
-        return parsed_urls_set
+        return helpers.parse_urls(urls_set, referer_url, self.url_rules.ignore_prefix_matcher)
 
     def parse_page_links(self, referer_url, content):
         """ parse a web pages and get all hyper links.
         """
-        raw_links_set = set()
+        host = helpers.get_parsed_object_from_url(referer_url).netloc
+        if self.parse_pool is not None:
+            # parse and normalize are both done in parser processes
+            with self.metrics.time_phase('parse', host):
+                return self.parse_pool.submit_page(referer_url, content).result()
+
+        with self.metrics.time_phase('parse', host):
+            raw_links_set = helpers.get_raw_links_from_page(content)
+        with self.metrics.time_phase('normalize', host):
+            parsed_urls_set = self.parse_urls(raw_links_set, referer_url)
+        return parsed_urls_set
 
-        try:
-            etree = lxml.html.fromstring(content)
-        except lxml.etree.ParserError:
-            return raw_links_set
+    def get_page_links_without_parsing(self, referer_url, content, content_md5, cached_page=None):
+        """ get hyper links of a web page without parsing it:
+            - links of cached page, if page content md5 is unchanged
+            - links of a parsed page with identical content
+            - no links, if page is a near-duplicate of a page expanded before
+            return None if the web page should be parsed.
+        """
+        if cached_page and cached_page['md5'] == content_md5:
+            self.crawl_cache.incr_stat('md5_unchanged')
+            return cached_page['links']
 
-        link_elements_list = etree.xpath("//link|//a|//script|//img")
-        for link in link_elements_list:
-            url = link.get('href') or link.get('src')
-            if url is None:
-                continue
+        if self.content_dedupe is None:
+            return None
 
-            raw_links_set.add(url)
+        hyper_links_set = self.content_dedupe.get_links(content_md5, referer_url)
+        if hyper_links_set is not None:
+            return hyper_links_set
 
-        parsed_urls_set = self.parse_urls(raw_links_set, referer_url)
-        return parsed_urls_set
+        if self.content_dedupe.simhash_index is not None \
+            and self.is_near_duplicate_page(referer_url, get_content_fingerprint(content)):
+            return set()
+
+        return None
+
+    def is_near_duplicate_page(self, url, fingerprint):
+        duplicate_url = self.content_dedupe.find_near_duplicate(url, fingerprint)
+        if duplicate_url is None:
+            return False
+
+        color_logging("{}: page is a near-duplicate of {}, links are not expanded.".format(url, duplicate_url),
+                      'DEBUG')
+        return True
+
+    def save_parsed_page_links(self, referer_url, content_md5, hyper_links_set):
+        """ keep hyper links of parsed page, for pages with identical content.
+        """
+        if self.content_dedupe is not None:
+            self.content_dedupe.set_links(content_md5, referer_url, hyper_links_set)
+
+    def parse_page_links_unless_unchanged(self, referer_url, content, content_md5, cached_page=None):
+        """ reuse hyper links of cached page or identical page, otherwise parse the web page.
+        """
+        hyper_links_set = self.get_page_links_without_parsing(referer_url, content, content_md5, cached_page)
+        if hyper_links_set is None:
+            hyper_links_set = self.parse_page_links(referer_url, content)
+            self.save_parsed_page_links(referer_url, content_md5, hyper_links_set)
+        return hyper_links_set
+
+    def make_links_extractor(self):
+        keep_text = self.content_dedupe is not None and self.content_dedupe.simhash_index is not None
+        return StreamingLinksExtractor(self.max_body_size, keep_text)
+
+    def finish_links_extractor(self, url, resp_url, links_extractor):
+        """ get parsed hyper links set from streaming links extractor,
+            and record the page if it is truncated.
+        """
+        if links_extractor.truncated:
+            color_logging(
+                "{}: page is truncated, only {} bytes are parsed.".format(url, links_extractor.body_size),
+                'WARNING')
+            self.truncated_urls_mapping[url] = links_extractor.body_size
+
+        host = helpers.get_parsed_object_from_url(resp_url).netloc
+        with self.metrics.time_phase('parse', host):
+            raw_links_set = links_extractor.finish()
+        if links_extractor.keep_text \
+            and self.is_near_duplicate_page(resp_url, get_text_fingerprint(links_extractor.get_text())):
+            return set()
+        with self.metrics.time_phase('normalize', host):
+            return self.parse_urls(raw_links_set, resp_url)
+
+    def parse_page_links_streaming(self, url, resp):
+        """ parse hyper links and md5 of a web page by iterating content chunks,
+            the response should be requested with stream=True.
+        """
+        links_extractor = self.make_links_extractor()
+        # incremental parsing of chunks is counted as download
+        with self.metrics.time_phase('download', helpers.get_parsed_object_from_url(url).netloc):
+            try:
+                for chunk in resp.iter_content(chunk_size=self.stream_chunk_size):
+                    if not links_extractor.feed(chunk):
+                        break
+            finally:
+                resp.close()
+
+        hyper_links_set = self.finish_links_extractor(url, resp.url, links_extractor)
+        return hyper_links_set, links_extractor.get_md5()
 
     def save_categorised_url(self, status_code, url):
-        """ save url by status_code category
+        """ save url by status_code category, urls are counted in crawl store if url queue is backed by it.
         """
-        if status_code not in self.categorised_urls:
-            self.categorised_urls[status_code] = set()
+        if self.url_queue.crawl_store is not None:
+            return
+
+        with self.categorised_urls_lock:
+            if self.url_queue.compact and status_code.startswith('2'):
+                self.categorised_urls_count[status_code] = self.categorised_urls_count.get(status_code, 0) + 1
+                return
 
-        self.categorised_urls[status_code].add(url)
+            if status_code not in self.categorised_urls:
+                self.categorised_urls[status_code] = set()
+
+            urls_set = self.categorised_urls[status_code]
+            urls_set.add(url)
+            self.categorised_urls_count[status_code] = len(urls_set)
 
     def _print_log(self, depth, url, status_code, duration_time):
         self.test_counter += 1
@@ -193,57 +381,650 @@ class WebCrawler(object):
             .format(self.test_counter, depth, url, self.cookie_str, status_code, round(duration_time, 3)), 'DEBUG')
 
     def is_url_has_whitelist_key(self, url):
-        for key in self.whitelist_include_keys:
-            if key in url:
-                return True
-
-        return False
+        return self.url_rules.ignore_keyword_matcher.search(url)
 
-    def get_hyper_links(self, url, depth, retry_times=3):
-        if url in self.whitelist_fullurls:
-            return set()
+    def get_request_kwargs(self, url):
+        """ get request kwargs of the specified url.
+            return None if the url is in whitelist and should not be tested.
+        """
+        parsed_object = helpers.get_parsed_object_from_url(url)
+        url_host = parsed_object.netloc
+        if self.url_rules.is_ignored_url(url, url_host):
+            return None
 
-        hyper_links_set = set()
         kwargs = copy.deepcopy(self.kwargs)
         if not self.grey_env:
             kwargs['headers']['User-Agent'] = self.get_user_agent_by_url(url)
+        if url_host in self.auth_dict and self.auth_dict[url_host]:
+            kwargs['auth'] = self.auth_dict[url_host]
+
+        return kwargs
+
+    def set_result_cache(self, cache_file):
+        """ enable persistent result cache, results of external and static urls
+            will be reused in later runs until they expire.
+        """
+        self.result_cache = ResultCache(cache_file, self.result_cache_config.get('ttl'))
+
+    def make_url_queue(self):
+        config = self.url_queue_config
+        store_backed = self.crawl_store is not None and self.crawl_store_config.get('store_backed', False)
+        return UrlQueue(
+            config.get('compact', False),
+            float(config.get('false_positive_rate') or 0.001),
+            int(config.get('initial_capacity') or 100000),
+            self.crawl_store if store_backed else None
+        )
+
+    def make_link_graph(self):
+        if not self.url_queue.compact:
+            return LinkGraph()
+        # referers of failed urls are read from crawl store if url queue is backed by it
+        return CompactLinkGraph(
+            self.url_queue.is_url_visited,
+            self.url_queue.is_url_passed,
+            failed_referers=self.url_queue.crawl_store is None
+        )
+
+    @property
+    def web_urls_mapping(self):
+        """ read-only mapping of page url => hyper links list, kept for compatibility.
+            it is built from link graph on each access, pages are not added to it.
+            in compact mode, hyper links of tested pages are not kept.
+        """
+        return self.link_graph.to_dict()
+
+    def make_content_dedupe(self):
+        config = self.content_dedupe_config
+        if not config.get('enabled', False):
+            return None
+
+        simhash_config = config.get('simhash') or {}
+        return ContentDedupe(
+            int(config.get('maxsize') or 2000),
+            simhash_config.get('enabled', False),
+            int(simhash_config.get('max_distance', 3))
+        )
+
+    def make_crawl_trap_detector(self):
+        config = self.crawl_traps_config
+        if not config.get('enabled', False):
+            return None
+
+        return CrawlTrapDetector(
+            int(config.get('max_urls_per_pattern') or 0),
+            int(config.get('max_repeated_segments') or 0)
+        )
+
+    def set_result_sink(self, results_file, append=False):
+        """ stream test result of each url to JSON lines file while crawling.
+            if append is True, results of resumed crawl are appended to the file.
+        """
+        self.result_sink = ResultSink(
+            results_file,
+            append,
+            int(self.result_sink_config.get('batch_size') or 1000)
+        )
+
+    def set_crawl_cache(self, cache_file):
+        """ enable persistent crawl cache, recursive pages will be requested conditionally
+            and hyper links of unchanged pages will be reused.
+        """
+        self.crawl_cache = CrawlCache(cache_file)
+
+    def set_crawl_store(self, store_file, resume=False):
+        """ checkpoint crawl progress to persistent crawl store.
+            if resume is True, results of the interrupted crawl are restored from
+            crawl store, and its unvisited urls will be crawled when it is started again.
+        """
+        self.crawl_store = CrawlStore(
+            store_file,
+            resume,
+            int(self.crawl_store_config.get('checkpoint_batch_size') or 1000)
+        )
+        if self.crawl_store_config.get('store_backed', False):
+            # make url queue and link graph backed by crawl store, visited urls are loaded if resumed
+            self.init_crawl_state()
+        if not resume:
+            return
+
+        if self.url_queue.crawl_store is None:
+            for url, url_test_res, exception_str in self.crawl_store.iter_visited_urls():
+                self.url_queue.add_visited_url(url, url_test_res)
+                self.save_categorised_url(url_test_res['status_code'], url)
+                if exception_str is not None:
+                    self.bad_urls_mapping[url] = exception_str
+
+        for url, hyper_links in self.crawl_store.iter_page_links():
+            self.link_graph.add_page_links(url, hyper_links, self.get_canonical_links(hyper_links))
+
+        color_logging("Restored {} visited urls from crawl store: {}".format(
+            self.url_queue.get_visited_urls_count(), store_file))
+
+    def start_crawl_store_job(self):
+        """ start crawl job of current cookies in crawl store.
+        @return
+            False if the job is finished before and should be skipped.
+        """
+        seed_urls = [website['url'] for website in self.website_list]
+        job_state = self.crawl_store.start_job(self.cookie_str, seed_urls)
+        if job_state == 'started':
+            return True
+
+        # seed urls are removed from visited urls in reset_all
+        for url in seed_urls:
+            url_test_res = self.crawl_store.get_visited_url_test_result(url)
+            if url_test_res is not None:
+                self.url_queue.add_visited_url(url, url_test_res)
+
+        if job_state == 'finished':
+            return False
+
+        self.url_queue.clear_unvisited_urls()
+        for url, depth in self.crawl_store.iter_unvisited_urls():
+            self.url_queue.add_unvisited_url(url, depth)
+        color_logging("Resume crawl job with {} unvisited urls."
+            .format(self.url_queue.get_unvisited_urls_count()))
+        return True
+
+    def export_metrics(self, metrics_file=None, metrics_port=None):
+        """ export timing metrics in Prometheus text format while crawling,
+            to a file which is updated periodically, and/or on http://127.0.0.1:port/metrics.
+        """
+        if metrics_file:
+            self.metrics_file = metrics_file
+            self.metrics.start_exporting(
+                metrics_file, float(self.metrics_config.get('export_interval') or 10))
+        if metrics_port:
+            self.metrics.serve(int(metrics_port))
+
+    def set_parse_processes(self, processes):
+        """ parse web pages in a pool of processes instead of fetch workers.
+        """
+        self.parse_pool = ParsePool(
+            processes,
+            self.url_rules.ignore_prefix_matcher,
+            int(self.parse_pool_config.get('batch_size') or 8),
+            float(self.parse_pool_config.get('batch_timeout') or 0.01)
+        )
+
+    def make_host_scheduler(self, concurrency):
+        config = self.host_scheduler_config
+        if not config.get('enabled', False):
+            return None
+
+        return HostScheduler(
+            int(config.get('internal_max_concurrency') or concurrency),
+            int(config.get('external_max_concurrency') or concurrency),
+            int(config.get('min_concurrency') or 1),
+            float(config.get('latency_factor') or 3.0),
+            float(config.get('decrease_factor') or 0.5)
+        )
+
+    def get_cached_page(self, url, kwargs):
+        """ get cached page of the url, and add conditional request headers to kwargs.
+        """
+        if self.crawl_cache is None:
+            return None
+
+        cached_page = self.crawl_cache.get(url, self.cookie_str)
+        if cached_page is None:
+            return None
+
+        if cached_page['etag']:
+            kwargs['headers']['If-None-Match'] = cached_page['etag']
+        if cached_page['last_modified']:
+            kwargs['headers']['If-Modified-Since'] = cached_page['last_modified']
+        return cached_page
+
+    def save_cached_page(self, url, status_code, resp_headers, resp_content_md5, hyper_links_set,
+                         cached_page=None):
+        if self.crawl_cache is None or not status_code.startswith('2'):
+            return
+
+        etag = resp_headers.get('ETag')
+        last_modified = resp_headers.get('Last-Modified')
+        if cached_page \
+            and cached_page['md5'] == resp_content_md5 \
+            and cached_page['status_code'] == status_code \
+            and cached_page['etag'] == etag \
+            and cached_page['last_modified'] == last_modified:
+            # page is unchanged, no need to update cache
+            return
+
+        self.crawl_cache.incr_stat('missed')
+        self.crawl_cache.set(
+            url,
+            self.cookie_str,
+            status_code,
+            etag,
+            last_modified,
+            resp_content_md5,
+            hyper_links_set
+        )
+
+    def save_page_links(self, url, hyper_links_set, hyper_links_depth=0):
+        """ save hyper links of recursive page, and add them to unvisited urls.
+        """
+        start_time = time.time()
+        hyper_links = list(hyper_links_set)
+        canonical_links = self.get_canonical_links(hyper_links)
+        if self.max_depth is None:
+            self.add_page_links(url, hyper_links, canonical_links)
+        else:
+            with self.pipelined_depth_lock:
+                # depth of the page may be lowered after it is got
+                hyper_links_depth = self.pipelined_depth_mapping.get(url, hyper_links_depth - 1) + 1
+                self.add_page_links(url, hyper_links, canonical_links)
+        if canonical_links is not None:
+            # raw links are kept in link graph, while urls are deduped and queued as canonical urls
+            hyper_links_set = set(canonical_links)
+        tested_urls, new_urls = self.queue_page_links(hyper_links_set, hyper_links_depth)
+        if self.max_depth is not None:
+            new_urls += self.expand_pages_again(tested_urls, hyper_links_depth)
+
+        if self.dns_cache is not None:
+            self.prefetch_hosts(new_urls)
+
+        end_time = time.time()
+        if self.frontier_service is None:
+            # urls queued in distributed coordinator are fetched by workers
+            for new_url in new_urls:
+                self.enqueue_time_mapping[new_url] = end_time
+        self.metrics.observe_phase(
+            'enqueue', helpers.get_parsed_object_from_url(url).netloc, end_time - start_time)
+
+    def add_page_links(self, url, hyper_links, canonical_links):
+        if self.link_graph.add_page_links(url, hyper_links, canonical_links) and self.crawl_store is not None:
+            self.crawl_store.add_page_links(url, hyper_links)
+
+    def queue_page_links(self, hyper_links_set, hyper_links_depth):
+        """ add hyper links of a page to unvisited urls.
+        @return
+            (tested urls, new added urls)
+        """
+        # urls which are not tested are not queued, nor are new urls of crawl traps
+        trap_filter = None if self.crawl_trap_detector is None else self.crawl_trap_detector.filter_urls
+        tested_urls = self.url_rules.filter_urls(hyper_links_set)
+        if self.max_depth is not None and hyper_links_depth > self.max_depth:
+            # they may be linked by shallower pages later
+            tested_urls = []
+        new_urls = self.url_queue.add_unvisited_urls(tested_urls, hyper_links_depth, trap_filter)
+        # queued urls are linked by one more page
+        self.url_queue.reprioritize_unvisited_urls(tested_urls)
+        if self.crawl_store is not None and new_urls:
+            self.crawl_store.add_frontier_urls(new_urls, hyper_links_depth)
+        return tested_urls, new_urls
+
+    def expand_pages_again(self, urls, depth):
+        """ in pipelined crawl, lower depth of urls which are got with more depth, and queue
+            hyper links of fetched pages again with the lowered depth, thus pages are expanded
+            within max depth as in BFS mode. Links of tested pages are not kept in compact mode.
+        @return
+            new added urls
+        """
+        new_urls = []
+        pages = [(urls, depth)]
+        while pages:
+            urls, depth = pages.pop()
+            for url in urls:
+                with self.pipelined_depth_lock:
+                    if self.pipelined_depth_mapping.get(url, depth) <= depth:
+                        # url is not got yet, or it is got with no more depth
+                        continue
+                    self.pipelined_depth_mapping[url] = depth
+                    # pages which are not fetched yet will save their links with the lowered depth
+                    hyper_links = self.link_graph.get_page_links(url)
+                if not hyper_links:
+                    continue
+
+                canonical_links = self.get_canonical_links(hyper_links)
+                hyper_links_set = set(hyper_links if canonical_links is None else canonical_links)
+                tested_urls, page_new_urls = self.queue_page_links(hyper_links_set, depth + 1)
+                new_urls += page_new_urls
+                pages.append((tested_urls, depth + 1))
+        return new_urls
+
+    def get_canonical_links(self, hyper_links):
+        """ get canonical urls of hyper links in the same order, None if canonicalization is disabled.
+        """
+        if self.url_canonicalizer is None:
+            return None
+        return self.url_canonicalizer.canonicalize_urls(hyper_links)
+
+    def prefetch_hosts(self, urls):
+        """ resolve hosts of new queued urls in background, so that they are cached when requested.
+        """
+        for url in urls:
+            host_port = self.get_host_port(url)
+            if host_port is not None:
+                self.dns_cache.prefetch(host_port[0], host_port[1], allowed_gai_family())
+
+    def get_host_port(self, url):
+        """ get host and port of url looked up by DNS cache.
+        @return
+            (host, port), None if url is not http(s) or its port is invalid.
+        """
         parsed_object = helpers.get_parsed_object_from_url(url)
-        url_host = parsed_object.netloc
-        if url_host in self.whitelist_host:
+        if parsed_object.scheme not in DEFAULT_PORTS or not parsed_object.hostname:
+            return None
+        try:
+            return parsed_object.hostname, parsed_object.port or DEFAULT_PORTS[parsed_object.scheme]
+        except ValueError:
+            # invalid port
+            return None
+
+    def is_host_unresolvable(self, url):
+        """ check if host of url does not exist as resolved recently, its urls should fail without retrying.
+        """
+        if self.dns_cache is None:
+            return False
+        host_port = self.get_host_port(url)
+        return host_port is not None and self.dns_cache.is_unresolvable(*host_port)
+
+    def get_url_priority(self, url):
+        """ get priority of unvisited url in PRIORITY mode, urls with lower value are tested first:
+            shallow urls, urls linked by many pages, urls which failed in a previous run,
+            and urls linked first by pages whose content changed since they were cached.
+        """
+        weights = self.priority_weights
+        priority = weights['depth'] * self.url_queue.get_unvisited_url_depth(url)
+        referers_count = self.link_graph.get_referers_count(url)
+        if referers_count > 1:
+            # log2 of referers count, thus priority changes only when referers count doubles
+            priority -= weights['referers'] * (referers_count.bit_length() - 1)
+        if url in self.failed_history_urls:
+            priority -= weights['failed_before']
+        if self.changed_page_urls and self.link_graph.get_first_referer_url(url) in self.changed_page_urls:
+            priority -= weights['changed_referer']
+        return priority
+
+    def load_priority_history(self, results_file):
+        """ load urls which failed in JSON lines results file of a previous run,
+            they are tested first in PRIORITY mode.
+        """
+        for record in iter_results(results_file):
+            if helpers.get_status_class(str(record['status_code'])) not in ['2xx', '3xx']:
+                self.failed_history_urls.add(record['url'])
+        color_logging("Load {} failed urls from results file: {}".format(
+            len(self.failed_history_urls), results_file))
+
+    def set_time_budget(self, time_budget):
+        """ stop crawling time_budget seconds from now, in PIPELINE and PRIORITY modes of threading engine,
+            or in asyncio engine.
+        """
+        self.crawl_stopper.set_time_budget(time_budget)
+
+    def get_unchecked_urls_count(self):
+        unchecked_urls_count = self.url_queue.get_unvisited_urls_count() \
+            + self.current_depth_unvisited_urls_queue.qsize()
+        if self.async_engine is not None:
+            unchecked_urls_count += self.async_engine.get_unchecked_urls_count()
+        return unchecked_urls_count
+
+    def stop_crawl(self, reason):
+        """ stop crawling promptly, e.g. when time budget is used up or crawl is canceled.
+            Workers stop testing urls, in-flight requests are aborted and their urls are left
+            unchecked, thus results only include urls tested before, and unchecked urls are
+            kept in crawl store frontier for resuming.
+        """
+        is_first_stop = self.crawl_stopper.stop(reason)
+        for crawler in self.profile_crawlers or [self]:
+            if crawler.unchecked_urls_count is None:
+                crawler.unchecked_urls_count = crawler.get_unchecked_urls_count()
+        if not is_first_stop:
+            return
+
+        color_logging("{}, stop crawling.".format(reason), 'WARNING')
+        aborted_count = abort_open_connections()
+        in_flight_count = self.crawl_stopper.wait_in_flight(self.stop_timeout)
+        if aborted_count or in_flight_count:
+            color_logging("Aborted {} open connections, {} urls are still in flight after {} seconds."
+                          .format(aborted_count, in_flight_count, self.stop_timeout), 'WARNING')
+
+    def observe_queue_wait(self, url):
+        """ record how long the url waits in frontier since it is queued.
+        """
+        enqueue_time = self.enqueue_time_mapping.pop(url, None)
+        if enqueue_time is not None:
+            self.metrics.observe_phase(
+                'queue_wait', helpers.get_parsed_object_from_url(url).netloc, time.time() - enqueue_time)
+
+    def send_timed_request(self, request_method, url, url_host, **kwargs):
+        """ send request and record connect, TTFB and download time of it.
+            connect time is recorded by connections of session pool in current thread,
+            download time is recorded by caller if the response is streamed.
+        """
+        pop_connect_time()
+        start_time = time.time()
+        resp = request_method(url, **kwargs)
+        duration_time = time.time() - start_time
+        connect_time = pop_connect_time()
+        # elapsed is the time from sending request to parsing response headers
+        headers_time = resp.elapsed.total_seconds()
+        if connect_time is not None:
+            self.metrics.observe_phase('connect', url_host, connect_time)
+        self.metrics.observe_phase('ttfb', url_host, max(headers_time - (connect_time or 0), 0))
+        if not kwargs.get('stream'):
+            self.metrics.observe_phase('download', url_host, max(duration_time - headers_time, 0))
+        return resp
+
+    def save_url_test_result(self, url, status_code, duration_time, resp_content_md5):
+        self.save_categorised_url(status_code, url)
+        url_test_res = {
+            'status_code': status_code,
+            'duration_time': duration_time,
+            'md5': resp_content_md5
+        }
+        self.url_queue.add_visited_url(url, url_test_res)
+        if self.crawl_store is not None:
+            self.crawl_store.add_visited_url(url, url_test_res, self.bad_urls_mapping.get(url))
+        if self.result_sink is not None:
+            self.result_sink.write({
+                'url': url,
+                'cookie': self.cookie_str,
+                'status_code': status_code,
+                'duration_time': duration_time,
+                'md5': resp_content_md5,
+                'exception': self.bad_urls_mapping.get(url),
+                # the first known referer, all referers can be derived from links of pages
+                'referer': self.link_graph.get_first_referer_url(url),
+                'links': self.link_graph.get_page_links(url)
+            })
+        self.link_graph.set_url_tested(url, status_code)
+        if self.url_queue.crawl_store is not None:
+            # exception is kept in crawl store
+            self.bad_urls_mapping.pop(url, None)
+
+    def get_retry_delay(self, status_code, retry_times):
+        """ get delay seconds before retrying a url failed with status_code.
+        """
+        return get_retry_delay(self.retry_config, status_code, 4 - retry_times)
+
+    def save_reused_url_result(self, url, reused_result, source):
+        """ save test result of url reused from result cache or another cookie profile.
+        """
+        color_logging("url: {}, cookie: {}, status_code: {}, result is reused from {}."
+            .format(url, self.cookie_str, reused_result['status_code'], source), 'DEBUG')
+        if reused_result['exception_str'] is not None:
+            self.bad_urls_mapping[url] = reused_result['exception_str']
+        self.save_url_test_result(
+            url, reused_result['status_code'], reused_result['duration_time'], reused_result['md5'])
+
+    def reuse_cached_url_result(self, url):
+        """ reuse result of url in result cache.
+        @return
+            True if the result is reused, and url should not be tested.
+        """
+        if self.result_cache is None:
+            return False
+
+        cached_result = self.result_cache.get(url)
+        if cached_result is None:
+            return False
+
+        self.save_reused_url_result(url, cached_result, 'result cache')
+        return True
+
+    def save_cookie_independent_result(self, url, url_host, url_type, status_code, duration_time,
+                                       resp_content_md5):
+        """ save result of external or static url to result cache, and share it with other cookie profiles.
+        """
+        if url_host in self.include_hosts_set and url_type != 'static':
+            return
+
+        exception_str = self.bad_urls_mapping.get(url)
+        if self.result_cache is not None:
+            self.result_cache.set(url, status_code, duration_time, resp_content_md5, exception_str)
+        if self.shared_results is not None:
+            self.shared_results.publish(url, status_code, duration_time, resp_content_md5, exception_str)
+
+    def get_hyper_links(self, url, depth):
+        if not self.crawl_stopper.enter():
+            # crawl is stopped, url is left unchecked
             return set()
-        if self.is_url_has_whitelist_key(url):
+
+        try:
+            # url may be scheduled to retry
+            retry_times, retried_duration = self.retry_states_mapping.pop(url, (3, 0))
+            if retry_times < 3:
+                return self.fetch_hyper_links(url, depth, retry_times, retried_duration)
+
+            self.observe_queue_wait(url)
+
+            if self.reuse_cached_url_result(url):
+                return set()
+
+            if self.shared_results is None:
+                return self.fetch_hyper_links(url, depth, retry_times)
+
+            url_host = helpers.get_parsed_object_from_url(url).netloc
+            is_external = url_host not in self.include_hosts_set
+            # url claimed by another profile is put back to frontier when its result is published
+            shared_result, deferred = self.shared_results.acquire(
+                url, self if is_external else None, lambda: self.retry_scheduler.hold(url, depth))
+            if deferred:
+                return set()
+            if shared_result is not None:
+                self.save_reused_url_result(url, shared_result, 'another cookie profile')
+                return set()
+
+            try:
+                return self.fetch_hyper_links(url, depth, retry_times)
+            except Exception:
+                self.release_shared_url(url)
+                raise
+        finally:
+            self.crawl_stopper.exit()
+
+    def release_shared_url(self, url):
+        """ release claim of url in shared results without result, other profiles will test it.
+        """
+        if self.shared_results is not None:
+            self.shared_results.release(url, self)
+
+    def acquire_host_slot(self, url, url_host, depth, retry_times=3, retried_duration=0):
+        """ take a request slot of url host in host scheduler.
+            if the host is at its concurrency limit, the url is deferred and put back to frontier
+            when a request of the host is done, thus the worker goes on with other urls.
+            in pipelined crawl, deferred urls keep their depth in url queue and are put back
+            to its head, otherwise they are pending in retry scheduler until they are put back.
+        @return
+            False if the url is deferred
+        """
+        is_internal = url_host in self.include_hosts_set
+        retry_scheduler = self.retry_scheduler
+        if retry_scheduler is None:
+            # distributed workers report results of leased urls in order
+            self.host_scheduler.acquire(url_host, is_internal)
+            return True
+
+        pipelined = self.max_depth is not None
+
+        def put_back():
+            if retry_times < 3:
+                # keep retry state of a deferred retry
+                self.retry_states_mapping[url] = (retry_times, retried_duration)
+            if pipelined:
+                # the url is put back before the request which calls back is done,
+                # thus unvisited queue is not joined in between
+                self.url_queue.put_back_deferred_url(url)
+            else:
+                retry_scheduler.schedule(url, depth, 0)
+
+        if pipelined:
+            # depth of the url is lowered if it is linked by shallower pages before it is put back,
+            # it is kept before the url may be put back by another worker
+            self.url_queue.defer_unvisited_url(url, depth)
+        if not self.host_scheduler.acquire_or_defer(url_host, is_internal, put_back):
+            return False
+
+        if pipelined:
+            self.url_queue.undefer_unvisited_url(url)
+        return True
+
+    def fetch_hyper_links(self, url, depth, retry_times=3, retried_duration=0):
+        """ test url and get hyper links of it if it is a recursive page.
+        @params
+            retried_duration: duration time of failed attempts, which is added to duration time of url
+        """
+        kwargs = self.get_request_kwargs(url)
+        if kwargs is None:
+            self.release_shared_url(url)
             return set()
-        if url_host in self.auth_dict and self.auth_dict[url_host]:
-            kwargs['auth'] = self.auth_dict[url_host]
 
+        hyper_links_set = set()
+        page_fetched = False
+        url_host = helpers.get_parsed_object_from_url(url).netloc
+        url_type = None
         exception_str = ""
         status_code = '0'
         resp_content_md5 = None
-        duration_time = 0
+        duration_time = None
+        session = self.session_pool.get_session()
+        if self.host_scheduler is not None \
+            and not self.acquire_host_slot(url, url_host, depth, retry_times, retried_duration):
+            return set()
+        start_time = time.time()
         try:
-            start_time = time.time()
-            resp = requests.head(url, **kwargs)
+            resp = self.send_timed_request(session.head, url, url_host, **kwargs)
             url_type = self.get_url_type(resp, url_host)
             if url_type in ['static', 'external']:
                 if resp.status_code in [301, 302, 404, 500]:
                     # some links can not be visited with HEAD method and will return 404 status code
                     # so we recheck with GET method here.
-                    start_time = time.time()
-                    resp = requests.get(url, **kwargs)
+                    resp = self.send_timed_request(session.get, url, url_host, **kwargs)
                 duration_time = time.time() - start_time
                 status_code = str(resp.status_code)
             else:
-                # recursive
-                start_time = time.time()
-                resp = requests.get(url, **kwargs)
-                duration_time = time.time() - start_time
-                resp_content_md5 = helpers.get_md5(resp.content)
-                hyper_links_set = self.parse_page_links(resp.url, resp.content)
-                if url not in self.web_urls_mapping:
-                    self.web_urls_mapping[url] = list(hyper_links_set)
-                status_code = str(resp.status_code)
-                self.url_queue.add_unvisited_urls(hyper_links_set)
-                if resp.status_code > 400:
+                # recursive, duration time includes the HEAD request
+                cached_page = self.get_cached_page(url, kwargs)
+                resp = self.send_timed_request(
+                    session.get, url, url_host, stream=self.streaming, **kwargs)
+                if cached_page and resp.status_code == 304:
+                    resp.close()
+                    duration_time = time.time() - start_time
+                    self.crawl_cache.incr_stat('not_modified')
+                    hyper_links_set = cached_page['links']
+                    resp_content_md5 = cached_page['md5']
+                    status_code = cached_page['status_code']
+                else:
+                    if self.streaming:
+                        hyper_links_set, resp_content_md5 = self.parse_page_links_streaming(url, resp)
+                        duration_time = time.time() - start_time
+                    else:
+                        duration_time = time.time() - start_time
+                        resp_content_md5 = helpers.get_md5(resp.content)
+                        hyper_links_set = self.parse_page_links_unless_unchanged(
+                            resp.url, resp.content, resp_content_md5, cached_page)
+                    status_code = str(resp.status_code)
+                    if cached_page and cached_page['md5'] != resp_content_md5:
+                        # links of changed pages are tested first in PRIORITY mode
+                        self.changed_page_urls.add(url)
+                    self.save_cached_page(
+                        url, status_code, resp.headers, resp_content_md5, hyper_links_set, cached_page)
+                page_fetched = True
+                if int(status_code) > 400:
                     exception_str = 'HTTP Status Code is {}.'.format(status_code)
         except requests.exceptions.SSLError as ex:
             color_logging("{}: {}".format(url, str(ex)), 'WARNING')
@@ -254,6 +1035,8 @@ class WebCrawler(object):
             color_logging("ConnectionError {}: {}".format(url, str(ex)), 'WARNING')
             exception_str = str(ex)
             status_code = 'ConnectionError'
+            if self.is_host_unresolvable(url):
+                retry_times = 0
         except requests.exceptions.Timeout:
             time_out = kwargs['timeout']
             color_logging("Timeout {}: Timed out for {} seconds".format(url, time_out), 'WARNING')
@@ -279,37 +1062,61 @@ class WebCrawler(object):
             exception_str = str(ex)
             status_code = 'XMLSyntaxError'
             retry_times = 0
+        finally:
+            if duration_time is None:
+                # request failed, duration time is until the error
+                duration_time = time.time() - start_time
+            if self.host_scheduler is not None:
+                self.host_scheduler.release(url_host, status_code, duration_time)
+
+        if self.crawl_stopper.is_stopped():
+            # request is aborted or done after crawl is stopped, url is left unchecked,
+            # and its links are dropped
+            self.release_shared_url(url)
+            return set()
+
+        if page_fetched:
+            self.save_page_links(url, hyper_links_set, depth + 1)
 
         self._print_log(depth, url, status_code, duration_time)
+        duration_time += retried_duration
         if retry_times > 0:
             if not status_code.isdigit() or int(status_code) > 400:
-                time.sleep((4-retry_times)*2)
-                return self.get_hyper_links(url, depth, retry_times-1)
+                retry_delay = self.get_retry_delay(status_code, retry_times)
+                if self.retry_scheduler is None:
+                    time.sleep(retry_delay)
+                    return self.fetch_hyper_links(url, depth, retry_times-1, duration_time)
+
+                # url will be put back to frontier when it is due, worker goes on with other urls
+                self.retry_states_mapping[url] = (retry_times - 1, duration_time)
+                self.retry_scheduler.schedule(url, depth, retry_delay)
+                return set()
         else:
             self.bad_urls_mapping[url] = exception_str
 
-        self.save_categorised_url(status_code, url)
-        url_test_res = {
-            'status_code': status_code,
-            'duration_time': duration_time,
-            'md5': resp_content_md5
-        }
-        self.url_queue.add_visited_url(url, url_test_res)
+        self.metrics.observe_url(url_host, status_code, duration_time)
+        self.save_cookie_independent_result(
+            url, url_host, url_type, status_code, duration_time, resp_content_md5)
+        self.save_url_test_result(url, status_code, duration_time, resp_content_md5)
         return hyper_links_set
 
     def get_referer_urls_set(self, url):
         """ get all referer urls of the specified url.
         """
-        referer_set = set()
-        for parent_url, hyper_links_set in self.web_urls_mapping.items():
-            if url in hyper_links_set:
-                referer_set.add(parent_url)
-        return referer_set
+        return self.link_graph.get_referer_urls(url)
 
     def get_sorted_categorised_urls(self):
-        return OrderedDict(
-            sorted(self.categorised_urls.items(), reverse=True)
-        ).items()
+        """ get (status code, urls count, urls set) of each status code, urls set is None
+            for 2xx urls in compact mode, and for all urls if url queue is backed by crawl store.
+        """
+        if self.url_queue.crawl_store is not None:
+            categorised_urls_count = self.crawl_store.get_status_codes_count()
+        else:
+            categorised_urls_count = self.categorised_urls_count
+        return [
+            (status_code, urls_count, self.categorised_urls.get(status_code))
+            for status_code, urls_count in sorted(categorised_urls_count.items(), reverse=True)
+        ]
 
     def print_categorised_urls(self):
         '''
@@ -317,18 +1124,47 @@ class WebCrawler(object):
         In HTTP code error block, URLs been classified by HOST.
         URLs defined as the URL of which page contains the error links,instead of error link.
         '''
+        categorised_urls = self.get_sorted_categorised_urls()
+        bad_urls_mapping = self.bad_urls_mapping
+        referers_dict = None
+        crawl_store = self.url_queue.crawl_store
+        if crawl_store is not None:
+            # reported urls, their exceptions and referers are read from crawl store
+            bad_urls_mapping = {}
+            for index, (status_code, urls_count, _) in enumerate(categorised_urls):
+                if status_code.isdigit() and int(status_code) <= 200:
+                    continue
+                urls_mapping = crawl_store.get_visited_urls_of_status(status_code)
+                bad_urls_mapping.update(urls_mapping)
+                categorised_urls[index] = (status_code, urls_count, list(urls_mapping))
+            referers_dict = crawl_store.get_referers(
+                bad_urls_mapping,
+                get_link_key=None if self.url_canonicalizer is None else self.url_canonicalizer.canonicalize
+            )
+
+        def get_referers(url):
+            """ get referer urls set and referers count of url.
+            """
+            if referers_dict is None:
+                return self.get_referer_urls_set(url), self.link_graph.get_referers_count(url)
+            referers = referers_dict.get(url)
+            return (set(referers[1:]), referers[0]) if referers else (set(), 0)
 
-        def _print(status_code, urls_list, log_level, show_referer=False):
+        def _print(status_code, urls_count, urls_list, log_level, show_referer=False):
             if isinstance(status_code, str):
-                output = "{}: {}.\n".format(status_code, len(urls_list))
+                output = "{}: {}.\n".format(status_code, urls_count)
             elif isinstance(status_code, int):
-                output = "HTTP status code {}, total: {}.\n".format(status_code, len(urls_list))
+                output = "HTTP status code {}, total: {}.\n".format(status_code, urls_count)
+            if urls_list is None:
+                # only count of 2xx urls is kept in compact mode
+                color_logging(output, log_level)
+                return
 
             host_dict = {}
             for url in urls_list:
-                referer_url_list = list(self.get_referer_urls_set(url))
-                if referer_url_list and referer_url_list is not []:
-                    host_url = referer_url_list[0].split("/")[2]
+                referer_urls, _ = get_referers(url)
+                if referer_urls:
+                    host_url = next(iter(referer_urls)).split("/")[2]
                 else:
                     host_url = "root"
 
@@ -348,14 +1184,13 @@ class WebCrawler(object):
                 for url in host_dict[host]:
                     output += url
                     if not str(status_code).isdigit():
-                        output += ", {}: {}".format(status_code, self.bad_urls_mapping[url])
+                        output += ", {}: {}".format(status_code, bad_urls_mapping[url])
                         pass
                     if show_referer:
                         # only show 5 referers if referer urls number is greater than 5
-                        referer_urls = self.get_referer_urls_set(url)
-                        referer_urls_num = len(referer_urls)
+                        referer_urls, referer_urls_num = get_referers(url)
                         if referer_urls_num > 5:
-                            referer_urls = list(referer_urls)[:5]
+                            referer_urls = list(itertools.islice(referer_urls, 5))
                             output += ", referer_urls: {}".format(referer_urls)
                             output += " total {}, displayed 5.".format(referer_urls_num)
                         else:
@@ -364,20 +1199,20 @@ class WebCrawler(object):
 
             color_logging(output, log_level)
 
-        for status_code, urls_list in self.get_sorted_categorised_urls():
+        for status_code, urls_count, urls_list in categorised_urls:
             color_logging('-' * 120)
             if status_code.isdigit():
                 status_code = int(status_code)
                 if status_code >= 500:
-                    _print(status_code, urls_list, 'ERROR', True)
+                    _print(status_code, urls_count, urls_list, 'ERROR', True)
                 elif status_code >= 400:
-                    _print(status_code, urls_list, 'ERROR', True)
+                    _print(status_code, urls_count, urls_list, 'ERROR', True)
                 elif status_code >= 300:
-                    _print(status_code, urls_list, 'WARNING')
+                    _print(status_code, urls_count, urls_list, 'WARNING')
                 elif status_code > 200:
-                    _print(status_code, urls_list, 'INFO')
+                    _print(status_code, urls_count, urls_list, 'INFO')
             else:
-                _print(status_code, urls_list, 'ERROR', True)
+                _print(status_code, urls_count, urls_list, 'ERROR', True)
 
     def run_dfs(self, max_depth):
         """ start to run test in DFS mode.
@@ -396,21 +1231,79 @@ class WebCrawler(object):
             for url in urls:
                 crawler(url, depth+1)
 
-        while not self.url_queue.is_unvisited_urls_empty():
-            url = self.url_queue.get_one_unvisited_url()
-            crawler(url, self.current_depth)
+        self.retry_scheduler.set_callback(lambda url, depth: self.retry_urls_queue.put((url, depth)))
+        while True:
+            while not self.url_queue.is_unvisited_urls_empty():
+                url = self.url_queue.get_one_unvisited_url()
+                crawler(url, self.current_depth)
+
+            # a retry stops being pending only after it is put to retry urls queue
+            if not self.retry_scheduler.has_pending() and self.retry_urls_queue.empty():
+                break
+            url, depth = self.retry_urls_queue.get()
+            crawler(url, depth)
 
     def run_bfs(self, max_depth):
         """ start to run test in BFS mode.
         """
+        self.retry_scheduler.set_callback(
+            lambda url, depth: self.current_depth_unvisited_urls_queue.put(url))
+        deferred_urls = {}
         while self.current_depth <= max_depth:
-            while not self.url_queue.is_unvisited_urls_empty():
-                url = self.url_queue.get_one_unvisited_url()
+            for url in self.get_current_depth_unvisited_urls(deferred_urls):
                 self.current_depth_unvisited_urls_queue.put_nowait(url)
 
-            self.current_depth_unvisited_urls_queue.join()
+            self.join_with_retries(self.current_depth_unvisited_urls_queue.join)
+            self.checkpoint_crawl_store()
             self.current_depth += 1
 
+    def get_current_depth_unvisited_urls(self, deferred_urls):
+        """ get all unvisited urls of current depth in BFS mode.
+            urls resumed from crawl store may be deeper, they are deferred to their own depth.
+        """
+        urls = deferred_urls.pop(self.current_depth, [])
+        while not self.url_queue.is_unvisited_urls_empty():
+            url, depth = self.url_queue.get_one_unvisited_url_with_depth()
+            if depth > self.current_depth:
+                deferred_urls.setdefault(depth, []).append(url)
+            else:
+                urls.append(url)
+
+        return urls
+
+    def join_with_retries(self, join, deadline=None):
+        """ block until all urls are done, including urls scheduled to retry.
+            a retry is scheduled before its url is done, and is pending until it is put
+            back to frontier, thus frontier is finished when it is joined with no pending retry.
+            if deadline is set, join is called with timeout, and waiting stops at deadline.
+        @return
+            False if deadline is reached before all urls are done
+        """
+        if deadline is None:
+            join()
+            while self.retry_scheduler.join():
+                join()
+            return True
+
+        while time.time() < deadline:
+            if join(deadline - time.time()) \
+                and not self.retry_scheduler.join(max(deadline - time.time(), 0)):
+                return True
+        return False
+
+    def checkpoint_crawl_store(self):
+        if self.crawl_store is not None:
+            self.crawl_store.checkpoint()
+
+    def run_pipelined_bfs(self):
+        """ start to run test in pipelined BFS mode.
+            each unvisited url carries its own depth, and workers keep pulling urls
+            without waiting for all urls of current depth to be done.
+        """
+        self.retry_scheduler.set_callback(self.url_queue.retry_unvisited_url)
+        if not self.join_with_retries(self.url_queue.join_unvisited_urls, self.crawl_stopper.deadline):
+            self.stop_crawl("Time budget of {} seconds is used up".format(self.crawl_stopper.time_budget))
+
     def visit_url(self):
         while True:
             try:
@@ -419,65 +1312,473 @@ class WebCrawler(object):
             finally:
                 self.current_depth_unvisited_urls_queue.task_done()
 
-    def create_threads(self, concurrency):
+    def visit_url_pipelined(self):
+        while True:
+            url, depth = self.url_queue.get_one_unvisited_url_with_depth()
+            try:
+                if depth <= self.max_depth:
+                    with self.pipelined_depth_lock:
+                        # a retried url may be linked by shallower pages after it is got before
+                        depth = min(self.pipelined_depth_mapping.get(url, depth), depth)
+                        self.pipelined_depth_mapping[url] = depth
+                    self.get_hyper_links(url, depth)
+            finally:
+                self.url_queue.unvisited_url_done()
+
+    def create_threads(self, concurrency, target=None):
         for _ in range(concurrency):
-            thread = threading.Thread(target=self.visit_url)
+            thread = threading.Thread(target=target or self.visit_url)
             thread.daemon = True
             thread.start()
 
-    def start(self, cookies={}, crawl_mode='BFS', max_depth=10, concurrency=None):
+    def set_cookies(self, cookies):
+        self.kwargs['cookies'].update(cookies)
+        self.cookie_str = '_'.join(['_'.join([key, cookies[key]]) for key in cookies])
+
+    def prepare_fetching(self, concurrency):
+        """ prepare pooled sessions and host scheduler for threading workers.
+        """
+        if self.host_scheduler is None:
+            self.host_scheduler = self.make_host_scheduler(concurrency)
+        if self.session_pool is None:
+            self.session_pool = SessionPool(concurrency, self.connection_pool_config)
+        self.prepare_dns_cache()
+
+    def prepare_dns_cache(self):
+        """ make in-process DNS cache shared by workers and cookie profiles, if it is enabled.
+            it resolves hosts only while it is installed, see install_dns_cache.
+        """
+        config = self.dns_cache_config
+        if self.dns_cache is not None or not config.get('enabled', False):
+            return
+
+        self.dns_cache = DnsCache(
+            int(config.get('ttl') or 300),
+            int(config.get('negative_ttl', 30)),
+            int(config.get('prefetch_threads') or 4)
+        )
+
+    def install_dns_cache(self):
+        """ resolve hosts with DNS cache while crawling, socket.getaddrinfo is patched until
+            uninstall_dns_cache is called as many times.
+        """
+        if self.dns_cache is not None:
+            self.dns_cache.install()
+
+    def uninstall_dns_cache(self):
+        if self.dns_cache is not None:
+            self.dns_cache.uninstall()
+
+    def prepare_retrying(self):
+        """ retry failed urls with retry scheduler instead of sleeping in workers.
+        """
+        if self.retry_scheduler is None:
+            self.retry_scheduler = RetryScheduler()
+
+    def set_distributed_authkey(self, authkey):
+        """ set authkey shared by distributed coordinator and workers, instead of the configured one.
+        """
+        self.distributed_authkey = authkey
+
+    def get_distributed_authkey(self):
+        """ get authkey shared by distributed coordinator and workers, None if it is not set.
+            Frontier service accepts pickled calls, anyone who knows the authkey can run code in
+            coordinator, thus there is no default authkey.
+        """
+        authkey = self.distributed_authkey or self.distributed_config.get('authkey')
+        return str(authkey).encode('utf-8') if authkey else None
+
+    def set_frontier_service(self, frontier_service):
+        """ run as distributed coordinator, urls will be fetched by workers connected to frontier service.
+        """
+        self.frontier_service = frontier_service
+
+    def start(self, cookies={}, crawl_mode='BFS', max_depth=10, concurrency=None, engine='threading'):
         """ start to run test in specified crawl_mode.
         @params
-            crawl_mode = 'BFS' or 'DFS'
+            crawl_mode = 'BFS', 'DFS', 'PIPELINE' or 'PRIORITY'
+            engine = 'threading' or 'asyncio', asyncio engine only runs in BFS mode
         """
-        concurrency = int(concurrency or multiprocessing.cpu_count() * 4)
-        info = "Start to run test in {} mode, cookies: {}, max_depth: {}, concurrency: {}"\
-            .format(crawl_mode, cookies, max_depth, concurrency)
+        if self.crawl_stopper.is_stopped():
+            color_logging("Crawl is stopped, skip cookies {}.".format(cookies), 'WARNING')
+            return
+
+        engine = engine.lower()
+        if engine == 'asyncio':
+            try:
+                from .async_engine import AsyncEngine
+            except ImportError:
+                color_logging("aiohttp is not installed, fall back to threading engine.", 'WARNING')
+                engine = 'threading'
+
+        if engine == 'asyncio':
+            default_concurrency = DEFAULT_ASYNC_CONCURRENCY
+            crawl_mode = 'BFS'
+        else:
+            default_concurrency = multiprocessing.cpu_count() * 4
+        concurrency = int(concurrency or default_concurrency)
+        info = "Start to run test in {} mode, engine: {}, cookies: {}, max_depth: {}, concurrency: {}"\
+            .format(crawl_mode, engine, cookies, max_depth, concurrency)
         color_logging(info)
+        pipelined = engine == 'threading' and self.frontier_service is None \
+            and crawl_mode.upper() in ['PIPELINE', 'PRIORITY']
+        budgeted = pipelined or (engine == 'asyncio' and self.frontier_service is None)
+        if self.crawl_stopper.deadline is not None and not budgeted:
+            color_logging("Time budget only works in PIPELINE and PRIORITY modes of threading engine, "
+                          "or in asyncio engine, ignored.", 'WARNING')
+        if pipelined and crawl_mode.upper() == 'PRIORITY' and not self.url_queue.prioritized:
+            self.url_queue.set_priority_function(self.get_url_priority)
+        # max depth is checked by each url in pipelined crawl only
+        self.max_depth = max_depth if pipelined else None
         self.reset_all()
-        self.create_threads(concurrency)
-
-        self.kwargs['cookies'].update(cookies)
-        self.cookie_str = '_'.join(['_'.join([key, cookies[key]]) for key in cookies])
 
-        if crawl_mode.upper() == 'BFS':
-            self.run_bfs(max_depth)
+        self.set_cookies(cookies)
+
+        if self.crawl_store is not None and not self.start_crawl_store_job():
+            color_logging("Crawl job of cookies {} is finished in crawl store, skipped.".format(cookies))
+            color_logging('=' * 120, color='yellow')
+            return
+
+        if self.frontier_service is not None:
+            # urls are fetched by distributed workers
+            self.frontier_service.run_job(cookies, max_depth)
+        elif engine == 'asyncio':
+            if self.host_scheduler is None:
+                self.host_scheduler = self.make_host_scheduler(concurrency)
+            self.prepare_dns_cache()
+            if self.async_engine is None:
+                self.async_engine = AsyncEngine(self, concurrency)
+            self.install_dns_cache()
+            try:
+                self.async_engine.start(max_depth)
+            finally:
+                self.uninstall_dns_cache()
         else:
-            self.run_dfs(max_depth)
+            self.prepare_fetching(concurrency)
+            self.prepare_retrying()
+            self.install_dns_cache()
+            try:
+                if pipelined:
+                    self.create_threads(concurrency, self.visit_url_pipelined)
+                    self.run_pipelined_bfs()
+                else:
+                    self.create_threads(concurrency)
 
+                    if crawl_mode.upper() == 'BFS':
+                        self.run_bfs(max_depth)
+                    else:
+                        self.run_dfs(max_depth)
+            finally:
+                self.uninstall_dns_cache()
+
+        if self.crawl_store is not None and not self.crawl_stopper.is_stopped():
+            self.crawl_store.finish_job(self.cookie_str)
         color_logging('=' * 120, color='yellow')
 
+    def make_profile_crawler(self, cookies):
+        """ make crawler of a cookie profile, which shares config and fetching components
+            with this crawler, but keeps its own url queue and test results.
+        """
+        profile_crawler = copy.copy(self)
+        profile_crawler.kwargs = copy.deepcopy(self.kwargs)
+        profile_crawler.crawl_store = None
+        profile_crawler.init_crawl_state()
+        profile_crawler.profile_crawlers = []
+        profile_crawler.set_cookies(cookies)
+        profile_crawler.logs_folder = os.path.join(self.logs_folder, profile_crawler.cookie_str or 'no_cookies')
+        return profile_crawler
+
+    def start_profiles(self, cookies_list, crawl_mode='BFS', max_depth=10, concurrency=None):
+        """ crawl with several cookie profiles concurrently in threading engine.
+            results of urls which do not depend on cookies, i.e. external and static urls,
+            are tested once and shared among profiles.
+        @params
+            concurrency: concurrent workers number of each profile
+        """
+        if self.crawl_store is not None:
+            color_logging("Crawl store is not supported with concurrent cookie profiles, ignored.", 'WARNING')
+
+        concurrency = int(concurrency or multiprocessing.cpu_count() * 4)
+        self.prepare_fetching(concurrency * len(cookies_list))
+        self.shared_results = SharedUrlResults()
+        self.profile_crawlers = [self.make_profile_crawler(cookies) for cookies in cookies_list]
+
+        threads = []
+        for profile_crawler, cookies in zip(self.profile_crawlers, cookies_list):
+            thread = threading.Thread(
+                target=profile_crawler.start,
+                args=(cookies, crawl_mode, max_depth, concurrency)
+            )
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            # join with timeout, so that KeyboardInterrupt can be received
+            while thread.is_alive():
+                thread.join(1)
+
     def print_result(self, canceled=False, save_results=False):
-        status = "Canceled" if canceled else "Finished"
+        self.checkpoint_crawl_store()
+        if self.profile_crawlers:
+            for profile_crawler in self.profile_crawlers:
+                color_logging('=' * 120, color='yellow')
+                color_logging("Results of cookies: {}".format(profile_crawler.cookie_str or 'none'))
+                profile_crawler.print_test_result(canceled, save_results)
+            self.print_shared_results_stats()
+        else:
+            self.print_test_result(canceled, save_results)
+
+        self.close_result_sink(save_results)
+
+        self.print_connection_stats()
+        self.print_crawl_cache_stats()
+        self.print_result_cache_stats()
+        self.print_hosts_stats()
+        self.print_url_canonicalization_stats()
+        self.print_url_parse_cache_stats()
+        self.print_dns_cache_stats()
+        self.print_phases_stats()
+
+    def print_test_result(self, canceled=False, save_results=False):
+        if canceled:
+            status = "Canceled"
+        elif self.crawl_stopper.is_stopped():
+            status = "Stopped"
+        else:
+            status = "Finished"
         color_logging("{}. The crawler has tested {} urls."\
             .format(status, self.url_queue.get_visited_urls_count()))
+        if self.unchecked_urls_count is not None:
+            color_logging("{}: {} urls are left unchecked in frontier."
+                          .format(self.crawl_stopper.reason, self.unchecked_urls_count), 'WARNING')
+        pruned_urls_count = self.get_pruned_urls_count()
+        if pruned_urls_count:
+            color_logging("Crawl traps: {} urls are left unchecked, see their patterns below."
+                          .format(pruned_urls_count), 'WARNING')
         self.print_categorised_urls()
-
-        if save_results:
-            urls_mapping_log_path = os.path.join(self.logs_folder, 'urls_mapping.yml')
-            helpers.save_to_yaml(self.web_urls_mapping, urls_mapping_log_path)
-            color_logging("Save urls mapping in YAML file: {}".format(urls_mapping_log_path))
+        self.print_url_queue_stats()
+        self.print_truncated_urls()
+        self.print_content_dedupe_stats()
+        self.print_crawl_trap_stats()
+
+        if save_results and self.result_sink is None:
+            if self.url_queue.crawl_store is not None:
+                color_logging("Test results are kept in crawl store: {}, specify --results-file to save them."
+                              .format(self.crawl_store.store_file), 'WARNING')
+                return
+            if self.url_queue.compact:
+                color_logging("Hyper links of tested pages are not kept in compact mode, "
+                              "specify --results-file to save them.", 'WARNING')
+            else:
+                urls_mapping_log_path = os.path.join(self.logs_folder, 'urls_mapping.yml')
+                helpers.save_to_yaml(self.link_graph.to_dict(), urls_mapping_log_path)
+                color_logging("Save urls mapping in YAML file: {}".format(urls_mapping_log_path))
             visited_urls_log_path = os.path.join(self.logs_folder, 'visited_urls.yml')
             helpers.save_to_yaml(self.url_queue.get_visited_urls(), visited_urls_log_path)
             color_logging("Save visited urls in YAML file: {}".format(visited_urls_log_path))
 
+    def close_result_sink(self, save_results=False):
+        """ write all queued results, and derive YAML outputs from results file if save_results is True.
+        """
+        if self.result_sink is None:
+            return
+
+        self.result_sink.close()
+        results_file = self.result_sink.results_file
+        color_logging('-' * 120)
+        color_logging("Save {} results in JSON lines file: {}".format(self.result_sink.records_count, results_file))
+        if save_results:
+            for yaml_file in save_results_to_yaml(results_file, self.logs_folder):
+                color_logging("Save results in YAML file: {}".format(yaml_file))
+
+    def print_url_queue_stats(self):
+        stats = self.url_queue.get_memory_stats()
+        if stats is None:
+            return
+
+        color_logging('-' * 120)
+        if stats['store_backed']:
+            color_logging(
+                "Url queue backed by crawl store: {} visited urls, {} queued urls, "
+                "bloom filters take {:.2f} MB, their matches are confirmed in crawl store."
+                .format(stats['visited_urls'], stats['queued_urls'], stats['bytes'] / 1024.0 / 1024))
+            return
+        color_logging(
+            "Compact url queue: {} visited urls, {} queued urls, {} non-2xx results kept, "
+            "bloom filters take {:.2f} MB, false positive rate {}."
+            .format(stats['visited_urls'], stats['queued_urls'], stats['results'],
+                    stats['bytes'] / 1024.0 / 1024, stats['error_rate']))
+
+    def print_shared_results_stats(self):
+        stats = self.shared_results.stats
+        color_logging('-' * 120)
+        color_logging(
+            "Shared results of cookie profiles: {} external and static urls tested, "
+            "results reused {} times, {} requests deferred until results were published."
+            .format(stats['tested'], stats['shared'], stats['deferred']))
+
+    def print_connection_stats(self):
+        if self.async_engine is not None:
+            stats = self.async_engine.get_stats()
+        elif self.session_pool is not None:
+            stats = self.session_pool.get_stats()
+        else:
+            return
+
+        reuse_rate = 100.0 * stats['reused'] / stats['requests'] if stats['requests'] else 0
+        color_logging('-' * 120)
+        color_logging(
+            "Connection pool: {} requests to {} hosts, {} new connections, {} reused ({:.1f}%)."
+            .format(stats['requests'], stats['hosts'], stats['connections'], stats['reused'], reuse_rate))
+
+    def print_truncated_urls(self):
+        if not self.truncated_urls_mapping:
+            return
+
+        output = "Truncated pages, parsed up to {} bytes, total: {}.\n"\
+            .format(self.max_body_size, len(self.truncated_urls_mapping))
+        for url in self.truncated_urls_mapping:
+            output += url + "\n"
+        color_logging('-' * 120)
+        color_logging(output, 'WARNING')
+
+    def print_content_dedupe_stats(self):
+        if self.content_dedupe is None:
+            return
+
+        stats = self.content_dedupe.get_stats()
+        color_logging('-' * 120)
+        color_logging(
+            "Content dedupe: {} pages with identical content reused links without parsing, "
+            "{} near-duplicate pages not expanded.".format(stats['identical'], stats['near_duplicate']))
+
+    def get_pruned_urls_count(self):
+        """ get number of new urls pruned as crawl traps, which are left unchecked.
+        """
+        if self.crawl_trap_detector is None:
+            return 0
+        return self.crawl_trap_detector.get_stats(0)['pruned']
+
+    def print_crawl_trap_stats(self):
+        if self.crawl_trap_detector is None:
+            return
+
+        stats = self.crawl_trap_detector.get_stats()
+        color_logging('-' * 120)
+        color_logging(
+            "Crawl traps: {} new urls pruned, {} exceeding max urls of their pattern, "
+            "{} with repeated path segments.".format(
+                stats['pruned'], stats['pattern_limit'], stats['repeated_segments']))
+        for url_pattern, pruned_count in stats['top_patterns']:
+            color_logging("{} urls left unchecked: {}".format(pruned_count, url_pattern), 'WARNING')
+        if stats['repeated_segments']:
+            color_logging("{} urls left unchecked: path with repeated segments"
+                          .format(stats['repeated_segments']), 'WARNING')
+
+    def print_url_canonicalization_stats(self):
+        if self.url_canonicalizer is None:
+            return
+
+        stats = self.url_canonicalizer.get_stats()
+        color_logging('-' * 120)
+        color_logging(
+            "Url canonicalization: {} of {} hyper links rewritten, {} duplicate links merged.".format(
+                stats['rewritten'], stats['links'], stats['merged']))
+
+    def print_crawl_cache_stats(self):
+        if self.crawl_cache is None:
+            return
+
+        self.crawl_cache.flush()
+        stats = self.crawl_cache.stats
+        color_logging('-' * 120)
+        color_logging(
+            "Crawl cache: {} pages not modified, {} pages with unchanged md5, {} pages updated in {}."
+            .format(stats['not_modified'], stats['md5_unchanged'], stats['missed'], self.crawl_cache.cache_file))
+
+    def print_result_cache_stats(self):
+        if self.result_cache is None:
+            return
+
+        self.result_cache.flush()
+        stats = self.result_cache.stats
+        color_logging('-' * 120)
+        color_logging(
+            "Result cache: {} hits, {} missed external and static urls, {} results cached in {}."
+            .format(stats['hit'], stats['missed'], stats['cached'], self.result_cache.cache_file))
+
+    def print_hosts_stats(self):
+        if self.host_scheduler is None:
+            return
+
+        output = "Hosts statistics:\n"
+        for stats in self.host_scheduler.get_stats():
+            output += "{}: {} requests, {:.2f} requests/s, avg duration {:.3f}s, {} backoff, "\
+                "{} deferred, concurrency limit {}/{}\n".format(
+                    stats['host'], stats['requests'], stats['throughput'], stats['avg_duration'],
+                    stats['backoff'], stats['deferred'], stats['limit'], stats['max_concurrency'])
+        color_logging('-' * 120)
+        color_logging(output)
+
+    def print_url_parse_cache_stats(self):
+        stats = helpers.urlparsed_object_cache.get_stats()
+        color_logging('-' * 120)
+        color_logging(
+            "Url parse cache: {} hits, {} misses, hit rate {:.1f}%, {}/{} urls cached."
+            .format(stats['hits'], stats['misses'], 100 * stats['hit_rate'], stats['size'], stats['maxsize']))
+
+    def print_dns_cache_stats(self):
+        if self.dns_cache is None:
+            return
+
+        stats = self.dns_cache.get_stats()
+        color_logging('-' * 120)
+        color_logging(
+            "DNS cache: {} hits, {} misses, {} failed lookups, {} hosts prefetched, {} hosts unresolvable."
+            .format(stats['hits'], stats['misses'], stats['failed'], stats['prefetched'], stats['unresolvable']))
+
+    def print_phases_stats(self):
+        if self.metrics_file:
+            self.metrics.write_prometheus_file(self.metrics_file)
+            color_logging("Save metrics in Prometheus text file: {}".format(self.metrics_file))
+
+        summary = self.metrics.get_phases_summary()
+        if not summary:
+            return
+
+        output = "Phases timing, percentiles are estimated by histogram buckets:\n"
+        for stats in summary:
+            output += "{}: {} times, total {:.3f}s, avg {:.4f}s, p50 <= {}s, p99 <= {}s\n".format(
+                stats['phase'], stats['count'], stats['sum'], stats['avg'], stats['p50'], stats['p99'])
+        color_logging('-' * 120)
+        color_logging(output)
+
     def get_mail_content_ordered_dict(self):
         website_urls = [website['url'] for website in self.website_list]
+        crawlers = self.profile_crawlers or [self]
         mail_content_ordered_dict = OrderedDict({
             "Tested websites": ','.join(website_urls),
-            "Total tested urls number": self.url_queue.get_visited_urls_count(),
+            "Total tested urls number": sum(
+                crawler.url_queue.get_visited_urls_count() for crawler in crawlers),
             "===== Detailed": "Statistics ====="
         })
 
         flag_code = 0
 
-        for status_code, urls_list in self.get_sorted_categorised_urls():
-            if status_code.isdigit():
-                mail_content_ordered_dict["status code {}".format(status_code)] = len(urls_list)
-                if int(status_code) > 400:
+        for crawler in crawlers:
+            # results of concurrent cookie profiles are prefixed with cookies
+            prefix = "cookies {}, ".format(crawler.cookie_str or 'none') if self.profile_crawlers else ""
+            for status_code, urls_count, _ in crawler.get_sorted_categorised_urls():
+                if status_code.isdigit():
+                    mail_content_ordered_dict["{}status code {}".format(prefix, status_code)] = urls_count
+                    if int(status_code) > 400:
+                        flag_code = 1
+                else:
+                    mail_content_ordered_dict[prefix + status_code] = urls_count
                     flag_code = 1
-            else:
-                mail_content_ordered_dict[status_code] = len(urls_list)
-                flag_code = 1
+            pruned_urls_count = crawler.get_pruned_urls_count()
+            if pruned_urls_count:
+                mail_content_ordered_dict[prefix + "unchecked urls of crawl traps"] = pruned_urls_count
 
         return mail_content_ordered_dict, flag_code
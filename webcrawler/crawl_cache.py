@@ -0,0 +1,73 @@
+#encoding=utf-8
+import os
+import json
+import sqlite3
+import threading
+
+
+class CrawlCache(object):
+    """ persistent cache of recursive pages, keyed by url and cookies.
+        It stores validators (ETag, Last-Modified and content md5) and parsed
+        hyper links of each page, so that unchanged pages can be requested
+        conditionally in later runs and their links are reused without parsing.
+    """
+    COMMIT_INTERVAL = 100
+
+    def __init__(self, cache_file):
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT, cookie TEXT, status_code TEXT, etag TEXT, last_modified TEXT, "
+            "md5 TEXT, links TEXT, PRIMARY KEY (url, cookie))"
+        )
+        self.conn.commit()
+        self.uncommitted_count = 0
+        self.stats = {
+            'not_modified': 0,
+            'md5_unchanged': 0,
+            'missed': 0
+        }
+
+    def get(self, url, cookie_str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status_code, etag, last_modified, md5, links FROM pages WHERE url=? AND cookie=?",
+                (url, cookie_str)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'status_code': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'md5': row[3],
+            'links': set(json.loads(row[4]))
+        }
+
+    def set(self, url, cookie_str, status_code, etag, last_modified, md5, links):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, cookie_str, status_code, etag, last_modified, md5, json.dumps(list(links)))
+            )
+            self.uncommitted_count += 1
+            if self.uncommitted_count >= self.COMMIT_INTERVAL:
+                self.conn.commit()
+                self.uncommitted_count = 0
+
+    def incr_stat(self, stat_key):
+        with self.lock:
+            self.stats[stat_key] += 1
+
+    def flush(self):
+        with self.lock:
+            self.conn.commit()
+            self.uncommitted_count = 0
@@ -0,0 +1,63 @@
+#encoding=utf-8
+import time
+import threading
+
+
+class CrawlStopper(object):
+    """ stop crawling promptly when time budget is used up or crawl is canceled.
+        Urls being tested are counted as in flight, thus stopping can wait until
+        their aborted requests return, and their results are dropped.
+        It is shared by crawlers of all cookie profiles.
+    """
+    def __init__(self):
+        self.deadline = None
+        self.time_budget = None
+        self.reason = None
+        self.stopped_event = threading.Event()
+        self.condition = threading.Condition()
+        self.in_flight_count = 0
+
+    def set_time_budget(self, time_budget):
+        """ crawl stops time_budget seconds from now.
+        """
+        self.time_budget = time_budget
+        self.deadline = time.time() + time_budget
+
+    def is_stopped(self):
+        return self.stopped_event.is_set()
+
+    def enter(self):
+        """ count a url as in flight before testing it.
+        @return
+            False if crawl is stopped and the url should not be tested
+        """
+        with self.condition:
+            if self.is_stopped():
+                return False
+            self.in_flight_count += 1
+            return True
+
+    def exit(self):
+        with self.condition:
+            self.in_flight_count -= 1
+            self.condition.notify_all()
+
+    def stop(self, reason):
+        """ @return
+                False if crawl is stopped before
+        """
+        with self.condition:
+            if self.is_stopped():
+                return False
+            self.reason = reason
+            self.stopped_event.set()
+            return True
+
+    def wait_in_flight(self, timeout):
+        """ block until all urls in flight return, or timeout.
+        @return
+            number of urls still in flight
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: not self.in_flight_count, timeout)
+            return self.in_flight_count
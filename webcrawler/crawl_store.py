@@ -0,0 +1,290 @@
+#encoding=utf-8
+import os
+import json
+import sqlite3
+import threading
+import collections
+
+from .url_filter import CompactUrlSet
+
+class CrawlStore(object):
+    """ persistent store of crawl progress, including unvisited urls (frontier),
+        visited urls results and page links (link graph).
+        Records are buffered and checkpointed in batches, thus an interrupted
+        crawl can be resumed without testing visited urls again.
+    """
+    def __init__(self, store_file, resume=False, batch_size=1000):
+        store_dir = os.path.dirname(store_file)
+        if store_dir and not os.path.isdir(store_dir):
+            os.makedirs(store_dir)
+
+        self.store_file = store_file
+        self.resume = resume
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(store_file, check_same_thread=False)
+        if not resume:
+            for table in ['frontier', 'visited', 'page_links', 'jobs', 'url_sets']:
+                self.conn.execute("DROP TABLE IF EXISTS {}".format(table))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier (url TEXT PRIMARY KEY, depth INTEGER)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS visited ("
+            "url TEXT PRIMARY KEY, status_code TEXT, duration_time REAL, md5 TEXT, exception_str TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_links (url TEXT PRIMARY KEY, links TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (cookie TEXT PRIMARY KEY, finished INTEGER)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS url_sets (name TEXT, url TEXT, PRIMARY KEY (name, url)) WITHOUT ROWID")
+        self.conn.commit()
+
+        self.frontier_buffer = []
+        self.visited_buffer = []
+        self.page_links_buffer = []
+        # set name => urls added to the set since last checkpoint
+        self.set_urls_buffer = collections.defaultdict(set)
+
+    def _buffered_count(self):
+        return len(self.frontier_buffer) + len(self.visited_buffer) + len(self.page_links_buffer) \
+            + sum(len(urls) for urls in self.set_urls_buffer.values())
+
+    def _checkpoint(self):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier VALUES (?, ?)", self.frontier_buffer)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO visited VALUES (?, ?, ?, ?, ?)", self.visited_buffer)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO page_links VALUES (?, ?)", self.page_links_buffer)
+        for name, urls in self.set_urls_buffer.items():
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO url_sets VALUES (?, ?)", [(name, url) for url in urls])
+        self.conn.commit()
+        self.frontier_buffer = []
+        self.visited_buffer = []
+        self.page_links_buffer = []
+        self.set_urls_buffer.clear()
+
+    def checkpoint(self):
+        with self.lock:
+            self._checkpoint()
+
+    def _add_records(self, buffer_name, records):
+        with self.lock:
+            getattr(self, buffer_name).extend(records)
+            if self._buffered_count() >= self.batch_size:
+                self._checkpoint()
+
+    def add_frontier_urls(self, urls, depth):
+        self._add_records('frontier_buffer', [(url, depth) for url in urls])
+
+    def add_visited_url(self, url, url_test_res, exception_str):
+        self._add_records('visited_buffer', [(
+            url,
+            url_test_res['status_code'],
+            url_test_res['duration_time'],
+            url_test_res['md5'],
+            exception_str
+        )])
+
+    def add_page_links(self, url, hyper_links):
+        self._add_records('page_links_buffer', [(url, json.dumps(list(hyper_links)))])
+
+    def start_job(self, cookie_str, seed_urls):
+        """ start crawl job of a cookie profile, seed urls are tested again in each job.
+        @return
+            'finished' if the job is finished before, 'resumed' if the job is interrupted
+            before and will be resumed, otherwise 'started'.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT finished FROM jobs WHERE cookie=?", (cookie_str,)).fetchone()
+            if row is not None and row[0]:
+                return 'finished'
+            if row is not None:
+                return 'resumed'
+
+            self._checkpoint()
+            self.conn.execute("DELETE FROM frontier")
+            self.conn.executemany("DELETE FROM visited WHERE url=?", [(url,) for url in seed_urls])
+            self.conn.executemany("INSERT INTO frontier VALUES (?, 0)", [(url,) for url in seed_urls])
+            self.conn.execute("INSERT INTO jobs VALUES (?, 0)", (cookie_str,))
+            self.conn.commit()
+            return 'started'
+
+    def finish_job(self, cookie_str):
+        with self.lock:
+            self._checkpoint()
+            self.conn.execute("UPDATE jobs SET finished=1 WHERE cookie=?", (cookie_str,))
+            self.conn.commit()
+
+    def get_visited_url_test_result(self, url):
+        row = self.conn.execute(
+            "SELECT status_code, duration_time, md5 FROM visited WHERE url=?", (url,)).fetchone()
+        if row is None:
+            return None
+
+        return {
+            'status_code': row[0],
+            'duration_time': row[1],
+            'md5': row[2]
+        }
+
+    def iter_visited_urls(self):
+        """ iterate (url, url_test_res, exception_str) of visited urls.
+        """
+        cursor = self.conn.execute(
+            "SELECT url, status_code, duration_time, md5, exception_str FROM visited")
+        for url, status_code, duration_time, md5, exception_str in cursor:
+            url_test_res = {
+                'status_code': status_code,
+                'duration_time': duration_time,
+                'md5': md5
+            }
+            yield url, url_test_res, exception_str
+
+    def iter_page_links(self):
+        for url, links in self.conn.execute("SELECT url, links FROM page_links"):
+            yield url, json.loads(links)
+
+    def iter_unvisited_urls(self):
+        """ iterate (url, depth) of frontier urls which are not visited, ordered by depth.
+        """
+        cursor = self.conn.execute(
+            "SELECT url, depth FROM frontier WHERE url NOT IN (SELECT url FROM visited) "
+            "ORDER BY depth, rowid")
+        for url, depth in cursor:
+            yield url, depth
+
+    def _has_set_url(self, name, url):
+        if url in self.set_urls_buffer[name]:
+            return True
+        return self.conn.execute(
+            "SELECT 1 FROM url_sets WHERE name=? AND url=?", (name, url)).fetchone() is not None
+
+    def has_set_url(self, name, url):
+        with self.lock:
+            return self._has_set_url(name, url)
+
+    def add_set_url(self, name, url, maybe_added=True):
+        """ add url to urls set of the name.
+        @params
+            maybe_added: False if url is known to be new, thus it is not looked up
+        @return
+            False if url is already in the set
+        """
+        with self.lock:
+            if maybe_added and self._has_set_url(name, url):
+                return False
+
+            self.set_urls_buffer[name].add(url)
+            if self._buffered_count() >= self.batch_size:
+                self._checkpoint()
+            return True
+
+    def remove_set_url(self, name, url):
+        with self.lock:
+            self.set_urls_buffer[name].discard(url)
+            self.conn.execute("DELETE FROM url_sets WHERE name=? AND url=?", (name, url))
+
+    def clear_set(self, name):
+        with self.lock:
+            self.set_urls_buffer.pop(name, None)
+            self.conn.execute("DELETE FROM url_sets WHERE name=?", (name,))
+            self.conn.commit()
+
+    def get_set_size(self, name):
+        with self.lock:
+            row = self.conn.execute("SELECT COUNT(*) FROM url_sets WHERE name=?", (name,)).fetchone()
+            return row[0] + len(self.set_urls_buffer[name])
+
+    def iter_set_urls(self, name):
+        for url, in self.conn.execute("SELECT url FROM url_sets WHERE name=?", (name,)):
+            yield url
+
+    def get_status_codes_count(self):
+        """ get status code => count of visited urls.
+        """
+        with self.lock:
+            self._checkpoint()
+            return dict(self.conn.execute(
+                "SELECT status_code, COUNT(*) FROM visited GROUP BY status_code"))
+
+    def get_visited_urls_of_status(self, status_code):
+        """ get url => exception string of visited urls with the status code.
+        """
+        with self.lock:
+            self._checkpoint()
+            return dict(self.conn.execute(
+                "SELECT url, exception_str FROM visited WHERE status_code=?", (status_code,)))
+
+    def get_referers(self, urls, max_referers=5, get_link_key=None):
+        """ get url => [referers count, referer url, ...] of urls by scanning links of all pages,
+            at most max_referers referer urls are kept for each url.
+        @params
+            get_link_key: function which gets url a hyper link is tested as, e.g. canonical url
+        """
+        urls = set(urls)
+        referers_dict = {}
+        if not urls:
+            return referers_dict
+
+        with self.lock:
+            self._checkpoint()
+            for page_url, links in self.conn.execute("SELECT url, links FROM page_links"):
+                links = json.loads(links)
+                if get_link_key is not None:
+                    links = set(get_link_key(link) for link in links)
+                for link in links:
+                    if link not in urls:
+                        continue
+                    referers = referers_dict.get(link)
+                    if referers is None:
+                        referers_dict[link] = [1, page_url]
+                        continue
+                    referers[0] += 1
+                    if len(referers) <= max_referers:
+                        referers.append(page_url)
+        return referers_dict
+
+
+class StoreUrlSet(object):
+    """ urls set backed by crawl store, which takes about 2 bytes per url in memory.
+        Urls are looked up in bloom filter first, and matches of bloom filter are
+        confirmed in crawl store, thus there is no false positive.
+        Urls of the set in crawl store are loaded to bloom filter, unless clear is True.
+    """
+    def __init__(self, crawl_store, name, error_rate=0.001, initial_capacity=100000, clear=False):
+        self.crawl_store = crawl_store
+        self.name = name
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.urls_filter = CompactUrlSet(error_rate, initial_capacity)
+        if clear:
+            crawl_store.clear_set(name)
+        else:
+            for url in crawl_store.iter_set_urls(name):
+                self.urls_filter.add(url)
+
+    def __contains__(self, url):
+        return url in self.urls_filter and self.crawl_store.has_set_url(self.name, url)
+
+    def add(self, url):
+        """ add url to set.
+        @return
+            False if url is already in set.
+        """
+        with self.lock:
+            # bloom filter has no false negative, thus urls new to it are new to the set
+            maybe_added = not self.urls_filter.add(url)
+            return self.crawl_store.add_set_url(self.name, url, maybe_added)
+
+    def remove(self, url):
+        with self.lock:
+            self.crawl_store.remove_set_url(self.name, url)
+
+    def __len__(self):
+        return self.crawl_store.get_set_size(self.name)
+
+    def get_memory_size(self):
+        return self.urls_filter.get_memory_size()
@@ -0,0 +1,97 @@
+#encoding=utf-8
+import re
+import threading
+import collections
+
+from . import helpers
+
+DIGITS_REGEX = re.compile(r'\d+')
+
+
+def get_url_pattern(url):
+    """ get pattern of url, urls of the same pattern differ only in digits of path and query values.
+        e.g. https://debugtalk.com/calendar/2018/05?view=day&page=3
+            => ('debugtalk.com', '/calendar/{n}/{n}', ('page', 'view'))
+    """
+    parsed_object = helpers.get_parsed_object_from_url(url)
+    params_names = tuple(sorted(set(
+        param.partition('=')[0] for param in parsed_object.query.split('&') if param
+    )))
+    return (
+        parsed_object.netloc,
+        DIGITS_REGEX.sub('{n}', parsed_object.path),
+        params_names
+    )
+
+
+def format_url_pattern(url_pattern):
+    netloc, path_pattern, params_names = url_pattern
+    query_pattern = '&'.join('{}=*'.format(name) for name in params_names)
+    return netloc + path_pattern + ('?' + query_pattern if query_pattern else '')
+
+
+class CrawlTrapDetector(object):
+    """ prune new urls which make the frontier grow unboundedly, e.g. calendars and endless pagination.
+        - max_urls_per_pattern: urls of the same pattern are queued at most this number
+        - max_repeated_segments: urls whose path repeats a segment more than this number are pruned,
+          which are made by relative links resolved again and again, e.g. /a/b/a/b/a/b
+        0 means no limit.
+    """
+    def __init__(self, max_urls_per_pattern=5000, max_repeated_segments=3):
+        self.max_urls_per_pattern = max_urls_per_pattern
+        self.max_repeated_segments = max_repeated_segments
+        # url pattern => queued urls count
+        self.patterns_counter = collections.Counter()
+        # url pattern => pruned urls count
+        self.pruned_patterns_counter = collections.Counter()
+        self.lock = threading.Lock()
+        self.stats = {
+            'pattern_limit': 0,
+            'repeated_segments': 0
+        }
+
+    def has_repeated_segments(self, url):
+        if not self.max_repeated_segments:
+            return False
+
+        path = helpers.get_parsed_object_from_url(url).path
+        segments_counter = collections.Counter(segment for segment in path.split('/') if segment)
+        return bool(segments_counter) and max(segments_counter.values()) > self.max_repeated_segments
+
+    def filter_urls(self, urls):
+        """ get urls which are not traps in a batch of new urls, and count them by pattern.
+        """
+        admitted_urls = []
+        repeated_segments_count = 0
+        url_patterns = []
+        for url in urls:
+            if self.has_repeated_segments(url):
+                repeated_segments_count += 1
+                continue
+            url_patterns.append((url, get_url_pattern(url) if self.max_urls_per_pattern else None))
+
+        with self.lock:
+            self.stats['repeated_segments'] += repeated_segments_count
+            for url, url_pattern in url_patterns:
+                if url_pattern is not None:
+                    if self.patterns_counter[url_pattern] >= self.max_urls_per_pattern:
+                        self.stats['pattern_limit'] += 1
+                        self.pruned_patterns_counter[url_pattern] += 1
+                        continue
+                    self.patterns_counter[url_pattern] += 1
+                admitted_urls.append(url)
+
+        return admitted_urls
+
+    def get_stats(self, top_patterns_number=None):
+        """ get pruned urls counts, and pruned urls count of each pattern in descending order,
+            all patterns are included if top_patterns_number is None.
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats['pruned'] = stats['pattern_limit'] + stats['repeated_segments']
+            stats['top_patterns'] = [
+                (format_url_pattern(url_pattern), pruned_count)
+                for url_pattern, pruned_count in self.pruned_patterns_counter.most_common(top_patterns_number)
+            ]
+            return stats
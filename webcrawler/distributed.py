@@ -0,0 +1,290 @@
+#encoding=utf-8
+import time
+import zlib
+import threading
+import collections
+from multiprocessing.managers import BaseManager
+
+from .core import WebCrawler
+from .helpers import color_logging
+from . import helpers
+
+
+AUTHKEY_MISSING_MESSAGE = "Authkey of distributed crawl is not set, " \
+    "set distributed.authkey in config file of coordinator and workers."
+
+
+def parse_address(address):
+    """ parse address like 127.0.0.1:8530 to (host, port).
+    """
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class CoordinatorManager(BaseManager):
+    pass
+
+
+class WorkerManager(BaseManager):
+    pass
+
+
+WorkerManager.register('get_frontier')
+
+
+class FrontierService(object):
+    """ frontier service of distributed crawl, runs in coordinator.
+        It owns the UrlQueue, visited urls and result aggregation of coordinator
+        WebCrawler. Workers lease url batches, and report test results and new
+        hyper links back. Urls are sharded by host, so that each worker keeps
+        connections to its own hosts. Urls are leased depth by depth like BFS mode,
+        thus the results are the same as single node crawl.
+    """
+    def __init__(self, web_crawler, shards_count):
+        self.web_crawler = web_crawler
+        self.shards = [collections.deque() for _ in range(shards_count)]
+        self.lease_timeout = int(web_crawler.distributed_config.get('lease_timeout') or 300)
+        self.lock = threading.Lock()
+        self.leases = {}
+        self.lease_counter = 0
+        self.current_depth = 0
+        self.next_depth_urls = collections.deque()
+        self.job = None
+        self.job_counter = 0
+        self.job_done = threading.Event()
+        self.finished = False
+
+    def serve(self, address):
+        """ serve frontier service on TCP address in background thread.
+        """
+        authkey = self.web_crawler.get_distributed_authkey()
+        if authkey is None:
+            raise ValueError(AUTHKEY_MISSING_MESSAGE)
+
+        CoordinatorManager.register('get_frontier', callable=lambda: self)
+        manager = CoordinatorManager(address=address, authkey=authkey)
+        server = manager.get_server()
+        server_thread = threading.Thread(target=server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        color_logging("Frontier service is serving on {}:{}".format(*address))
+
+    def run_job(self, cookies, max_depth):
+        """ crawl with workers until all urls within max_depth are tested.
+        """
+        with self.lock:
+            self.job_counter += 1
+            self.job = {
+                'job_id': self.job_counter,
+                'cookies': cookies,
+                'max_depth': max_depth
+            }
+            for shard in self.shards:
+                shard.clear()
+            self.current_depth = 0
+            self.next_depth_urls.clear()
+            self.leases.clear()
+            self.job_done.clear()
+            self._check_job_done()
+
+        while not self.job_done.wait(1):
+            pass
+
+    def finish(self):
+        """ tell workers that there is no more job.
+        """
+        with self.lock:
+            self.finished = True
+
+    def _get_shard(self, url):
+        host = helpers.get_parsed_object_from_url(url).netloc
+        return self.shards[zlib.crc32(host.encode('utf-8')) % len(self.shards)]
+
+    def _shard_unvisited_urls(self):
+        url_queue = self.web_crawler.url_queue
+        while not url_queue.is_unvisited_urls_empty():
+            url, depth = url_queue.get_one_unvisited_url_with_depth()
+            if depth > self.job['max_depth']:
+                continue
+            if depth > self.current_depth:
+                self.next_depth_urls.append((url, depth))
+                continue
+
+            self._get_shard(url).append((url, depth))
+
+    def _advance_depth(self):
+        """ go to next depth when all urls of current depth are done.
+        """
+        while not self.leases and not any(self.shards) and self.next_depth_urls:
+            self.current_depth += 1
+            next_depth_urls, self.next_depth_urls = self.next_depth_urls, collections.deque()
+            for url, depth in next_depth_urls:
+                if depth > self.current_depth:
+                    self.next_depth_urls.append((url, depth))
+                else:
+                    self._get_shard(url).append((url, depth))
+
+    def _requeue_expired_leases(self):
+        now = time.time()
+        for lease_id, (urls, leased_time) in list(self.leases.items()):
+            if now - leased_time < self.lease_timeout:
+                continue
+
+            color_logging("lease {} expired, {} urls are requeued.".format(lease_id, len(urls)), 'WARNING')
+            del self.leases[lease_id]
+            for url, depth in urls:
+                self._get_shard(url).append((url, depth))
+
+    def _check_job_done(self):
+        self._advance_depth()
+        if self.leases or any(self.shards) or self.next_depth_urls \
+            or not self.web_crawler.url_queue.is_unvisited_urls_empty():
+            return
+        self.job_done.set()
+
+    def lease(self, worker_id, lease_size):
+        """ lease a batch of urls, urls of the worker's own shard are preferred.
+        @return
+            state: 'crawl', 'wait' or 'finished'
+        """
+        with self.lock:
+            if self.finished:
+                return {'state': 'finished'}
+            if self.job is None or self.job_done.is_set():
+                return {'state': 'wait'}
+
+            self._shard_unvisited_urls()
+            self._requeue_expired_leases()
+            self._advance_depth()
+
+            shard = self.shards[worker_id % len(self.shards)]
+            if not shard:
+                # steal from the largest shard
+                shard = max(self.shards, key=len)
+            if not shard:
+                return {'state': 'wait'}
+
+            urls = [shard.popleft() for _ in range(min(lease_size, len(shard)))]
+            self.lease_counter += 1
+            self.leases[self.lease_counter] = (urls, time.time())
+            return {
+                'state': 'crawl',
+                'lease_id': self.lease_counter,
+                'job_id': self.job['job_id'],
+                'cookies': self.job['cookies'],
+                'urls': urls
+            }
+
+    def report(self, lease_id, results):
+        """ save test results of leased urls, and add new hyper links to frontier.
+        """
+        web_crawler = self.web_crawler
+        with self.lock:
+            if self.leases.pop(lease_id, None) is None:
+                # lease is expired and requeued, or belongs to a finished job
+                return
+
+            for result in results:
+                url = result['url']
+                if result['status_code'] is None:
+                    # url is in whitelist
+                    continue
+
+                web_crawler._print_log(result['depth'], url, result['status_code'], result['duration_time'])
+                if result['hyper_links'] is not None:
+                    web_crawler.save_page_links(url, set(result['hyper_links']), result['depth'] + 1)
+                if result['exception_str'] is not None:
+                    web_crawler.bad_urls_mapping[url] = result['exception_str']
+                if result['truncated_size'] is not None:
+                    web_crawler.truncated_urls_mapping[url] = result['truncated_size']
+                web_crawler.save_url_test_result(
+                    url, result['status_code'], result['duration_time'], result['md5'])
+
+            self._shard_unvisited_urls()
+            self._check_job_done()
+
+
+class WorkerWebCrawler(WebCrawler):
+    """ WebCrawler of distributed worker.
+        It fetches and parses urls leased from frontier service with the same
+        logic as WebCrawler, and keeps results only until they are reported.
+    """
+    def __init__(self, *args, **kwargs):
+        super(WorkerWebCrawler, self).__init__(*args, **kwargs)
+        self.pending_page_links = {}
+        self.pending_test_results = {}
+        self.job_id = None
+        self.job_lock = threading.Lock()
+
+    def save_page_links(self, url, hyper_links_set, hyper_links_depth=0):
+        self.pending_page_links[url] = list(hyper_links_set)
+
+    def save_url_test_result(self, url, status_code, duration_time, resp_content_md5):
+        self.pending_test_results[url] = (status_code, duration_time, resp_content_md5)
+
+    def set_job(self, lease):
+        with self.job_lock:
+            if lease['job_id'] != self.job_id:
+                self.job_id = lease['job_id']
+                self.set_cookies(lease['cookies'])
+
+    def crawl_url(self, url, depth):
+        self.get_hyper_links(url, depth)
+        status_code, duration_time, resp_content_md5 = \
+            self.pending_test_results.pop(url, (None, 0, None))
+        return {
+            'url': url,
+            'depth': depth,
+            'status_code': status_code,
+            'duration_time': duration_time,
+            'md5': resp_content_md5,
+            'hyper_links': self.pending_page_links.pop(url, None),
+            'exception_str': self.bad_urls_mapping.pop(url, None),
+            'truncated_size': self.truncated_urls_mapping.pop(url, None)
+        }
+
+    def run_worker(self, address, worker_id, concurrency):
+        """ connect to frontier service, and crawl leased urls with concurrent threads.
+        """
+        authkey = self.get_distributed_authkey()
+        if authkey is None:
+            raise ValueError(AUTHKEY_MISSING_MESSAGE)
+
+        lease_size = int(self.distributed_config.get('lease_size') or 20)
+        manager = WorkerManager(address=address, authkey=authkey)
+        manager.connect()
+        frontier = manager.get_frontier()
+        color_logging("Worker {} connected to frontier service on {}:{}".format(worker_id, *address))
+
+        self.prepare_fetching(concurrency)
+
+        def work():
+            try:
+                while True:
+                    lease = frontier.lease(worker_id, lease_size)
+                    if lease['state'] == 'finished':
+                        return
+                    if lease['state'] == 'wait':
+                        time.sleep(0.2)
+                        continue
+
+                    self.set_job(lease)
+                    results = [self.crawl_url(url, depth) for url, depth in lease['urls']]
+                    frontier.report(lease['lease_id'], results)
+            except (EOFError, OSError):
+                # coordinator exited
+                return
+
+        self.install_dns_cache()
+        try:
+            threads = [threading.Thread(target=work) for _ in range(concurrency)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(1)
+        finally:
+            self.uninstall_dns_cache()
+
+        color_logging("Worker {} exited.".format(worker_id))
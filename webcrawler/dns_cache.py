@@ -0,0 +1,146 @@
+#encoding=utf-8
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# errors telling that the host does not exist, other errors like EAI_AGAIN are transient
+NEGATIVE_CACHED_ERRNOS = set(
+    getattr(socket, name) for name in ['EAI_NONAME', 'EAI_NODATA'] if hasattr(socket, name))
+
+
+class DnsCache(object):
+    """ in-process cache of getaddrinfo results shared by all workers.
+        The system resolver does not tell record TTLs, thus resolved addresses are
+        cached for configured ttl seconds, and lookups failed because the host does not
+        exist for negative_ttl seconds, during which the host fails fast without querying
+        resolver again. Concurrent lookups of the same host wait for the one in flight, e.g. a prefetch.
+        It takes effect only while it is installed.
+    """
+    def __init__(self, ttl=300, negative_ttl=30, prefetch_threads=4):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.original_getaddrinfo = socket.getaddrinfo
+        self.installed_count = 0
+        self.lock = threading.Lock()
+        # getaddrinfo args => (expire_time, addresses)
+        self.addresses_mapping = {}
+        # getaddrinfo args => (expire_time, socket.gaierror)
+        self.failed_hosts_mapping = {}
+        # getaddrinfo args => threading.Event of resolving in flight
+        self.resolving_events = {}
+        self.prefetched_hosts = set()
+        self.prefetch_executor = ThreadPoolExecutor(prefetch_threads)
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'failed': 0,
+            'prefetched': 0
+        }
+
+    def install(self):
+        """ resolve hosts of all connections in this process with the cache,
+            including requests sessions and aiohttp threaded resolver,
+            until it is uninstalled as many times as it is installed.
+        """
+        with self.lock:
+            self.installed_count += 1
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        with self.lock:
+            self.installed_count -= 1
+            if not self.installed_count:
+                socket.getaddrinfo = self.original_getaddrinfo
+
+    def _get_cached(self, key, now):
+        """ @return
+                (addresses, gaierror), both None if not cached.
+        """
+        failed_host = self.failed_hosts_mapping.get(key)
+        if failed_host is not None:
+            if failed_host[0] > now:
+                return None, failed_host[1]
+            del self.failed_hosts_mapping[key]
+
+        cached_addresses = self.addresses_mapping.get(key)
+        if cached_addresses is not None:
+            if cached_addresses[0] > now:
+                return cached_addresses[1], None
+            del self.addresses_mapping[key]
+
+        return None, None
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if isinstance(host, bytes):
+            host = host.decode('idna')
+        key = (host, port, family, type, proto, flags)
+        while True:
+            with self.lock:
+                addresses, error = self._get_cached(key, time.time())
+                if addresses is not None or error is not None:
+                    self.stats['hits'] += 1
+                    if error is not None:
+                        raise socket.gaierror(*error.args)
+                    return list(addresses)
+
+                resolving_event = self.resolving_events.get(key)
+                if resolving_event is None:
+                    resolving_event = self.resolving_events[key] = threading.Event()
+                    self.stats['misses'] += 1
+                    break
+
+            # wait for the lookup in flight, and read its result from cache
+            resolving_event.wait()
+
+        try:
+            addresses = self.original_getaddrinfo(host, port, family, type, proto, flags)
+        except socket.gaierror as ex:
+            with self.lock:
+                self.stats['failed'] += 1
+                if self.negative_ttl > 0 and ex.errno in NEGATIVE_CACHED_ERRNOS:
+                    self.failed_hosts_mapping[key] = (time.time() + self.negative_ttl, ex)
+            raise
+        else:
+            with self.lock:
+                if self.ttl > 0:
+                    self.addresses_mapping[key] = (time.time() + self.ttl, addresses)
+            return addresses
+        finally:
+            with self.lock:
+                del self.resolving_events[key]
+            resolving_event.set()
+
+    def is_unresolvable(self, host, port):
+        """ check if lookup of the host and port failed recently because the host does not exist.
+        """
+        now = time.time()
+        with self.lock:
+            for key, (expire_time, _) in self.failed_hosts_mapping.items():
+                if key[0] == host and key[1] == port and expire_time > now:
+                    return True
+            return False
+
+    def prefetch(self, host, port, family=socket.AF_UNSPEC):
+        """ resolve host in background the first time it is seen.
+        """
+        with self.lock:
+            if host in self.prefetched_hosts:
+                return
+            self.prefetched_hosts.add(host)
+            self.stats['prefetched'] += 1
+
+        self.prefetch_executor.submit(self._prefetch, host, port, family)
+
+    def _prefetch(self, host, port, family):
+        try:
+            self.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        except (socket.error, UnicodeError):
+            # failure is cached, or host is invalid and will fail when it is requested
+            pass
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['unresolvable'] = len(set(key[0] for key in self.failed_hosts_mapping))
+            return stats
@@ -3,6 +3,7 @@ import yaml
 import json
 import hashlib
 import logging
+import lxml.html
 from termcolor import colored
 
 try:
@@ -14,14 +15,21 @@ except ImportError:
     import urlparse
     from urllib import urlencode
 
-urlparsed_object_mapping = {}
+from .lru_cache import LRUCache
+from .url_rules import PrefixMatcher
+
+DEFAULT_URLPARSE_CACHE_SIZE = 100000
+
+# parsed objects of recently used urls, shared by worker threads
+urlparsed_object_cache = LRUCache(DEFAULT_URLPARSE_CACHE_SIZE)
 
 def get_parsed_object_from_url(url):
-    if url in urlparsed_object_mapping:
-        return urlparsed_object_mapping[url]
+    parsed_object = urlparsed_object_cache.get(url)
+    if parsed_object is not None:
+        return parsed_object
 
     parsed_object = get_parsed_object_from_url_without_extra_info(url)
-    urlparsed_object_mapping[url] = parsed_object
+    urlparsed_object_cache.set(url, parsed_object)
     return parsed_object
 
 def get_parsed_object_from_url_without_extra_info(url):
@@ -90,6 +98,99 @@ def make_url_with_referer(url, referer_url):
         )
         return origin_parsed_obj.geturl()
 
+def parse_url(url, referer_url, ignore_startswith_strs=()):
+    """ get complete url of a raw hyper link in referer page.
+        return None if url is empty or starts with any of ignore_startswith_strs.
+    """
+    url = url.strip()
+    if url == "":
+        return None
+
+    for ignore_url_startswith_str in ignore_startswith_strs:
+        if url.startswith(ignore_url_startswith_str):
+            return None
+
+    if url.startswith('\\"'):
+        # \\"https:\\/\\/store.debugtalk.com\\/guides\\/"
+        url = url.encode('utf-8').decode('unicode_escape')\
+            .replace(r'\/', r'/').replace(r'"', r'')
+        return url
+
+    parsed_url = make_url_with_referer(url, referer_url)
+    return parsed_url
+
+def parse_urls(urls_set, referer_url, ignore_startswith_strs=()):
+    """ get complete urls of raw hyper links in referer page.
+        it gets the same urls as parse_url of each link, but parses referer url only once,
+        and resolves each link with one urlsplit and urlunsplit without caching it.
+    @params
+        ignore_startswith_strs: prefixes of ignored hyper links, or compiled PrefixMatcher
+    """
+    if not isinstance(ignore_startswith_strs, PrefixMatcher):
+        ignore_startswith_strs = PrefixMatcher(ignore_startswith_strs)
+    is_ignored_link = ignore_startswith_strs.match
+    referer_url_parsed_object = get_parsed_object_from_url(referer_url)
+    referer_scheme = referer_url_parsed_object.scheme
+    referer_netloc = referer_url_parsed_object.netloc
+    referer_path_list = referer_url_parsed_object.path.split('/')
+    urlsplit = urlparse.urlsplit
+    urlunsplit = urlparse.urlunsplit
+
+    parsed_urls_set = set()
+    for url in urls_set:
+        url = url.strip()
+        if url == "" or is_ignored_link(url):
+            continue
+
+        if url.startswith('\\"'):
+            # \\"https:\\/\\/store.debugtalk.com\\/guides\\/"
+            parsed_urls_set.add(
+                url.encode('utf-8').decode('unicode_escape').replace(r'\/', r'/').replace(r'"', r''))
+            continue
+
+        scheme, netloc, path, query, _ = urlsplit(url)
+        if scheme != "":
+            # complete urls
+            parsed_urls_set.add(url)
+        elif netloc != "":
+            # cdn asset files
+            parsed_urls_set.add(urlunsplit(('http', netloc, path, query, '')))
+        elif path.startswith('/'):
+            # relative links, e.g. /category/phantom
+            parsed_urls_set.add(urlunsplit((referer_scheme, referer_netloc, path, query, '')))
+        else:
+            path_list = list(referer_path_list)
+            if path.startswith('../'):
+                # relative links, e.g. ../compare-phantom-3
+                path_list.pop()
+                path_list[-1] = path.lstrip('../')
+            else:
+                # relative links, e.g. mavic-pro
+                path_list[-1] = path
+            parsed_urls_set.add(urlunsplit((referer_scheme, referer_netloc, '/'.join(path_list), query, '')))
+
+    return parsed_urls_set
+
+def get_raw_links_from_page(content):
+    """ parse a web page and get all raw hyper links.
+    """
+    raw_links_set = set()
+
+    try:
+        etree = lxml.html.fromstring(content)
+    except lxml.etree.ParserError:
+        return raw_links_set
+
+    link_elements_list = etree.xpath("//link|//a|//script|//img")
+    for link in link_elements_list:
+        url = link.get('href') or link.get('src')
+        if url is None:
+            continue
+
+        raw_links_set.add(url)
+
+    return raw_links_set
+
 def color_logging(text, log_level='info', color=None):
     log_level = log_level.upper()
     if log_level == 'DEBUG':
@@ -111,11 +212,19 @@ def load_json_file(json_file):
 
 def load_yaml_file(yaml_file):
     with open(yaml_file, 'r') as stream:
-        return yaml.load(stream)
+        return yaml.load(stream, Loader=yaml.SafeLoader)
 
 def get_md5(content):
     return hashlib.md5(content).hexdigest()
 
+def get_status_class(status_code):
+    """ get status class of status code, e.g. 404 => 4xx.
+        non-HTTP status like Timeout is returned as it is.
+    """
+    if status_code.isdigit():
+        return status_code[0] + 'xx'
+    return status_code
+
 def load_file(file_path, file_suffix='.json'):
     file_suffix = file_suffix.lower()
     if file_suffix == '.json':
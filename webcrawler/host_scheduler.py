@@ -0,0 +1,155 @@
+#encoding=utf-8
+import time
+import threading
+import collections
+
+BACKOFF_STATUS_CODES = ['429', 'Timeout', 'ConnectionError']
+
+
+def is_backoff_status(status_code):
+    """ host is overloaded or rate limited.
+    """
+    if status_code in BACKOFF_STATUS_CODES:
+        return True
+    return status_code.isdigit() and int(status_code) >= 500
+
+
+class HostState(object):
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.last_decrease_time = 0
+        self.requests_count = 0
+        self.backoff_count = 0
+        self.total_duration = 0
+        self.first_request_time = None
+        self.last_response_time = None
+        # callbacks of requests deferred while the host is at its limit
+        self.deferred_callbacks = collections.deque()
+        self.deferred_count = 0
+
+
+class HostScheduler(object):
+    """ limit concurrent requests per host, and adapt the limit with AIMD.
+        The limit of a host is decreased multiplicatively when it responds with
+        429/5xx, times out, or its latency rises, and is increased additively
+        by about one request per round trip when it is healthy.
+    """
+    def __init__(self, internal_max_concurrency, external_max_concurrency,
+                 min_concurrency=1, latency_factor=3.0, decrease_factor=0.5):
+        self.internal_max_concurrency = internal_max_concurrency
+        self.external_max_concurrency = external_max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_factor = latency_factor
+        self.decrease_factor = decrease_factor
+        self.hosts_state = {}
+        self.condition = threading.Condition()
+
+    def _get_host_state(self, host, is_internal):
+        if host not in self.hosts_state:
+            max_concurrency = self.internal_max_concurrency if is_internal \
+                else self.external_max_concurrency
+            self.hosts_state[host] = HostState(max_concurrency)
+        return self.hosts_state[host]
+
+    def try_acquire(self, host, is_internal):
+        """ take one request slot of the host without blocking.
+        """
+        with self.condition:
+            host_state = self._get_host_state(host, is_internal)
+            if host_state.in_flight >= int(host_state.limit):
+                return False
+
+            host_state.in_flight += 1
+            if host_state.first_request_time is None:
+                host_state.first_request_time = time.time()
+            return True
+
+    def acquire(self, host, is_internal):
+        """ block until a request slot of the host is available.
+        """
+        with self.condition:
+            while not self.try_acquire(host, is_internal):
+                self.condition.wait()
+
+    def acquire_or_defer(self, host, is_internal, ready_callback):
+        """ take one request slot of the host, or defer the request if the host is at its limit.
+            ready_callback of a deferred request is called without arguments when a request
+            of the host is done, and the request should try to acquire again then.
+        @return
+            False if the request is deferred
+        """
+        with self.condition:
+            if self.try_acquire(host, is_internal):
+                return True
+
+            host_state = self.hosts_state[host]
+            host_state.deferred_callbacks.append(ready_callback)
+            host_state.deferred_count += 1
+            return False
+
+    def release(self, host, status_code, duration_time):
+        """ release request slot of the host, and adapt its concurrency limit.
+            one deferred request of the host is called back to acquire again.
+        """
+        ready_callback = None
+        with self.condition:
+            host_state = self.hosts_state[host]
+            host_state.in_flight -= 1
+            host_state.requests_count += 1
+            host_state.total_duration += duration_time
+            now = host_state.last_response_time = time.time()
+
+            backoff_status = is_backoff_status(status_code)
+            latency_ewma = host_state.latency_ewma
+            latency_rising = latency_ewma is not None \
+                and duration_time > latency_ewma * self.latency_factor
+            if backoff_status or latency_rising:
+                host_state.backoff_count += 1
+                # decrease at most once per round trip
+                if now - host_state.last_decrease_time > (latency_ewma or 0):
+                    host_state.limit = max(
+                        float(self.min_concurrency), host_state.limit * self.decrease_factor)
+                    host_state.last_decrease_time = now
+            else:
+                host_state.limit = min(
+                    float(host_state.max_concurrency), host_state.limit + 1.0 / host_state.limit)
+
+            # failed requests tell nothing about latency
+            if not backoff_status:
+                if latency_ewma is None:
+                    host_state.latency_ewma = duration_time
+                else:
+                    host_state.latency_ewma = 0.8 * latency_ewma + 0.2 * duration_time
+
+            if host_state.deferred_callbacks:
+                ready_callback = host_state.deferred_callbacks.popleft()
+            self.condition.notify_all()
+
+        if ready_callback is not None:
+            ready_callback()
+
+    def get_stats(self):
+        """ get per-host statistics, sorted by requests count.
+        """
+        hosts_stats = []
+        with self.condition:
+            for host, host_state in self.hosts_state.items():
+                if not host_state.requests_count:
+                    continue
+                active_time = host_state.last_response_time - host_state.first_request_time
+                hosts_stats.append({
+                    'host': host,
+                    'requests': host_state.requests_count,
+                    'backoff': host_state.backoff_count,
+                    'deferred': host_state.deferred_count,
+                    'avg_duration': host_state.total_duration / host_state.requests_count,
+                    'throughput': host_state.requests_count / active_time if active_time else 0,
+                    'limit': int(host_state.limit),
+                    'max_concurrency': host_state.max_concurrency
+                })
+
+        return sorted(hosts_stats, key=lambda stats: stats['requests'], reverse=True)
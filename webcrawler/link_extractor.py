@@ -0,0 +1,76 @@
+#encoding=utf-8
+import hashlib
+import lxml.etree
+
+
+class StreamingLinksExtractor(object):
+    """ extract raw hyper links and md5 of a web page from content chunks.
+        The page is parsed with lxml feed parser and a parser target, thus no
+        element tree is built, and at most max_body_size bytes are parsed.
+        If keep_text is True, visible text of the page is kept as well.
+    """
+    LINK_TAGS = ('link', 'a', 'script', 'img')
+    NON_TEXT_TAGS = ('script', 'style')
+
+    def __init__(self, max_body_size=0, keep_text=False):
+        self.max_body_size = max_body_size
+        self.body_size = 0
+        self.truncated = False
+        self.raw_links_set = set()
+        self.keep_text = keep_text
+        self.text_parts = []
+        self._non_text_depth = 0
+        self._md5 = hashlib.md5()
+        self._parser = lxml.etree.HTMLParser(target=self)
+
+    # parser target interface
+    def start(self, tag, attrib):
+        if tag in self.LINK_TAGS:
+            url = attrib.get('href') or attrib.get('src')
+            if url is not None:
+                self.raw_links_set.add(url)
+        if tag in self.NON_TEXT_TAGS:
+            self._non_text_depth += 1
+
+    def end(self, tag):
+        if tag in self.NON_TEXT_TAGS and self._non_text_depth:
+            self._non_text_depth -= 1
+
+    def data(self, data):
+        if self.keep_text and not self._non_text_depth:
+            self.text_parts.append(data)
+
+    def close(self):
+        return self.raw_links_set
+
+    def feed(self, chunk):
+        """ feed one content chunk.
+            return False if max_body_size is reached and the rest content should be dropped.
+        """
+        if self.max_body_size and self.body_size + len(chunk) > self.max_body_size:
+            chunk = chunk[:self.max_body_size - self.body_size]
+            self.truncated = True
+
+        if chunk:
+            self.body_size += len(chunk)
+            self._md5.update(chunk)
+            self._parser.feed(chunk)
+
+        return not self.truncated
+
+    def finish(self):
+        """ finish parsing and return raw hyper links set.
+        """
+        try:
+            self._parser.close()
+        except lxml.etree.LxmlError:
+            # empty or truncated page, keep links parsed so far
+            pass
+
+        return self.raw_links_set
+
+    def get_md5(self):
+        return self._md5.hexdigest()
+
+    def get_text(self):
+        return ' '.join(self.text_parts)
@@ -0,0 +1,197 @@
+#encoding=utf-8
+import array
+import threading
+
+
+class LinkGraph(object):
+    """ hyper links of crawled pages, and the reverse index of referer pages of each link.
+        Each url is interned once to an integer id, adjacency is kept in arrays of ids,
+        so that navigation links shared by many pages take 4 bytes per page instead of
+        a url string in a list and a url in referers set.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # url => id
+        self.url_ids = {}
+        # id => url
+        self.urls = []
+        # page id => array of link ids
+        self.page_links = {}
+        # link id => array of referer page ids
+        self.link_referers = {}
+
+    def _intern(self, url):
+        url_id = self.url_ids.get(url)
+        if url_id is None:
+            url_id = self.url_ids[url] = len(self.urls)
+            self.urls.append(url)
+        return url_id
+
+    def __contains__(self, page_url):
+        url_id = self.url_ids.get(page_url)
+        return url_id is not None and url_id in self.page_links
+
+    def __len__(self):
+        return len(self.page_links)
+
+    def add_page_links(self, page_url, hyper_links, link_keys=None):
+        """ add hyper links of a page, links of a page are only added once.
+        @params
+            link_keys: urls which hyper links are tested as in the same order, e.g. canonical urls,
+                referers are indexed by them. default are hyper links themselves.
+        @return
+            False if links of the page are added before
+        """
+        with self.lock:
+            page_id = self._intern(page_url)
+            if page_id in self.page_links:
+                return False
+
+            link_ids = array.array('i', [self._intern(hyper_link) for hyper_link in hyper_links])
+            self.page_links[page_id] = link_ids
+            if link_keys is not None:
+                link_ids = set(self._intern(link_key) for link_key in link_keys)
+            for link_id in link_ids:
+                referer_ids = self.link_referers.get(link_id)
+                if referer_ids is None:
+                    referer_ids = self.link_referers[link_id] = array.array('i')
+                referer_ids.append(page_id)
+            return True
+
+    def get_page_links(self, page_url):
+        """ get hyper links list of a page, None if the page is not added.
+        """
+        url_id = self.url_ids.get(page_url)
+        link_ids = self.page_links.get(url_id) if url_id is not None else None
+        if link_ids is None:
+            return None
+
+        urls = self.urls
+        return [urls[link_id] for link_id in link_ids]
+
+    def get_referer_urls(self, url):
+        """ get urls set of pages which link to the url.
+        """
+        url_id = self.url_ids.get(url)
+        referer_ids = self.link_referers.get(url_id) if url_id is not None else None
+        if not referer_ids:
+            return set()
+
+        urls = self.urls
+        return set(urls[referer_id] for referer_id in referer_ids)
+
+    def get_referers_count(self, url):
+        """ get number of pages which link to the url.
+        """
+        url_id = self.url_ids.get(url)
+        referer_ids = self.link_referers.get(url_id) if url_id is not None else None
+        return len(referer_ids) if referer_ids else 0
+
+    def get_first_referer_url(self, url):
+        """ get url of the first page which links to the url, None if there is no referer.
+        """
+        url_id = self.url_ids.get(url)
+        referer_ids = self.link_referers.get(url_id) if url_id is not None else None
+        if not referer_ids:
+            return None
+
+        return self.urls[referer_ids[0]]
+
+    def to_dict(self):
+        """ get mapping of page url => hyper links list.
+        """
+        urls = self.urls
+        return {
+            urls[page_id]: [urls[link_id] for link_id in link_ids]
+            for page_id, link_ids in self.page_links.items()
+        }
+
+    def set_url_tested(self, url, status_code):
+        """ called when test result of url is saved, all links are kept in full link graph.
+        """
+        pass
+
+
+class CompactLinkGraph(object):
+    """ link graph of compact url queue, which only keeps what reports need.
+        Hyper links of a page are kept until its test result is saved, and referer pages
+        are kept for links which are not tested yet or not 2xx, up to max_referers of
+        them with the total count. Urls tested with 2xx status code take no memory.
+        If failed_referers is False, referers are only kept for links which are not tested yet.
+    """
+    def __init__(self, is_url_visited, is_url_passed, max_referers=5, failed_referers=True):
+        self.lock = threading.Lock()
+        self.is_url_visited = is_url_visited
+        self.is_url_passed = is_url_passed if failed_referers else is_url_visited
+        self.max_referers = max_referers
+        self.failed_referers = failed_referers
+        self.pages_count = 0
+        # page url => hyper links, until test result of the page is saved
+        self.pending_page_links = {}
+        # link => [referers count, referer url, ...]
+        self.link_referers = {}
+
+    def __contains__(self, page_url):
+        return page_url in self.pending_page_links
+
+    def __len__(self):
+        return self.pages_count
+
+    def add_page_links(self, page_url, hyper_links, link_keys=None):
+        """ add hyper links of a page, links of a page are only added once until its result is saved.
+        @params
+            link_keys: urls which hyper links are tested as in the same order, e.g. canonical urls,
+                referers are indexed by them. default are hyper links themselves.
+        @return
+            False if links of the page are added before
+        """
+        with self.lock:
+            if page_url in self.pending_page_links:
+                return False
+
+            self.pages_count += 1
+            hyper_links = list(hyper_links)
+            # links of tested pages are restored from crawl store, no result will be saved for them
+            if not self.is_url_visited(page_url):
+                self.pending_page_links[page_url] = hyper_links
+            for link_key in (hyper_links if link_keys is None else set(link_keys)):
+                referers = self.link_referers.get(link_key)
+                if referers is not None:
+                    referers[0] += 1
+                    if len(referers) <= self.max_referers:
+                        referers.append(page_url)
+                elif not self.is_url_passed(link_key):
+                    self.link_referers[link_key] = [1, page_url]
+            return True
+
+    def get_page_links(self, page_url):
+        """ get hyper links list of a page, None if the page is not added or its result is saved.
+        """
+        return self.pending_page_links.get(page_url)
+
+    def get_referer_urls(self, url):
+        """ get urls set of at most max_referers pages which link to the url.
+        """
+        referers = self.link_referers.get(url)
+        return set(referers[1:]) if referers else set()
+
+    def get_referers_count(self, url):
+        referers = self.link_referers.get(url)
+        return referers[0] if referers else 0
+
+    def get_first_referer_url(self, url):
+        referers = self.link_referers.get(url)
+        return referers[1] if referers else None
+
+    def to_dict(self):
+        """ hyper links of tested pages are not kept.
+        """
+        return dict(self.pending_page_links)
+
+    def set_url_tested(self, url, status_code):
+        """ drop hyper links of the tested page, and referers of url if it is 2xx.
+        """
+        with self.lock:
+            self.pending_page_links.pop(url, None)
+            if not self.failed_referers or str(status_code).startswith('2'):
+                self.link_referers.pop(url, None)
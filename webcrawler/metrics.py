@@ -0,0 +1,216 @@
+#encoding=utf-8
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+try:
+    # Python3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # Python2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+DEFAULT_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# phases of testing a url, in order
+PHASES = ['queue_wait', 'connect', 'ttfb', 'download', 'parse', 'normalize', 'enqueue']
+
+_connect_timer = threading.local()
+
+
+def add_connect_time(duration_time):
+    """ add time of making new connection in current thread.
+    """
+    _connect_timer.duration_time = (getattr(_connect_timer, 'duration_time', None) or 0) + duration_time
+
+
+def pop_connect_time():
+    """ get and reset time of making new connections in current thread.
+    @return
+        None if no connection is made.
+    """
+    duration_time = getattr(_connect_timer, 'duration_time', None)
+    _connect_timer.duration_time = None
+    return duration_time
+
+
+class Histogram(object):
+    """ histogram with cumulative buckets like Prometheus.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, histogram):
+        for index, bucket_count in enumerate(histogram.bucket_counts):
+            self.bucket_counts[index] += bucket_count
+        self.count += histogram.count
+        self.sum += histogram.sum
+
+    def get_percentile(self, percent):
+        """ estimate percentile by upper bound of the bucket it falls in.
+        """
+        rank = self.count * percent / 100.0
+        cumulative_count = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            cumulative_count += bucket_count
+            if cumulative_count >= rank and bucket_count:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return 0
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    return ','.join('{}="{}"'.format(key, _escape_label_value(value)) for key, value in labels)
+
+
+class CrawlMetrics(object):
+    """ timing metrics of crawl, aggregated across worker threads.
+        Phase durations are kept in histograms per host, and total test durations
+        of urls are kept in histograms per host and status code.
+    """
+    def __init__(self, buckets=None):
+        self.buckets = sorted(float(bucket) for bucket in (buckets or DEFAULT_BUCKETS))
+        self.lock = threading.Lock()
+        # (phase, host) => Histogram
+        self.phase_histograms = {}
+        # (host, status_code) => Histogram
+        self.url_histograms = {}
+
+    def _observe(self, histograms, key, value):
+        with self.lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def observe_phase(self, phase, host, duration_time):
+        self._observe(self.phase_histograms, (phase, host), duration_time)
+
+    def observe_url(self, host, status_code, duration_time):
+        self._observe(self.url_histograms, (host, status_code), duration_time)
+
+    @contextmanager
+    def time_phase(self, phase, host):
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, host, time.time() - start_time)
+
+    def get_phases_summary(self):
+        """ get summary of each phase across hosts.
+        """
+        phase_histograms = {}
+        with self.lock:
+            for (phase, _), histogram in self.phase_histograms.items():
+                if phase not in phase_histograms:
+                    phase_histograms[phase] = Histogram(self.buckets)
+                phase_histograms[phase].merge(histogram)
+
+        summary = []
+        for phase in PHASES:
+            histogram = phase_histograms.get(phase)
+            if histogram is None:
+                continue
+            summary.append({
+                'phase': phase,
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'avg': histogram.sum / histogram.count,
+                'p50': histogram.get_percentile(50),
+                'p99': histogram.get_percentile(99)
+            })
+        return summary
+
+    def _format_histograms(self, name, help_text, label_names, histograms):
+        lines = [
+            "# HELP {} {}".format(name, help_text),
+            "# TYPE {} histogram".format(name)
+        ]
+        for key in sorted(histograms):
+            histogram = histograms[key]
+            labels = list(zip(label_names, key))
+            cumulative_count = 0
+            for bucket, bucket_count in zip(self.buckets + [float('inf')], histogram.bucket_counts):
+                cumulative_count += bucket_count
+                le = '+Inf' if bucket == float('inf') else repr(bucket)
+                lines.append("{}_bucket{{{}}} {}".format(
+                    name, _format_labels(labels + [('le', le)]), cumulative_count))
+            lines.append("{}_sum{{{}}} {}".format(name, _format_labels(labels), repr(histogram.sum)))
+            lines.append("{}_count{{{}}} {}".format(name, _format_labels(labels), histogram.count))
+        return lines
+
+    def get_prometheus_text(self):
+        with self.lock:
+            lines = self._format_histograms(
+                'webcrawler_phase_duration_seconds',
+                'Duration of each phase of testing urls.',
+                ['phase', 'host'],
+                self.phase_histograms
+            )
+            lines += self._format_histograms(
+                'webcrawler_url_duration_seconds',
+                'Total duration of testing urls, including HEAD to GET fallback and retries.',
+                ['host', 'status_code'],
+                self.url_histograms
+            )
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus_file(self, metrics_file):
+        """ write metrics in Prometheus text format, the file is replaced atomically.
+        """
+        tmp_file = metrics_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(self.get_prometheus_text())
+        os.rename(tmp_file, metrics_file)
+
+    def start_exporting(self, metrics_file, interval):
+        """ write metrics file every interval seconds in background thread.
+        """
+        def export():
+            while True:
+                time.sleep(interval)
+                self.write_prometheus_file(metrics_file)
+
+        export_thread = threading.Thread(target=export)
+        export_thread.daemon = True
+        export_thread.start()
+
+    def serve(self, port, host='127.0.0.1'):
+        """ serve metrics on http://host:port/metrics in background thread.
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                content = metrics.get_prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer((host, port), MetricsHandler)
+        server_thread = threading.Thread(target=server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
@@ -0,0 +1,114 @@
+#encoding=utf-8
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+import lxml.etree
+
+from . import helpers
+
+_ignore_startswith_strs = ()
+
+
+def _init_parser_process(ignore_startswith_strs):
+    global _ignore_startswith_strs
+    _ignore_startswith_strs = ignore_startswith_strs
+
+
+def parse_pages_links(pages):
+    """ parse a batch of web pages in parser process.
+    @params
+        pages: list of (referer_url, content)
+    @return
+        list of (parsed_urls_set, xml_syntax_error_str)
+    """
+    results = []
+    for referer_url, content in pages:
+        try:
+            raw_links_set = helpers.get_raw_links_from_page(content)
+            parsed_urls_set = helpers.parse_urls(raw_links_set, referer_url, _ignore_startswith_strs)
+            results.append((parsed_urls_set, None))
+        except lxml.etree.XMLSyntaxError as ex:
+            # lxml exceptions can not be pickled, pass error message instead
+            results.append((None, str(ex)))
+
+    return results
+
+
+class ParsePool(object):
+    """ parse web pages in a process pool to get link extraction off the GIL.
+        Pages submitted by fetch workers are collected into batches, a batch is
+        sent to parser processes once it has batch_size pages, or batch_timeout
+        seconds after its first page is submitted.
+    """
+    def __init__(self, processes, ignore_startswith_strs=(), batch_size=8, batch_timeout=0.01):
+        """ @params
+                ignore_startswith_strs: prefixes of ignored hyper links, or compiled PrefixMatcher
+        """
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.executor = ProcessPoolExecutor(
+            processes,
+            initializer=_init_parser_process,
+            initargs=(ignore_startswith_strs,)
+        )
+        self.condition = threading.Condition()
+        self.pending_pages = []
+
+        flush_thread = threading.Thread(target=self._flush_batches)
+        flush_thread.daemon = True
+        flush_thread.start()
+
+    def submit_page(self, referer_url, content):
+        """ submit a web page to be parsed.
+        @return
+            Future of parsed hyper links set
+        """
+        future = Future()
+        with self.condition:
+            self.pending_pages.append((referer_url, content, future))
+            pending_count = len(self.pending_pages)
+            if pending_count == 1 or pending_count >= self.batch_size:
+                self.condition.notify()
+
+        return future
+
+    def _flush_batches(self):
+        while True:
+            with self.condition:
+                while not self.pending_pages:
+                    self.condition.wait()
+                if len(self.pending_pages) < self.batch_size:
+                    self.condition.wait(self.batch_timeout)
+                batch, self.pending_pages = self.pending_pages, []
+
+            self._submit_batch(batch)
+
+    def _submit_batch(self, batch):
+        pages = [(referer_url, content) for referer_url, content, _ in batch]
+        futures = [future for _, _, future in batch]
+
+        def on_batch_done(batch_future):
+            try:
+                results = batch_future.result()
+            except Exception as ex:
+                for future in futures:
+                    future.set_exception(ex)
+                return
+
+            for future, (parsed_urls_set, error_str) in zip(futures, results):
+                if error_str is None:
+                    future.set_result(parsed_urls_set)
+                else:
+                    future.set_exception(lxml.etree.XMLSyntaxError(error_str, 0, 0, 0))
+
+        try:
+            batch_future = self.executor.submit(parse_pages_links, pages)
+        except RuntimeError as ex:
+            # process pool has been shut down
+            for future in futures:
+                future.set_exception(ex)
+            return
+
+        batch_future.add_done_callback(on_batch_done)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,93 @@
+#encoding=utf-8
+import os
+import time
+import sqlite3
+import threading
+
+from .helpers import get_status_class
+
+
+class ResultCache(object):
+    """ persistent cache of test results of external and static urls, which do not
+        depend on cookies. Each result expires after the TTL of its status, which is
+        looked up by exact status code, status class, and then default.
+        Results with TTL 0 are never cached.
+    """
+    COMMIT_INTERVAL = 100
+
+    def __init__(self, cache_file, ttl_config=None):
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.cache_file = cache_file
+        # status codes may be parsed as int keys
+        self.ttl_config = {str(key): value for key, value in (ttl_config or {}).items()}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "url TEXT PRIMARY KEY, status_code TEXT, duration_time REAL, md5 TEXT, "
+            "exception_str TEXT, expire_time REAL)"
+        )
+        self.conn.commit()
+        self.uncommitted_count = 0
+        self.stats = {
+            'hit': 0,
+            'missed': 0,
+            'cached': 0
+        }
+
+    def get_ttl(self, status_code):
+        ttl = self.ttl_config.get(status_code)
+        if ttl is None:
+            ttl = self.ttl_config.get(get_status_class(status_code))
+        if ttl is None:
+            ttl = self.ttl_config.get('default')
+        return int(ttl or 0)
+
+    def get(self, url):
+        """ get unexpired result of url.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status_code, duration_time, md5, exception_str FROM results "
+                "WHERE url=? AND expire_time>?",
+                (url, time.time())
+            ).fetchone()
+            if row is not None:
+                self.stats['hit'] += 1
+
+        if row is None:
+            return None
+
+        return {
+            'status_code': row[0],
+            'duration_time': row[1],
+            'md5': row[2],
+            'exception_str': row[3]
+        }
+
+    def set(self, url, status_code, duration_time, resp_content_md5, exception_str):
+        """ save result of a tested url if its status should be cached.
+        """
+        ttl = self.get_ttl(status_code)
+        with self.lock:
+            self.stats['missed'] += 1
+            if ttl <= 0:
+                return
+
+            self.stats['cached'] += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (url, status_code, duration_time, resp_content_md5, exception_str, time.time() + ttl)
+            )
+            self.uncommitted_count += 1
+            if self.uncommitted_count >= self.COMMIT_INTERVAL:
+                self.conn.commit()
+                self.uncommitted_count = 0
+
+    def flush(self):
+        with self.lock:
+            self.conn.commit()
+            self.uncommitted_count = 0
@@ -0,0 +1,140 @@
+#encoding=utf-8
+""" stream test results to a JSON lines file while crawling.
+
+    YAML outputs of --save-results can be derived from the results file offline:
+
+    $ webcrawler-results logs/results.jsonl.gz logs/
+"""
+import io
+import os
+import gzip
+import json
+import queue
+import argparse
+import threading
+
+from . import helpers
+
+_CLOSE = object()
+
+
+def open_results_file(results_file, mode):
+    """ open results file in binary mode, file ending with .gz is gzip compressed.
+    """
+    if results_file.endswith('.gz'):
+        # default level 9 is much slower with little gain on results
+        return gzip.open(results_file, mode, compresslevel=6)
+    return io.open(results_file, mode)
+
+
+class ResultSink(object):
+    """ append one JSON record per tested url to results file.
+        Records are queued by workers and written in batches by a background thread,
+        each batch is flushed so that results survive a crash.
+    """
+    def __init__(self, results_file, append=False, batch_size=1000):
+        results_dir = os.path.dirname(results_file)
+        if results_dir and not os.path.isdir(results_dir):
+            os.makedirs(results_dir)
+
+        self.results_file = results_file
+        self.batch_size = batch_size
+        self.file = open_results_file(results_file, 'ab' if append else 'wb')
+        self.queue = queue.Queue()
+        self.records_count = 0
+        self.closed = False
+
+        self.writer_thread = threading.Thread(target=self._run)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+
+    def write(self, record):
+        self.queue.put(record)
+
+    def _run(self):
+        closing = False
+        while not closing:
+            records = [self.queue.get()]
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if records[-1] is _CLOSE:
+                closing = True
+                records.pop()
+            if not records:
+                continue
+
+            lines = ''.join(json.dumps(record) + '\n' for record in records)
+            self.file.write(lines.encode('utf-8'))
+            self.file.flush()
+            self.records_count += len(records)
+
+    def close(self):
+        """ write all queued records and close results file.
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        self.queue.put(_CLOSE)
+        self.writer_thread.join()
+        self.file.close()
+
+
+def iter_results(results_file):
+    """ iterate records of results file, an incomplete last line of crashed crawl is skipped.
+    """
+    with open_results_file(results_file, 'rb') as f:
+        for line in f:
+            try:
+                yield json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+
+
+def save_results_to_yaml(results_file, output_folder):
+    """ derive urls_mapping.yml and visited_urls.yml from results file.
+        results of each cookies are saved in its own folder if there are several cookies.
+        later records override earlier ones of the same url, e.g. in resumed crawl.
+    @return
+        list of saved YAML files
+    """
+    cookies_results = {}
+    for record in iter_results(results_file):
+        urls_mapping, visited_urls = cookies_results.setdefault(record['cookie'], ({}, {}))
+        url = record['url']
+        if record['links'] is not None:
+            urls_mapping[url] = record['links']
+        visited_urls[url] = {
+            'status_code': record['status_code'],
+            'duration_time': record['duration_time'],
+            'md5': record['md5']
+        }
+
+    saved_files = []
+    for cookie_str, (urls_mapping, visited_urls) in cookies_results.items():
+        cookie_folder = output_folder
+        if len(cookies_results) > 1:
+            cookie_folder = os.path.join(output_folder, cookie_str or 'no_cookies')
+
+        urls_mapping_log_path = os.path.join(cookie_folder, 'urls_mapping.yml')
+        helpers.save_to_yaml(urls_mapping, urls_mapping_log_path)
+        visited_urls_log_path = os.path.join(cookie_folder, 'visited_urls.yml')
+        helpers.save_to_yaml(visited_urls, visited_urls_log_path)
+        saved_files += [urls_mapping_log_path, visited_urls_log_path]
+
+    return saved_files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Derive urls_mapping.yml and visited_urls.yml from WebCrawler results file.')
+    parser.add_argument('results_file', help="Specify JSON lines results file, may be gzip compressed.")
+    parser.add_argument('output_folder', help="Specify folder to save YAML files.")
+    args = parser.parse_args()
+
+    for saved_file in save_results_to_yaml(args.results_file, args.output_folder):
+        print("Save results in YAML file: {}".format(saved_file))
@@ -0,0 +1,100 @@
+#encoding=utf-8
+import time
+import heapq
+import random
+import itertools
+import threading
+
+from .helpers import get_status_class
+
+DEFAULT_RETRY_POLICY = {
+    'delay': 2,
+    'jitter': 0
+}
+
+
+def get_retry_delay(retry_config, status_code, attempt):
+    """ get delay seconds before the n-th retry of a failed url.
+        retry policy is looked up by exact status code, status class, and then default.
+        delay grows linearly with attempt, and random jitter of up to jitter * delay is added.
+    """
+    retry_policy = retry_config.get(status_code) \
+        or retry_config.get(get_status_class(status_code)) \
+        or retry_config.get('default') \
+        or DEFAULT_RETRY_POLICY
+    delay = float(retry_policy.get('delay', DEFAULT_RETRY_POLICY['delay'])) * attempt
+    jitter = float(retry_policy.get('jitter', DEFAULT_RETRY_POLICY['jitter']))
+    return delay + random.uniform(0, jitter * delay)
+
+
+class RetryScheduler(object):
+    """ schedule failed urls to be retried later without blocking workers.
+        Retries are kept in a heap ordered by due time, a background thread hands
+        each retry to callback when it is due, so that it is put back to frontier.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.heap = []
+        self.counter = itertools.count()
+        self.pending_count = 0
+        self.condition = threading.Condition()
+
+        retry_thread = threading.Thread(target=self._run)
+        retry_thread.daemon = True
+        retry_thread.start()
+
+    def set_callback(self, callback):
+        """ callback is called with (url, depth) when retry is due.
+        """
+        self.callback = callback
+
+    def schedule(self, url, depth, delay):
+        with self.condition:
+            heapq.heappush(self.heap, (time.time() + delay, next(self.counter), url, depth))
+            self.pending_count += 1
+            self.condition.notify_all()
+
+    def hold(self, url, depth):
+        """ count url as pending until the returned function is called, which puts it back
+            to frontier at once, e.g. url waits for result of another crawler.
+        """
+        with self.condition:
+            self.pending_count += 1
+
+        def put_back():
+            with self.condition:
+                heapq.heappush(self.heap, (time.time(), next(self.counter), url, depth))
+                self.condition.notify_all()
+
+        return put_back
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap or self.heap[0][0] > time.time():
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.condition.wait(timeout)
+                _, _, url, depth = heapq.heappop(self.heap)
+
+            try:
+                self.callback(url, depth)
+            finally:
+                # retry is counted as pending until it is put back to frontier
+                with self.condition:
+                    self.pending_count -= 1
+                    self.condition.notify_all()
+
+    def has_pending(self):
+        with self.condition:
+            return self.pending_count > 0
+
+    def join(self, timeout=None):
+        """ block until all scheduled retries are put back to frontier, or timeout.
+        @return
+            True if there were pending retries
+        """
+        with self.condition:
+            if not self.pending_count:
+                return False
+            self.condition.wait_for(lambda: not self.pending_count, timeout)
+            return True
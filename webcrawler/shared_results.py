@@ -0,0 +1,77 @@
+#encoding=utf-8
+import threading
+
+
+class SharedUrlResults(object):
+    """ test results of urls which do not depend on cookies, i.e. urls of external
+        hosts and static content, shared by crawlers of all cookie profiles.
+        An external url is claimed by the first profile which tests it, and the claim
+        is kept until its result is published, even if it is retried. Requests of other
+        profiles are deferred until then instead of requesting it again.
+    """
+    def __init__(self):
+        self.results = {}
+        # url => owner which claims it
+        self.claims = {}
+        # url => ready callbacks of deferred requests
+        self.deferred_callbacks = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            'tested': 0,
+            'shared': 0,
+            'deferred': 0
+        }
+
+    def acquire(self, url, owner, defer):
+        """ get shared result of url.
+            if there is no result yet and owner is not None, claim the url for owner to test it.
+            if the url is claimed by another owner, the request is deferred: defer() is called
+            to get a ready callback, which is called without arguments when the result is
+            published or the claim is released, and the url should be acquired again then.
+        @return
+            (result, deferred), result is None if the url should be tested by caller.
+        """
+        with self.lock:
+            if url in self.results:
+                self.stats['shared'] += 1
+                return self.results[url], False
+
+            claim_owner = self.claims.get(url)
+            if claim_owner is None or claim_owner is owner:
+                if owner is not None:
+                    self.claims[url] = owner
+                return None, False
+
+            self.deferred_callbacks.setdefault(url, []).append(defer())
+            self.stats['deferred'] += 1
+            return None, True
+
+    def _pop_claim(self, url):
+        self.claims.pop(url, None)
+        return self.deferred_callbacks.pop(url, [])
+
+    def publish(self, url, status_code, duration_time, resp_content_md5, exception_str):
+        with self.lock:
+            self.results[url] = {
+                'status_code': status_code,
+                'duration_time': duration_time,
+                'md5': resp_content_md5,
+                'exception_str': exception_str
+            }
+            self.stats['tested'] += 1
+            ready_callbacks = self._pop_claim(url)
+
+        for ready_callback in ready_callbacks:
+            ready_callback()
+
+    def release(self, url, owner):
+        """ release claim of owner without result, e.g. the url is ignored or crawl is stopped,
+            deferred requests acquire the url again, and one of them claims it.
+        """
+        with self.lock:
+            if self.claims.get(url) is not owner:
+                return
+            ready_callbacks = self._pop_claim(url)
+
+        for ready_callback in ready_callbacks:
+            ready_callback()
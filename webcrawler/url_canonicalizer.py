@@ -0,0 +1,180 @@
+#encoding=utf-8
+import threading
+
+try:
+    # Python3
+    from urllib.parse import urlsplit, urlunsplit, unquote_plus
+except ImportError:
+    # Python2
+    from urlparse import urlsplit, urlunsplit
+    from urllib import unquote_plus
+
+DEFAULT_PORTS = {
+    'http': '80',
+    'https': '443'
+}
+
+
+def remove_dot_segments(path):
+    """ resolve '.' and '..' segments of absolute url path, as RFC 3986 does.
+        e.g. /a/b/../c/./d => /a/c/d
+    """
+    if '/.' not in path:
+        return path
+
+    segments = path.split('/')
+    output = []
+    for segment in segments:
+        if segment == '.':
+            continue
+        elif segment == '..':
+            # keep the leading empty segment of absolute path
+            if len(output) > 1:
+                output.pop()
+        else:
+            output.append(segment)
+
+    if segments[-1] in ('.', '..'):
+        # /a/b/.. => /a/
+        output.append('')
+    return '/'.join(output)
+
+
+class ParamsMatcher(object):
+    """ match parameter names case insensitively, a name ending with * matches any suffix.
+    """
+    def __init__(self, names):
+        names = [name.lower() for name in names or []]
+        self.names = set(name for name in names if not name.endswith('*'))
+        self.prefixes = tuple(name[:-1] for name in names if name.endswith('*'))
+
+    def __bool__(self):
+        return bool(self.names or self.prefixes)
+
+    __nonzero__ = __bool__
+
+    def match(self, name):
+        name = unquote_plus(name).lower()
+        return name in self.names or (bool(self.prefixes) and name.startswith(self.prefixes))
+
+
+class UrlCanonicalizer(object):
+    """ rewrite urls of the same resource into one canonical url, so that it is queued and tested once.
+        - lowercase_host: lowercase scheme and host
+        - remove_default_port: remove port 80 of http and 443 of https
+        - resolve_dot_segments: resolve '.' and '..' segments of path
+        - remove_trailing_slash: remove trailing slash of path except root
+        - remove_params: remove query parameters and path parameters (;jsessionid=) by name
+        - sort_params: sort query parameters, raw parameters are kept without re-encoding
+        Urls of other schemes than http and https are kept as they are.
+    """
+    def __init__(self, config=None):
+        config = config or {}
+        self.lowercase_host = config.get('lowercase_host', True)
+        self.remove_default_port = config.get('remove_default_port', True)
+        self.resolve_dot_segments = config.get('resolve_dot_segments', True)
+        self.remove_trailing_slash = config.get('remove_trailing_slash', False)
+        self.sort_params = config.get('sort_params', True)
+        self.remove_params_matcher = ParamsMatcher(config.get('remove_params'))
+        self.lock = threading.Lock()
+        self.stats = {
+            'links': 0,
+            'rewritten': 0,
+            'merged': 0
+        }
+
+    def canonicalize_netloc(self, scheme, netloc):
+        userinfo, at, hostinfo = netloc.rpartition('@')
+        host, port = hostinfo, ''
+        if ':' in hostinfo and not hostinfo.endswith(']'):
+            # host:port, or [IPv6]:port
+            host, _, port = hostinfo.rpartition(':')
+
+        if self.lowercase_host:
+            host = host.lower()
+        if self.remove_default_port and port == DEFAULT_PORTS.get(scheme):
+            port = ''
+
+        hostinfo = host + ':' + port if port else host
+        return userinfo + at + hostinfo
+
+    def canonicalize_path(self, path):
+        if not path:
+            return '/'
+
+        if self.remove_params_matcher and ';' in path:
+            segments = []
+            for segment in path.split('/'):
+                segment_params = segment.split(';')
+                segments.append(';'.join(
+                    [segment_params[0]] + [
+                        param for param in segment_params[1:]
+                        if not self.remove_params_matcher.match(param.partition('=')[0])
+                    ]
+                ))
+            path = '/'.join(segments)
+        if self.resolve_dot_segments:
+            path = remove_dot_segments(path)
+        if self.remove_trailing_slash and len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+        return path
+
+    def canonicalize_query(self, query):
+        if not query:
+            return query
+
+        params = [param for param in query.split('&') if param]
+        if self.remove_params_matcher:
+            params = [
+                param for param in params
+                if not self.remove_params_matcher.match(param.partition('=')[0])
+            ]
+        if self.sort_params:
+            # sorted by name, values of the same name keep their order
+            params.sort(key=lambda param: param.partition('=')[0])
+        return '&'.join(params)
+
+    def canonicalize(self, url):
+        """ get canonical url of a complete url.
+        """
+        try:
+            scheme, netloc, path, query, _ = urlsplit(url)
+        except ValueError:
+            # invalid url, e.g. invalid IPv6 host, which fails when it is requested
+            return url
+
+        scheme = scheme.lower()
+        if scheme not in DEFAULT_PORTS or not netloc:
+            return url
+
+        return urlunsplit((
+            scheme,
+            self.canonicalize_netloc(scheme, netloc),
+            self.canonicalize_path(path),
+            self.canonicalize_query(query),
+            ''
+        ))
+
+    def canonicalize_urls(self, urls):
+        """ get canonical urls of a batch of unique urls, e.g. hyper links of a page.
+        @return
+            list of canonical urls in the same order as urls
+        """
+        canonicalize = self.canonicalize
+        rewritten_count = 0
+        canonical_urls = []
+        for url in urls:
+            canonical_url = canonicalize(url)
+            if canonical_url != url:
+                rewritten_count += 1
+            canonical_urls.append(canonical_url)
+
+        with self.lock:
+            self.stats['links'] += len(canonical_urls)
+            self.stats['rewritten'] += rewritten_count
+            self.stats['merged'] += len(canonical_urls) - len(set(canonical_urls))
+        return canonical_urls
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
@@ -0,0 +1,107 @@
+#encoding=utf-8
+import math
+import struct
+import hashlib
+import threading
+
+
+def get_url_hashes(url):
+    """ get two 64-bit hashes of url for double hashing.
+    """
+    digest = hashlib.md5(url.encode('utf-8')).digest()
+    return struct.unpack('<QQ', digest)
+
+
+class BloomFilter(object):
+    """ bloom filter with fixed capacity, bits are stored in bytearray.
+    """
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits_count = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes_count = max(1, int(math.ceil(-math.log(error_rate, 2))))
+        self.bits = bytearray((self.bits_count + 7) // 8)
+        self.count = 0
+        # enhanced double hashing, which spreads indexes better than hash1 + i * hash2
+        self.hash_offsets = [(i, (i ** 3 - i) // 6) for i in range(self.hashes_count)]
+
+    def contains(self, url_hashes):
+        hash1, hash2 = url_hashes
+        bits, bits_count = self.bits, self.bits_count
+        for i, offset in self.hash_offsets:
+            index = (hash1 + i * hash2 + offset) % bits_count
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+    def add(self, url_hashes):
+        hash1, hash2 = url_hashes
+        bits, bits_count = self.bits, self.bits_count
+        for i, offset in self.hash_offsets:
+            index = (hash1 + i * hash2 + offset) % bits_count
+            bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+
+class CompactUrlSet(object):
+    """ scalable bloom filter of urls, which takes about 2 bytes per url at 0.1% false
+        positive rate instead of keeping url strings.
+        A new filter with doubled capacity and halved error rate is added when the last
+        one is full, thus the overall false positive rate stays under error_rate.
+        Urls can not be removed from bloom filter, removed urls are kept in a small set.
+    """
+    def __init__(self, error_rate=0.001, initial_capacity=100000):
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.filters = []
+        self.removed_urls_set = set()
+        self.lock = threading.Lock()
+
+    def _filter_contains(self, url_hashes):
+        for bloom_filter in self.filters:
+            if bloom_filter.contains(url_hashes):
+                return True
+        return False
+
+    def __contains__(self, url):
+        if url in self.removed_urls_set:
+            return False
+        return self._filter_contains(get_url_hashes(url))
+
+    def add(self, url):
+        """ add url to set.
+        @return
+            False if url is already in set.
+        """
+        url_hashes = get_url_hashes(url)
+        with self.lock:
+            if url in self.removed_urls_set:
+                self.removed_urls_set.remove(url)
+                return True
+            if self._filter_contains(url_hashes):
+                return False
+
+            if not self.filters or self.filters[-1].is_full():
+                filters_count = len(self.filters)
+                self.filters.append(BloomFilter(
+                    self.initial_capacity * 2 ** filters_count,
+                    # error rates of filters sum up to error_rate
+                    self.error_rate * 0.5 ** (filters_count + 1)
+                ))
+            self.filters[-1].add(url_hashes)
+            return True
+
+    def remove(self, url):
+        with self.lock:
+            self.removed_urls_set.add(url)
+
+    def __len__(self):
+        return sum(bloom_filter.count for bloom_filter in self.filters)
+
+    def get_memory_size(self):
+        """ get memory size of bloom filters bits in bytes.
+        """
+        return sum(len(bloom_filter.bits) for bloom_filter in self.filters)
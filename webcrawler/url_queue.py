@@ -1,71 +1,328 @@
 #encoding=utf-8
 import queue
+import heapq
+import itertools
+import collections
+
+from .url_filter import CompactUrlSet
+from .crawl_store import StoreUrlSet
 
 class UniqueQueue(queue.Queue):
+    """ FIFO queue which ignores items that have ever been put in.
+        Backed by deque, thus put and get are both O(1).
+    """
+    def __init__(self, maxsize=0, items_set_factory=set):
+        self.items_set_factory = items_set_factory
+        super(UniqueQueue, self).__init__(maxsize)
 
     def _init(self, maxsize):
         self.clear()
 
     def clear(self):
-        self.all_items_set = set()
-        self.queue = []
+        self.all_items_set = self.items_set_factory()
+        self.queue = collections.deque()
+        self.unfinished_tasks = 0
 
     def _put(self, item):
-        if item not in self.all_items_set:
+        if self.items_set_factory is set:
+            if item in self.all_items_set:
+                return False
+            self.all_items_set.add(item)
+        elif not self.all_items_set.add(item):
+            # compact urls set tells if item is new when adding it
+            return False
+
+        self._append(item)
+        return True
+
+    def _append(self, item):
+        self.queue.append(item)
+
+    def _get(self):
+        return self.queue.popleft()
+
+    def put(self, item, block=True, timeout=None):
+        """ the queue is unbounded and never blocks.
+            only new item is counted as unfinished task, thus join() works with duplicate items.
+        """
+        self.extend([item])
+
+    def extend(self, items):
+        """ put several items in with one lock acquisition.
+        """
+        with self.not_full:
+            added_count = 0
+            for item in items:
+                if self._put(item):
+                    added_count += 1
+
+            if added_count:
+                self.unfinished_tasks += added_count
+                self.not_empty.notify(added_count)
+
+    def put_again(self, item, first=False):
+        """ put an item which has been put in before, e.g. to retry it.
+            if first is True, it is got before other items, e.g. it is deferred after it is got.
+        """
+        with self.not_full:
             self.all_items_set.add(item)
-            self.queue.insert(0, item)
+            if first:
+                self._prepend(item)
+            else:
+                self._append(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _prepend(self, item):
+        self.queue.appendleft(item)
+
+    def join(self, timeout=None):
+        """ block until all items are got and done, or timeout.
+        @return
+            False if timed out
+        """
+        with self.all_tasks_done:
+            return self.all_tasks_done.wait_for(lambda: not self.unfinished_tasks, timeout)
+
+
+class PriorityUniqueQueue(UniqueQueue):
+    """ queue which ignores items that have ever been put in, and gets the item with the lowest
+        priority value first, items of the same priority are got in FIFO order.
+        Priority of a queued item is lowered by pushing it to heap again, and the stale
+        entry is skipped when it is popped.
+    """
+    def __init__(self, get_priority, maxsize=0, items_set_factory=set):
+        self.get_priority = get_priority
+        super(PriorityUniqueQueue, self).__init__(maxsize, items_set_factory)
+
+    def clear(self):
+        super(PriorityUniqueQueue, self).clear()
+        self.queue = []
+        # queued item => priority of its live heap entry
+        self.priorities = {}
+        self.counter = itertools.count()
+
+    def _qsize(self):
+        return len(self.priorities)
+
+    def _append(self, item):
+        priority = self.get_priority(item)
+        self.priorities[item] = priority
+        heapq.heappush(self.queue, (priority, next(self.counter), item))
+
+    def _prepend(self, item):
+        # the order is decided by priority
+        self._append(item)
 
     def _get(self):
-        return self.queue.pop()
+        while True:
+            priority, _, item = heapq.heappop(self.queue)
+            if self.priorities.get(item) == priority:
+                del self.priorities[item]
+                return item
+
+    def reprioritize(self, items):
+        """ update priorities of queued items, e.g. when they are linked by more pages.
+        """
+        with self.mutex:
+            for item in items:
+                current_priority = self.priorities.get(item)
+                if current_priority is None:
+                    continue
+                priority = self.get_priority(item)
+                if priority < current_priority:
+                    self.priorities[item] = priority
+                    heapq.heappush(self.queue, (priority, next(self.counter), item))
 
 class UrlQueue(object):
-    def __init__(self):
+    """ unvisited urls queue and visited urls results.
+        In compact mode, membership of visited urls and ever queued urls are kept in
+        bloom filters with the specified false positive rate, and test results are
+        only kept for urls whose status code is not 2xx.
+        If crawl store is specified, matches of bloom filters are confirmed in crawl store,
+        and test results are kept in crawl store only.
+    """
+    def __init__(self, compact=False, error_rate=0.001, initial_capacity=100000, crawl_store=None):
+        self.compact = compact or crawl_store is not None
+        self.crawl_store = crawl_store
         self._visited_urls_dict = {}
-        self._unvisited_urls_queue = UniqueQueue()
+        self._visited_urls_count = 0
+        if crawl_store is not None:
+            self._make_urls_set = lambda: StoreUrlSet(
+                crawl_store, 'queued', error_rate, initial_capacity, clear=True)
+            self._visited_urls_set = StoreUrlSet(crawl_store, 'visited', error_rate, initial_capacity)
+            self._visited_urls_count = len(self._visited_urls_set)
+        elif compact:
+            self._make_urls_set = lambda: CompactUrlSet(error_rate, initial_capacity)
+            self._visited_urls_set = self._make_urls_set()
+        else:
+            self._make_urls_set = set
+            self._visited_urls_set = self._visited_urls_dict
+        self._unvisited_urls_queue = UniqueQueue(items_set_factory=self._make_urls_set)
+        self._unvisited_urls_depth_dict = {}
+        self.prioritized = False
+
+    def set_priority_function(self, get_priority):
+        """ get unvisited urls in order of priority, urls with the lowest value of get_priority(url) first.
+            it should be set before any url is added.
+        """
+        self._unvisited_urls_queue = PriorityUniqueQueue(get_priority, items_set_factory=self._make_urls_set)
+        self.prioritized = True
+
+    def reprioritize_unvisited_urls(self, urls):
+        if self.prioritized:
+            self._unvisited_urls_queue.reprioritize(urls)
+
+    def get_unvisited_url_depth(self, url):
+        return self._unvisited_urls_depth_dict.get(url, 0)
 
     def add_visited_url(self, url, url_test_res):
         if url == "" \
             or url is None \
-            or url in self._visited_urls_dict:
+            or url in self._visited_urls_set:
             return
+
+        if self.compact:
+            if not self._visited_urls_set.add(url):
+                return
+            self._visited_urls_count += 1
+            if self.crawl_store is not None or str(url_test_res['status_code']).startswith('2'):
+                return
         self._visited_urls_dict[url] = url_test_res
 
     def remove_visited_url(self, url):
+        if self.compact and url in self._visited_urls_set:
+            self._visited_urls_set.remove(url)
+            self._visited_urls_count -= 1
         self._visited_urls_dict.pop(url, None)
         if url in self._unvisited_urls_queue.all_items_set:
             self._unvisited_urls_queue.all_items_set.remove(url)
 
     def clear_unvisited_urls(self):
         self._unvisited_urls_queue.clear()
+        self._unvisited_urls_depth_dict.clear()
 
-    def add_unvisited_url(self, url):
-        if url == "" \
-            or url is None \
-            or url in self._visited_urls_dict:
-            return
-        self._unvisited_urls_queue.put_nowait(url)
+    def add_unvisited_url(self, url, depth=0):
+        self.add_unvisited_urls([url], depth)
 
-    def add_unvisited_urls(self, urls):
+    def add_unvisited_urls(self, urls, depth=0, url_filter=None):
+        """ add urls to unvisited queue, depth of each url is kept as the first time it is added,
+            or lowered if it is added again with less depth before it is got.
+        @params
+            url_filter: function which gets urls to add from urls never added before
+        @return
+            list of new added urls
+        """
         if isinstance(urls, str):
-            self.add_unvisited_url(urls)
-        if isinstance(urls, (list, set)):
-            for url in urls:
-                self.add_unvisited_url(url)
+            urls = [urls]
+        if not isinstance(urls, (list, set)):
+            return []
+
+        all_items_set = self._unvisited_urls_queue.all_items_set
+        depth_dict = self._unvisited_urls_depth_dict
+        new_urls = []
+        for url in urls:
+            if url == "" or url is None or url in self._visited_urls_set:
+                continue
+            if url not in all_items_set:
+                new_urls.append(url)
+            elif depth_dict.get(url, depth) > depth:
+                depth_dict[url] = depth
+
+        if url_filter is not None and new_urls:
+            new_urls = url_filter(new_urls)
+        for url in new_urls:
+            depth_dict.setdefault(url, depth)
+        self._unvisited_urls_queue.extend(new_urls)
+        return new_urls
+
+    def retry_unvisited_url(self, url, depth=0):
+        """ put url back to unvisited queue to retry it, though it has been added before.
+        """
+        self._unvisited_urls_depth_dict[url] = depth
+        self._unvisited_urls_queue.put_again(url)
+
+    def defer_unvisited_url(self, url, depth=0):
+        """ keep depth of a url got from unvisited queue but deferred, e.g. its host is busy,
+            so that the depth is still lowered if the url is added again with less depth.
+        """
+        depth_dict = self._unvisited_urls_depth_dict
+        depth_dict[url] = min(depth_dict.get(url, depth), depth)
+
+    def undefer_unvisited_url(self, url):
+        """ the url is not deferred but tested at once.
+        """
+        self._unvisited_urls_depth_dict.pop(url, None)
+
+    def put_back_deferred_url(self, url):
+        """ put a deferred url back to the head of unvisited queue with its lowest known depth.
+        """
+        self._unvisited_urls_queue.put_again(url, first=True)
 
     def get_one_unvisited_url(self):
-        return self._unvisited_urls_queue.get()
+        url, _ = self.get_one_unvisited_url_with_depth()
+        return url
+
+    def get_one_unvisited_url_with_depth(self):
+        url = self._unvisited_urls_queue.get()
+        depth = self._unvisited_urls_depth_dict.pop(url, 0)
+        return url, depth
+
+    def unvisited_url_done(self):
+        """ indicate that a url got from unvisited queue is done.
+        """
+        self._unvisited_urls_queue.task_done()
+
+    def join_unvisited_urls(self, timeout=None):
+        """ block until all urls added to unvisited queue are got and done, or timeout.
+        @return
+            False if timed out
+        """
+        return self._unvisited_urls_queue.join(timeout)
 
     def get_visited_urls_count(self):
+        if self.compact:
+            return self._visited_urls_count
         return len(self._visited_urls_dict)
 
     def get_visited_urls(self):
+        """ get visited urls results, only urls with non-2xx status code are kept in compact mode,
+            and none is kept if url queue is backed by crawl store.
+        """
         return self._visited_urls_dict
 
+    def get_memory_stats(self):
+        """ get memory stats of bloom filters in compact mode.
+        """
+        if not self.compact:
+            return None
+
+        visited_urls_set = self._visited_urls_set
+        all_items_set = self._unvisited_urls_queue.all_items_set
+        return {
+            'visited_urls': self._visited_urls_count,
+            'queued_urls': len(all_items_set),
+            'results': len(self._visited_urls_dict),
+            'bytes': visited_urls_set.get_memory_size() + all_items_set.get_memory_size(),
+            'error_rate': visited_urls_set.error_rate,
+            'store_backed': self.crawl_store is not None
+        }
+
     def get_unvisited_urls_count(self):
         return self._unvisited_urls_queue.qsize()
 
     def is_url_visited(self, url):
-        return url in self._visited_urls_dict
+        return url in self._visited_urls_set
+
+    def is_url_passed(self, url):
+        """ check if url is tested with 2xx status code,
+            all tested urls are regarded as passed if test results are kept in crawl store only.
+        """
+        if url not in self._visited_urls_set:
+            return False
+        url_test_res = self._visited_urls_dict.get(url)
+        # only results of non-2xx urls are kept in compact mode
+        return url_test_res is None or str(url_test_res['status_code']).startswith('2')
 
     def is_unvisited_urls_empty(self):
         return self._unvisited_urls_queue.empty()
@@ -0,0 +1,178 @@
+#encoding=utf-8
+import re
+import collections
+
+from . import helpers
+
+# below these rules numbers, C loops of str.startswith and `in` are faster than
+# walking a trie or automaton char by char in Python
+TRIE_MIN_PREFIXES = 128
+AUTOMATON_MIN_KEYWORDS = 64
+
+
+class PrefixMatcher(object):
+    """ match strings which start with any of prefixes.
+        Many prefixes are kept in a trie, thus matching costs O(length of the longest
+        matched prefix) instead of O(prefixes number).
+    """
+    def __init__(self, prefixes):
+        self.prefixes = tuple(prefixes)
+        self.trie = None
+        if len(self.prefixes) >= TRIE_MIN_PREFIXES:
+            self.trie = {}
+            for prefix in self.prefixes:
+                node = self.trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                # None marks the end of a prefix
+                node[None] = True
+
+    def __bool__(self):
+        return bool(self.prefixes)
+
+    __nonzero__ = __bool__
+
+    def match(self, string):
+        if self.trie is None:
+            return string.startswith(self.prefixes)
+
+        node = self.trie
+        if None in node:
+            # empty prefix
+            return True
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+
+class KeywordMatcher(object):
+    """ match strings which contain any of keywords.
+        Many keywords are searched with Aho-Corasick automaton in one pass of the string.
+    """
+    def __init__(self, keywords):
+        self.keywords = tuple(keyword for keyword in keywords if keyword)
+        self.has_empty_keyword = len(self.keywords) < len(keywords)
+        self.goto = None
+        if len(self.keywords) >= AUTOMATON_MIN_KEYWORDS:
+            self._build_automaton()
+
+    def _build_automaton(self):
+        # state => {char: next state}, failure state, and if any keyword ends at state
+        goto = [{}]
+        fail = [0]
+        output = [False]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    output.append(False)
+                state = next_state
+            output[state] = True
+
+        states_queue = collections.deque(goto[0].values())
+        while states_queue:
+            state = states_queue.popleft()
+            for char, next_state in goto[state].items():
+                states_queue.append(next_state)
+                fail_state = fail[state]
+                while fail_state and char not in goto[fail_state]:
+                    fail_state = fail[fail_state]
+                fail[next_state] = goto[fail_state].get(char, 0)
+                output[next_state] = output[next_state] or output[fail[next_state]]
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+
+    def __bool__(self):
+        return bool(self.keywords) or self.has_empty_keyword
+
+    __nonzero__ = __bool__
+
+    def search(self, string):
+        if self.has_empty_keyword:
+            return True
+
+        if self.goto is None:
+            for keyword in self.keywords:
+                if keyword in string:
+                    return True
+            return False
+
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for char in string:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                return True
+        return False
+
+
+def compile_regex_list(regex_list):
+    """ compile regex list into one regex, None if the list is empty.
+    """
+    if not regex_list:
+        return None
+    return re.compile('|'.join('(?:{})'.format(regex) for regex in regex_list))
+
+
+class UrlRules(object):
+    """ rules compiled from config, deciding which hyper links are ignored and which urls are tested.
+        - startswith: raw hyper links starting with any of them are ignored when parsing pages
+        - host, fullurl, include-key, regex: matched urls are not tested
+        - include regex: if set, only urls matching any of them are tested
+    """
+    def __init__(self, whitelist_config=None, include_config=None):
+        whitelist_config = whitelist_config or {}
+        include_config = include_config or {}
+        self.ignore_prefix_matcher = PrefixMatcher(whitelist_config.get('startswith') or [])
+        self.ignore_hosts = set(whitelist_config.get('host') or [])
+        self.ignore_fullurls = set(whitelist_config.get('fullurl') or [])
+        self.ignore_keyword_matcher = KeywordMatcher(whitelist_config.get('include-key') or [])
+        self.ignore_regex = compile_regex_list(whitelist_config.get('regex'))
+        self.include_regex = compile_regex_list(include_config.get('regex'))
+        self.has_url_rules = bool(
+            self.ignore_hosts or self.ignore_fullurls or self.ignore_keyword_matcher
+            or self.ignore_regex or self.include_regex)
+
+    def is_ignored_url(self, url, url_host=None):
+        """ check if url should not be tested.
+        """
+        if not self.has_url_rules:
+            return False
+
+        if url in self.ignore_fullurls:
+            return True
+        if self.ignore_hosts:
+            if url_host is None:
+                url_host = helpers.get_parsed_object_from_url(url).netloc
+            if url_host in self.ignore_hosts:
+                return True
+        if self.ignore_keyword_matcher.search(url):
+            return True
+        if self.ignore_regex is not None and self.ignore_regex.search(url):
+            return True
+        if self.include_regex is not None and not self.include_regex.search(url):
+            return True
+        return False
+
+    def filter_urls(self, urls):
+        """ get urls which should be tested in a batch of urls.
+        """
+        if not self.has_url_rules:
+            return urls
+
+        is_ignored_url = self.is_ignored_url
+        return [url for url in urls if not is_ignored_url(url)]